@@ -0,0 +1,207 @@
+"""
+A generator for synthetic, but realistically shaped, catalogues.
+
+Everything is inserted with bulk_create, so even the large catalogues (50k products) are
+seeded in seconds rather than minutes. The generator is deterministic for a given size and
+seed, so benchmark results can be compared between runs.
+"""
+
+import random
+from dataclasses import dataclass, field
+
+from django.utils import timezone
+
+from beheeromgeving import models as orm
+from domain.product import enums
+
+BATCH_SIZE = 2000
+WORDS = [
+    "bomen",
+    "afval",
+    "parkeren",
+    "fietspaden",
+    "water",
+    "bruggen",
+    "verkeer",
+    "zwemmen",
+    "markten",
+    "energie",
+    "woningen",
+    "subsidies",
+]
+
+
+@dataclass
+class Catalogue:
+    size: int
+    team_scopes: list[str] = field(default_factory=list)
+    # Products per status/purpose, so benchmarks can pick realistic targets.
+    published: list[int] = field(default_factory=list)
+    drafts: list[int] = field(default_factory=list)
+    with_revision: list[int] = field(default_factory=list)
+
+
+def _text(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choices(WORDS, k=length))
+
+
+def generate_catalogue(size: int, *, seed: int = 0) -> Catalogue:
+    """Seed a catalogue of size products.
+
+    Per 10 products: 8 published dataproducts, 1 internally published information product
+    and 1 draft dataproduct (with a published contract, so it can be published). Dataproducts
+    have a published and a draft contract, the published one with an API and a file
+    distribution. Every product has a service, sources among the products before it, and
+    1 in 20 published products has a revision.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    themes = [theme.value for theme in enums.Theme]
+    catalogue = Catalogue(size=size)
+
+    teams = orm.Team.objects.bulk_create(
+        orm.Team(
+            name=f"team {index}",
+            acronym=f"T{index}",
+            po_name=f"Product Owner {index}",
+            po_email=f"po.{index}@amsterdam.nl",
+            contact_email=f"team.{index}@amsterdam.nl",
+            scope=f"scope_team_{index}",
+        )
+        for index in range(max(1, size // 100))
+    )
+    catalogue.team_scopes = [team.scope for team in teams]
+
+    statuses = [
+        "I" if index % 10 == 8 else "D" if index % 10 == 9 else "P" for index in range(size)
+    ]
+    products = orm.Product.objects.bulk_create(
+        (
+            orm.Product(
+                name=f"{_text(rng, 2)} {index}",
+                description=_text(rng, 30),
+                team=teams[index % len(teams)],
+                data_steward=f"steward.{index}@amsterdam.nl",
+                language=rng.choice(["NL", "EN"]),
+                is_geo=rng.random() < 0.5,
+                schema_url=(
+                    f"https://schemas.data.amsterdam.nl/datasets/{index}/dataset"
+                    if rng.random() < 0.7
+                    else ""
+                ),
+                type="I" if status == "I" else "D",
+                themes=rng.sample(themes, k=rng.randint(1, 3)),
+                refresh_period="3.MONTH",
+                publication_status=status,
+                publication_date=now if status != "D" else None,
+            )
+            for index, status in enumerate(statuses)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    services = orm.DataService.objects.bulk_create(
+        (
+            orm.DataService(
+                product=product,
+                type=rng.choice(["REST", "WFS", "MVT"]),
+                endpoint_url=f"https://api.data.amsterdam.nl/v1/{product.pk}",
+            )
+            for product in products
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    contracts = []
+    for product in products:
+        is_information_product = product.type == "I"
+        contracts.append(
+            orm.DataContract(
+                product=product,
+                name=f"contract {product.pk}",
+                publication_status="I" if is_information_product else "P",
+                publication_date=now,
+                purpose=_text(rng, 15),
+                privacy_level="NPI",
+                scopes=[f"scope_{product.pk}"],
+                confidentiality=rng.choice(["O", "I", "V"]),
+                start_date=now.date(),
+                retainment_period=12,
+            )
+        )
+        if not is_information_product:
+            contracts.append(
+                orm.DataContract(
+                    product=product,
+                    name=f"draft contract {product.pk}",
+                    publication_status="D",
+                    purpose=_text(rng, 15),
+                    privacy_level="NPI",
+                    confidentiality="I",
+                )
+            )
+    contracts = orm.DataContract.objects.bulk_create(contracts, batch_size=BATCH_SIZE)
+
+    services_by_product = {service.product_id: service for service in services}
+    distributions = []
+    for contract in contracts:
+        if contract.publication_status == "D":
+            continue
+        if contract.publication_status == "I":
+            distributions.append(
+                orm.Distribution(
+                    contract=contract, access_url="https://example.com/report", type="R"
+                )
+            )
+            continue
+        distributions += [
+            orm.Distribution(
+                contract=contract,
+                access_service=services_by_product[contract.product_id],
+                type="A",
+            ),
+            orm.Distribution(
+                contract=contract,
+                download_url=f"https://data.amsterdam.nl/{contract.pk}.csv",
+                format="csv",
+                type="F",
+            ),
+        ]
+    orm.Distribution.objects.bulk_create(distributions, batch_size=BATCH_SIZE)
+
+    Sources = orm.Product.sources.through
+    Sources.objects.bulk_create(
+        (
+            Sources(from_product_id=product.pk, to_product_id=source.pk)
+            for index, product in enumerate(products[1:], start=1)
+            for source in rng.sample(products[max(0, index - 50) : index], k=min(index, 2))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    revisions = []
+    for index, (product, status) in enumerate(zip(products, statuses, strict=True)):
+        if status == "D":
+            catalogue.drafts.append(product.pk)
+            continue
+        catalogue.published.append(product.pk)
+        if status == "P" and index % 20 == 0:
+            catalogue.with_revision.append(product.pk)
+            revisions.append(
+                orm.ProductRevision(
+                    product=product,
+                    team_id=product.team_id,
+                    name=f"{product.name} (herzien)",
+                    description=product.description,
+                    language=product.language,
+                    is_geo=product.is_geo,
+                    schema_url=product.schema_url,
+                    type=product.type,
+                    themes=product.themes,
+                    refresh_period=product.refresh_period,
+                    data_steward=product.data_steward,
+                    base_last_updated=now,
+                )
+            )
+    orm.ProductRevision.objects.bulk_create(revisions, batch_size=BATCH_SIZE)
+    return catalogue
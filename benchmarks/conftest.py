@@ -0,0 +1,75 @@
+"""
+Benchmarks are not part of the regular test-suite. Run them with `make benchmark`.
+
+Every benchmark adds its measurements to the `benchmark_report` fixture. At the end of the run
+these are written to a JSON file (see --benchmark-report), which can be compared between
+releases.
+"""
+
+import time
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from benchmarks.catalogue import generate_catalogue
+from benchmarks.utils import BenchmarkReport
+from tests.utils import build_jwt_token
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark-report",
+        default="benchmark-report.json",
+        help="Path of the JSON file the benchmark results are written to.",
+    )
+    parser.addoption(
+        "--benchmark-sizes",
+        default="1000",
+        help="Comma-separated sizes (number of products) of the catalogues to benchmark, "
+        "e.g. 1000,10000,50000.",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "catalogue_size" in metafunc.fixturenames:
+        sizes = metafunc.config.getoption("--benchmark-sizes").split(",")
+        metafunc.parametrize("catalogue_size", [int(size) for size in sizes], scope="session")
+
+
+@pytest.fixture(scope="session")
+def benchmark_report(request):
+    report = BenchmarkReport()
+    yield report
+    report.write(Path(request.config.getoption("--benchmark-report")))
+
+
+@pytest.fixture(scope="session")
+def catalogue(catalogue_size, benchmark_report, django_db_setup, django_db_blocker):
+    """A synthetic catalogue, seeded once for all benchmarks of the same size.
+
+    Benchmarks run in a transaction, so changes they make are rolled back afterwards."""
+    with django_db_blocker.unblock():
+        call_command("flush", interactive=False, verbosity=0)
+        start = time.perf_counter()
+        catalogue = generate_catalogue(catalogue_size)
+        benchmark_report.add(f"catalogue.{catalogue_size}", seconds=time.perf_counter() - start)
+    yield catalogue
+    with django_db_blocker.unblock():
+        call_command("flush", interactive=False, verbosity=0)
+
+
+@pytest.fixture()
+def api_client() -> APIClient:
+    api_client = APIClient()
+    api_client.default_format = "json"
+    return api_client
+
+
+@pytest.fixture()
+def token_headers():
+    def headers(scopes: list[str]) -> dict[str, str]:
+        return {"HTTP_AUTHORIZATION": f"Bearer {build_jwt_token(scopes)}"}
+
+    return headers
@@ -0,0 +1,86 @@
+"""
+Micro-benchmarks of the overhead of the @authorize decorators on ProductService methods.
+
+Each method is called CALLS times through its decorators and as the undecorated method
+(`__wrapped__`), on a repository that returns a product right away, so the difference is the
+cost of the authorization. The team lookups use the in-memory repository of the domain tests;
+in the application they are a query, which an admin skips because roles are checked first.
+"""
+
+from collections.abc import Callable
+
+import pytest
+from django.conf import settings
+
+from benchmarks.utils import measure
+from domain.auth import AuthorizationService
+from domain.product import Product, ProductService, enums
+from domain.team import Team
+from tests.domain.utils import DummyAuthRepo
+
+CALLS = 10_000
+
+TEAM = Team(
+    id=1,
+    name="DataDiensten",
+    description="",
+    acronym="DADI",
+    po_name="Someone",
+    po_email="someone.dadi@amsterdam.nl",
+    contact_email="dadi@amsterdam.nl",
+    scope="scope_dadi",
+)
+PRODUCT = Product(
+    id=1,
+    name="bomen",
+    team_id=TEAM.id,
+    publication_status=enums.PublicationStatus.PUBLISHED,
+)
+
+
+class Repository:
+    def list_all(self) -> list[Product]:
+        return [PRODUCT]
+
+    def get(self, id: int, include=None, *, cached=True) -> Product:
+        return PRODUCT
+
+    def get_revision(self, id: int) -> Product:
+        return PRODUCT
+
+
+CALLERS: dict[str, Callable] = {
+    "get_all_products": lambda method, service, scopes: method(service, scopes=scopes),
+    "get_product_revision": lambda method, service, scopes: method(
+        service, product_id=PRODUCT.id, scopes=scopes
+    ),
+}
+
+
+@pytest.mark.parametrize(
+    "name,who",
+    [
+        ("get_all_products", "admin"),
+        ("get_product_revision", "admin"),
+        ("get_product_revision", "team_member"),
+    ],
+)
+def test_decorator_overhead(benchmark_report, name, who):
+    scopes = [settings.ADMIN_ROLE_NAME] if who == "admin" else [TEAM.scope]
+    auth = AuthorizationService(DummyAuthRepo(teams=[TEAM], products=[PRODUCT]))
+    service = ProductService(Repository(), auth=auth)
+    decorated = getattr(ProductService, name)
+    call = CALLERS[name]
+
+    undecorated = measure(
+        lambda: [call(decorated.__wrapped__, service, scopes) for _ in range(CALLS)]
+    )
+    authorized = measure(lambda: [call(decorated, service, scopes) for _ in range(CALLS)])
+
+    report_name = f"authorization.{name}.{who}"
+    benchmark_report.add(f"{report_name}.undecorated", undecorated)
+    benchmark_report.add(
+        f"{report_name}.decorated",
+        authorized,
+        overhead_per_call=(authorized.median - undecorated.median) / CALLS,
+    )
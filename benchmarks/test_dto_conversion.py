@@ -0,0 +1,73 @@
+"""
+Micro-benchmarks for converting domain objects to response DTOs.
+
+The "validated" variant is how DTOs used to be built (`model_validate` on the domain object),
+the "trusted" variant is the current `to_response_object`, which skips validation.
+"""
+
+from datetime import UTC, date, datetime
+
+import pytest
+
+from api import datatransferobjects as dtos
+from benchmarks.utils import measure
+from domain.product import DataContract, DataService, Distribution, Product, RefreshPeriod, enums
+
+
+def make_product(index: int) -> Product:
+    return Product(
+        id=index,
+        name=f"product {index}",
+        description=f"beschrijving van product {index} " * 20,
+        team_id=1,
+        contact_email="team@amsterdam.nl",
+        owner="Product Owner",
+        language=enums.Language.NEDERLANDS,
+        is_geo=True,
+        schema_url="https://schemas.data.amsterdam.nl/datasets/bomen/dataset",
+        type=enums.ProductType.DATAPRODUCT,
+        themes=[enums.Theme.NATUUR_EN_MILIEU],
+        refresh_period=RefreshPeriod(3, enums.TimeUnit.MONTH),
+        last_updated=datetime(2025, 1, 1, tzinfo=UTC),
+        publication_status=enums.PublicationStatus.PUBLISHED,
+        publication_date=datetime(2025, 1, 1, tzinfo=UTC),
+        services=[DataService(id=index, type=enums.DataServiceType.REST)],
+        contracts=[
+            DataContract(
+                id=index * 10 + contract_index,
+                name=f"contract {index}.{contract_index}",
+                purpose="doelbinding",
+                publication_status=enums.PublicationStatus.PUBLISHED,
+                privacy_level=enums.PrivacyLevel.NIET_PERSOONLIJK_IDENTIFICEERBAAR,
+                confidentiality=enums.ConfidentialityLevel.INTERN,
+                scopes=["scope"],
+                start_date=date(2025, 1, 1),
+                retainment_period=12,
+                distributions=[
+                    Distribution(id=index * 100 + 1, access_service_id=index, type="A"),
+                    Distribution(id=index * 100 + 2, format="csv", type="F"),
+                ],
+            )
+            for contract_index in range(3)
+        ],
+    )
+
+
+@pytest.mark.parametrize("count", [1, 100, 1000])
+@pytest.mark.parametrize(
+    "dto_type,dto_model",
+    [
+        ("detail", dtos.ProductDetail),
+        ("list", dtos.ProductList),
+        ("me", dtos.MyProduct),
+    ],
+)
+def test_product_conversion(benchmark_report, count, dto_type, dto_model):
+    products = [make_product(index) for index in range(count)]
+
+    validated = measure(lambda: [dto_model.model_validate(p).model_dump() for p in products])
+    trusted = measure(lambda: [dtos.to_response_object(p, dto_type=dto_type) for p in products])
+
+    name = f"dto_conversion.{dto_model.__name__}.{count}"
+    benchmark_report.add(f"{name}.validated", validated)
+    benchmark_report.add(f"{name}.trusted", trusted)
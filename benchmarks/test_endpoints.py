@@ -0,0 +1,113 @@
+"""
+Benchmarks of the API endpoints on synthetic catalogues (see catalogue.py).
+
+For each endpoint and catalogue size the latency, number of queries and peak memory are added
+to the report as `endpoints.<name>.<size>`.
+"""
+
+import pytest
+from django.conf import settings
+
+from benchmarks.utils import profile
+
+pytestmark = pytest.mark.django_db
+
+PRODUCT_LISTS = {
+    "products": "/products",
+    "products.query": "/products?q=bomen+parkeren",
+    "products.filtered": "/products?theme=NM,V&type=F&language=NL&is_geo=true",
+    "products.fields": "/products?fields=name,team_id,publication_status",
+    "products.page_5": "/products?pagesize=100&page=5",
+}
+
+
+@pytest.mark.parametrize("name,path", PRODUCT_LISTS.items())
+def test_product_list(benchmark_report, catalogue, api_client, name, path):
+    assert api_client.get(path).status_code == 200
+    benchmark_report.add(
+        f"endpoints.{name}.{catalogue.size}", **profile(lambda: api_client.get(path))
+    )
+
+
+def test_product_detail(benchmark_report, catalogue, api_client):
+    path = f"/products/{catalogue.published[len(catalogue.published) // 2]}"
+    assert api_client.get(path).status_code == 200
+    benchmark_report.add(
+        f"endpoints.product_detail.{catalogue.size}", **profile(lambda: api_client.get(path))
+    )
+
+
+def test_product_detail_as_admin(benchmark_report, catalogue, api_client, token_headers):
+    path = f"/products/{catalogue.drafts[0]}"
+
+    def get():
+        # A fresh token per request, they expire quickly.
+        return api_client.get(path, **token_headers([settings.ADMIN_ROLE_NAME]))
+
+    assert get().status_code == 200
+    benchmark_report.add(f"endpoints.product_detail.admin.{catalogue.size}", **profile(get))
+
+
+def test_product_lineage(benchmark_report, catalogue, api_client):
+    path = f"/products/{catalogue.published[-1]}/lineage?direction=upstream&depth=10"
+    assert api_client.get(path).status_code == 200
+    benchmark_report.add(
+        f"endpoints.product_lineage.{catalogue.size}", **profile(lambda: api_client.get(path))
+    )
+
+
+def test_teams(benchmark_report, catalogue, api_client):
+    assert api_client.get("/teams").status_code == 200
+    benchmark_report.add(
+        f"endpoints.teams.{catalogue.size}", **profile(lambda: api_client.get("/teams"))
+    )
+
+
+def test_me(benchmark_report, catalogue, api_client, token_headers):
+    def get():
+        return api_client.get("/me", **token_headers(catalogue.team_scopes[:1]))
+
+    assert get().status_code == 200
+    benchmark_report.add(f"endpoints.me.{catalogue.size}", **profile(get))
+
+
+# Each call of profile() takes 8 products: the warmup, 5 rounds, the queries and the memory.
+PUBLISH_CALLS = 8
+
+
+def test_publish_product(benchmark_report, catalogue, api_client, token_headers):
+    """Publishing a draft product, each call publishes another one."""
+    product_ids = iter(catalogue.drafts)
+
+    def publish():
+        response = api_client.post(
+            f"/products/{next(product_ids)}/set-state",
+            {"publication_status": "P"},
+            **token_headers([settings.ADMIN_ROLE_NAME]),
+        )
+        assert response.status_code == 200, response.data
+        return response
+
+    if len(catalogue.drafts) < PUBLISH_CALLS:
+        pytest.skip("Catalogue has too few draft products.")
+    benchmark_report.add(f"endpoints.publish_product.{catalogue.size}", **profile(publish))
+
+
+def test_publish_product_revision(benchmark_report, catalogue, api_client, token_headers):
+    """Publishing a product revision, each call publishes the revision of another product."""
+    product_ids = iter(catalogue.with_revision)
+
+    def publish():
+        response = api_client.post(
+            f"/products/{next(product_ids)}/revision/publish",
+            {},
+            **token_headers([settings.ADMIN_ROLE_NAME]),
+        )
+        assert response.status_code == 200, response.data
+        return response
+
+    if len(catalogue.with_revision) < PUBLISH_CALLS:
+        pytest.skip("Catalogue has too few revisions.")
+    benchmark_report.add(
+        f"endpoints.publish_product_revision.{catalogue.size}", **profile(publish)
+    )
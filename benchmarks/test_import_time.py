@@ -0,0 +1,62 @@
+"""
+Import time of `manage.py check` and of loading the WSGI application, measured with
+`python -X importtime` in a fresh process.
+
+Per command the total import time, the number of imported modules and the import time of the
+slowest top-level packages are added to the report, so a new heavy import (or one that
+should have been deferred, like the Azure Monitor distro) stands out.
+"""
+
+import os
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parents[1]
+COMMANDS = {
+    "manage_check": [str(ROOT / "src" / "manage.py"), "check"],
+    "wsgi": ["-c", "import beheeromgeving.wsgi"],
+}
+TOP_PACKAGES = 10
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Summarize the `import time: self [us] | cumulative | imported package` lines."""
+    self_us: Counter[str] = Counter()
+    modules = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, _cumulative, module = line.removeprefix("import time:").split("|")
+        self_us[module.strip().split(".")[0]] += int(own)
+        modules += 1
+    return {
+        "seconds": self_us.total() / 1_000_000,
+        "modules": modules,
+        "packages": {
+            package: microseconds / 1_000_000
+            for package, microseconds in self_us.most_common(TOP_PACKAGES)
+        },
+    }
+
+
+@pytest.mark.parametrize("name", COMMANDS)
+def test_import_time(benchmark_report, name):
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "tests.settings",
+        "PYTHONPATH": os.pathsep.join([str(ROOT), str(ROOT / "src")]),
+        "WARM_UP": "false",
+    }
+    result = subprocess.run(  # noqa: S603 (fixed commands)
+        [sys.executable, "-X", "importtime", *COMMANDS[name]],
+        env=env,
+        cwd=ROOT,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    benchmark_report.add(f"import_time.{name}", **parse_importtime(result.stderr))
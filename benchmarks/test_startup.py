@@ -0,0 +1,60 @@
+"""
+Startup benchmarks: how long it takes to load the WSGI application, and how the first request
+of a fresh process compares to the hundredth, with and without the warm-up of bootstrap.py.
+
+Every measurement runs in a new Python process, against the (already seeded) test database.
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks.utils import database_env
+
+SCRIPT = """
+import json, sys, time
+
+start = time.perf_counter()
+from beheeromgeving.wsgi import application
+from beheeromgeving.bootstrap import wsgi_get
+
+loaded = time.perf_counter() - start
+durations = []
+for _ in range(100):
+    start = time.perf_counter()
+    assert wsgi_get(application, sys.argv[1]) == 200
+    durations.append(time.perf_counter() - start)
+print(json.dumps({
+    "startup": loaded,
+    "first_request": durations[0],
+    "second_request": durations[1],
+    "hundredth_request": durations[-1],
+}))
+"""
+
+
+def run_process(path: str, *, warm_up: bool) -> dict[str, float]:
+    env = {**database_env(), "WARM_UP": str(warm_up)}
+    result = subprocess.run(  # noqa: S603 (a fixed script)
+        [sys.executable, "-c", SCRIPT, path],
+        env=env,
+        cwd=Path(__file__).parents[1],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    # The JSON comes last, after whatever the application logged.
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize("path", ["/products?pagesize=20", "/teams"])
+@pytest.mark.parametrize("warm_up", [False, True], ids=["cold", "warm"])
+def test_startup(benchmark_report, catalogue, path, warm_up):
+    timings = run_process(path, warm_up=warm_up)
+    name = path.strip("/").split("?")[0]
+    benchmark_report.add(
+        f"startup.{name}.{'warm' if warm_up else 'cold'}.{catalogue.size}", **timings
+    )
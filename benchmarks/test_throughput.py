@@ -0,0 +1,144 @@
+"""
+Throughput benchmarks: requests per second at high concurrency, of the WSGI application under
+uWSGI (see the Dockerfile) and of the ASGI application (see asgi.py) under uvicorn.
+
+Both servers run in their own process with the same number of workers, against the (already
+seeded) test database, and get the same load: CONCURRENCY clients that do requests
+back-to-back for DURATION seconds. The load is generated by threads of this process, so it
+compares the servers rather than measuring their limits. uvicorn isn't a dependency of the
+project, the ASGI benchmarks are skipped when it isn't installed.
+"""
+
+import importlib.util
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+from benchmarks.utils import database_env
+
+WORKERS = 4
+CONCURRENCY = 64
+DURATION = 10
+
+PATHS = {
+    "products": "/products?pagesize=20",
+    "product_detail": "/products/{product}",
+    "teams": "/teams",
+}
+
+SERVERS = {
+    "uwsgi": [
+        "uwsgi",
+        "--http-socket=127.0.0.1:{port}",
+        "--module=beheeromgeving.wsgi:application",
+        "--master",
+        f"--processes={WORKERS}",
+        "--die-on-term",
+        "--disable-logging",
+    ],
+    "uvicorn": [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "beheeromgeving.asgi:application",
+        "--port={port}",
+        f"--workers={WORKERS}",
+        "--no-access-log",
+    ],
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(url: str) -> int:
+    with urllib.request.urlopen(url, timeout=30) as response:  # noqa: S310 (a local server)
+        response.read()
+        return response.status
+
+
+@contextmanager
+def serve(server: str) -> Iterator[str]:
+    """Start the server, and yield its URL once it's serving requests."""
+    port = free_port()
+    process = subprocess.Popen(  # noqa: S603 (a fixed command)
+        [part.format(port=port) for part in SERVERS[server]],
+        env={**database_env(), "WARM_UP": "true"},
+        cwd=Path(__file__).parents[1],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                get(f"{url}/pulse")
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"{server} did not start") from None
+                time.sleep(0.2)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def load(url: str) -> dict[str, float]:
+    """Do requests to url from CONCURRENCY threads for DURATION seconds."""
+    latencies: list[float] = []
+    errors: list[Exception] = []
+    deadline = time.perf_counter() + DURATION
+
+    def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                get(url)
+            except OSError as e:
+                errors.append(e)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        for future in [pool.submit(client) for _ in range(CONCURRENCY)]:
+            future.result()
+
+    latencies.sort()
+    return {
+        "concurrency": CONCURRENCY,
+        "requests_per_second": len(latencies) / DURATION,
+        "median": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "max": latencies[-1],
+        "errors": len(errors),
+    }
+
+
+@pytest.mark.parametrize("name,path", PATHS.items())
+@pytest.mark.parametrize("server", SERVERS)
+def test_throughput(benchmark_report, catalogue, server, name, path):
+    if server == "uwsgi" and shutil.which("uwsgi") is None:
+        pytest.skip("uwsgi is not installed.")
+    if server == "uvicorn" and importlib.util.find_spec("uvicorn") is None:
+        pytest.skip("uvicorn is not installed.")
+
+    path = path.format(product=catalogue.published[len(catalogue.published) // 2])
+    with serve(server) as url:
+        assert get(f"{url}{path}") == 200
+        result = load(f"{url}{path}")
+    benchmark_report.add(f"throughput.{server}.{name}.{catalogue.size}", **result)
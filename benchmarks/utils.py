@@ -0,0 +1,96 @@
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@dataclass
+class Timing:
+    """Wall clock durations (in seconds) of a number of rounds of the same operation."""
+
+    rounds: int
+    min: float
+    median: float
+    mean: float
+    max: float
+
+
+def measure(func: Callable[[], Any], *, rounds: int = 5, warmup: int = 1) -> Timing:
+    """Call func a couple of times and report how long it took.
+
+    The warmup calls are not measured, so one-off costs (building pydantic serializers, filling
+    caches, etc.) don't skew the results.
+    """
+    for _ in range(warmup):
+        func()
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return Timing(
+        rounds=rounds,
+        min=min(durations),
+        median=statistics.median(durations),
+        mean=statistics.fmean(durations),
+        max=max(durations),
+    )
+
+
+def count_queries(func: Callable[[], Any]) -> int:
+    """The number of SQL queries a single call of func does."""
+    with CaptureQueriesContext(connection) as queries:
+        func()
+    return len(queries)
+
+
+def peak_memory(func: Callable[[], Any]) -> int:
+    """The peak of memory (in bytes) allocated during a single call of func."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def database_env() -> dict[str, str]:
+    """The environment for a subprocess that uses the (seeded) test database."""
+    db = connection.settings_dict
+    credentials = f"{db['USER']}:{db['PASSWORD'] or ''}"
+    return {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "tests.settings",
+        "DATABASE_URL": (f"postgres://{credentials}@{db['HOST']}:{db['PORT']}/{db['NAME']}"),
+    }
+
+
+def profile(func: Callable[[], Any], *, rounds: int = 5, warmup: int = 1) -> dict[str, Any]:
+    """Latency, query count and peak memory of func, to add to a BenchmarkReport."""
+    return {
+        **asdict(measure(func, rounds=rounds, warmup=warmup)),
+        "queries": count_queries(func),
+        "peak_memory": peak_memory(func),
+    }
+
+
+@dataclass
+class BenchmarkReport:
+    """Collects the results of a benchmark run, so they can be written to a JSON file and
+    compared between releases."""
+
+    results: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    def add(self, name: str, timing: Timing | None = None, **metrics: Any) -> None:
+        self.results[name] = {**(asdict(timing) if timing else {}), **metrics}
+
+    def write(self, path: Path) -> None:
+        path.write_text(json.dumps({"results": self.results}, indent=2, sort_keys=True) + "\n")
@@ -1,14 +1,21 @@
 import base64
 import binascii
-from collections.abc import Sequence
+from collections.abc import Callable, Collection, Sequence
 from datetime import date, datetime
-from typing import TYPE_CHECKING, Literal, overload
+from enum import Enum
+from functools import cache, partial
+from operator import attrgetter
+from types import UnionType
+from typing import TYPE_CHECKING, Any, Literal, NamedTuple, Union, get_args, get_origin, overload
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
 
+from beheeromgeving.instrumentation import timed
+from beheeromgeving.safe_urls import check_url
 from domain.base import BaseObject
 from domain.product import enums, objects
 from domain.team import Team as DomainTeam
+from domain.webhook import WebhookSubscription as DomainWebhookSubscription
 
 if TYPE_CHECKING:
     from beheeromgeving.models import DataContract as ORMDataContract
@@ -16,48 +23,195 @@ if TYPE_CHECKING:
 
 
 @overload
-def to_response_object(obj: Sequence[BaseObject], dto_type: str | None = None) -> list[dict]: ...
+def to_response_object(
+    obj: Sequence[BaseObject],
+    dto_type: str | None = None,
+    fields: Collection[str] | None = None,
+) -> list[dict]: ...
 
 
 @overload
-def to_response_object(obj: BaseObject, dto_type: str | None = None) -> dict: ...
+def to_response_object(
+    obj: BaseObject, dto_type: str | None = None, fields: Collection[str] | None = None
+) -> dict: ...
 
 
+@timed("serialization")
 def to_response_object(
-    obj: BaseObject | Sequence[BaseObject], dto_type: str | None = None
+    obj: BaseObject | Sequence[BaseObject],
+    dto_type: str | None = None,
+    fields: Collection[str] | None = None,
 ) -> dict | list[dict]:
+    """Convert domain object(s) to response data, optionally limited to the given fields."""
+    include = set(fields) if fields is not None else None
     if not isinstance(obj, BaseObject):
-        return [to_dto(el, dto_type=dto_type or "list").model_dump() for el in obj]
-    return to_dto(obj, dto_type=dto_type or "detail").model_dump()
-
-
-def to_dto(domain_object: BaseObject, dto_type: str = "detail") -> BaseModel:
-    OBJECT_MAPPING: dict[type[BaseObject], dict[str, type[BaseModel]]] = {
-        DomainTeam: {
-            "detail": Team,
-            "list": TeamList,
-            "me": TeamList,
-        },
-        objects.DataContract: {
-            "detail": DataContract,
-            "list": DataContractList,
-        },
-        objects.Product: {
-            "detail": ProductDetail,
-            "list": ProductList,
-            "me": MyProduct,
-        },
-        objects.DataService: {
-            "detail": DataService,
-            "list": DataService,
-        },
-        objects.Distribution: {
-            "detail": Distribution,
-            "list": Distribution,
-        },
+        return [
+            to_dto(el, dto_type=dto_type or "list", fields=fields).model_dump(include=include)
+            for el in obj
+        ]
+    return to_dto(obj, dto_type=dto_type or "detail", fields=fields).model_dump(include=include)
+
+
+def to_dto(
+    domain_object: BaseObject, dto_type: str = "detail", fields: Collection[str] | None = None
+) -> BaseModel:
+    """Convert a domain object to the DTO used for the response.
+
+    Domain objects are always read from (or just persisted to) our own database, so they are
+    not validated again. Incoming payloads are validated by instantiating the DTO directly.
+    """
+    dto_model = DTO_MAPPING[type(domain_object)][dto_type]
+    return construct(dto_model, domain_object, fields=fields)
+
+
+def construct[BM: BaseModel](
+    dto_model: type[BM], source: object, fields: Collection[str] | None = None
+) -> BM:
+    """Build a DTO from the attributes of a trusted object, without validation.
+
+    Nested DTOs are constructed recursively. Fields that don't exist on the source object
+    get their default value. If fields is given, only those (top-level) attributes are read,
+    so computed properties that aren't asked for are never evaluated. The field validators
+    of the DTO still shape the values (e.g. cast_to_id and decode_base64_description), and
+    raw values are converted to the enums of the fields (e.g. "P" to PUBLISHED), like they
+    would be when it's validated.
+    """
+    values = {}
+    for plan in _construct_plan(dto_model):
+        if fields is not None and plan.name not in fields:
+            continue
+        value = getattr(source, plan.name, _MISSING)
+        if value is _MISSING:
+            continue
+        for validator in plan.before:
+            value = validator(value)
+        if plan.nested_model is not None and value is not None:
+            value = (
+                [construct(plan.nested_model, item) for item in value]
+                if plan.is_list
+                else construct(plan.nested_model, value)
+            )
+        elif plan.convert is not None:
+            value = plan.convert(value)
+        for validator in plan.after:
+            value = validator(value)
+        values[plan.name] = value
+    return dto_model.model_construct(**values)
+
+
+_MISSING = object()
+
+
+class _FieldPlan(NamedTuple):
+    name: str
+    nested_model: type[BaseModel] | None
+    is_list: bool
+    # Converts a raw value to the type of the field, if it has to be, see _conversion.
+    convert: Callable[[Any], Any] | None
+    # The field validators of the DTO that run before and after the value is validated.
+    before: tuple[Callable[[Any], Any], ...]
+    after: tuple[Callable[[Any], Any], ...]
+
+
+@cache
+def _construct_plan(dto_model: type[BaseModel]) -> tuple[_FieldPlan, ...]:
+    """The fields of a DTO, with the nested DTO type (and whether it is a list) if any, the
+    conversion of their values and their field validators.
+
+    Computed once per DTO, so construction doesn't need to inspect annotations per object.
+    """
+    return tuple(
+        _FieldPlan(
+            name,
+            *_nested_model(field.annotation),
+            convert=_conversion(field.annotation),
+            before=_field_validators(dto_model, name, "before"),
+            after=_field_validators(dto_model, name, "after"),
+        )
+        for name, field in dto_model.model_fields.items()
+    )
+
+
+def _field_validators(
+    dto_model: type[BaseModel], name: str, mode: str
+) -> tuple[Callable[[Any], Any], ...]:
+    """The field validators of the DTO for the field, bound to the DTO. Those of this module
+    only take the value."""
+    return tuple(
+        getattr(dto_model, decorator.cls_var_name)
+        for decorator in dto_model.__pydantic_decorators__.field_validators.values()
+        if name in decorator.info.fields and decorator.info.mode == mode
+    )
+
+
+@cache
+def _conversions(dto_model: type[BaseModel]) -> dict[str, Callable[[Any], Any]]:
+    return {plan.name: plan.convert for plan in _construct_plan(dto_model) if plan.convert}
+
+
+def _converted(dto_model: type[BaseModel], values: dict[str, Any]) -> dict[str, Any]:
+    """The values for model_construct, converted to the types of the fields of the DTO."""
+    conversions = _conversions(dto_model)
+    return {
+        name: conversions[name](value) if name in conversions else value
+        for name, value in values.items()
     }
-    dto_model = OBJECT_MAPPING[type(domain_object)][dto_type]
-    return dto_model.model_validate(domain_object)
+
+
+def _conversion(annotation) -> Callable[[Any], Any] | None:
+    """How a raw value is converted to the enum(s) in the type of a field, like validation
+    would, or None if the type has no enums. Serializing an enum field that holds e.g. "P"
+    instead of PublicationStatus.PUBLISHED makes pydantic warn about an unexpected type."""
+    origin = get_origin(annotation)
+    args = [arg for arg in get_args(annotation) if arg is not type(None)]
+    if origin in (Union, UnionType):
+        if all(_is_enum(arg) for arg in args):
+            return partial(_to_enum, tuple(args))
+        return _conversion(args[0]) if len(args) == 1 else None
+    if origin is list and (convert := _conversion(args[0])):
+        return partial(_convert_items, convert)
+    if origin is dict and (convert := _conversion(args[1])):
+        return partial(_convert_values, convert)
+    if _is_enum(annotation):
+        return partial(_to_enum, (annotation,))
+    return None
+
+
+def _is_enum(annotation) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, Enum)
+
+
+def _to_enum(enum_types: tuple[type[Enum], ...], value):
+    if value is None or isinstance(value, enum_types):
+        return value
+    for enum_type in enum_types:
+        try:
+            return enum_type(value)
+        except ValueError:
+            continue
+    return value
+
+
+def _convert_items(convert: Callable[[Any], Any], values):
+    return None if values is None else [convert(value) for value in values]
+
+
+def _convert_values(convert: Callable[[Any], Any], values):
+    return None if values is None else {key: convert(value) for key, value in values.items()}
+
+
+def _nested_model(annotation) -> tuple[type[BaseModel] | None, bool]:
+    if get_origin(annotation) in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return None, False
+        annotation = args[0]
+    is_list = get_origin(annotation) is list
+    if is_list:
+        annotation = get_args(annotation)[0]
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, is_list
+    return None, False
 
 
 class ModelMixin:
@@ -209,14 +363,19 @@ class MyContract(ModelMixin, BaseModel):
 
     @classmethod
     def from_django(cls, contract: ORMDataContract) -> MyContract:
-        return cls(
-            id=contract.pk,
-            name=contract.name,
-            privacy_level=contract.privacy_level,
-            confidentiality=contract.confidentiality,
-            last_updated=contract.last_updated,
-            publication_status=contract.publication_status,
-            has_revision=hasattr(contract, "revision"),
+        return cls.model_construct(
+            **_converted(
+                cls,
+                {
+                    "id": contract.pk,
+                    "name": contract.name,
+                    "privacy_level": contract.privacy_level,
+                    "confidentiality": contract.confidentiality,
+                    "last_updated": contract.last_updated,
+                    "publication_status": contract.publication_status,
+                    "has_revision": hasattr(contract, "revision"),
+                },
+            )
         )
 
 
@@ -234,16 +393,24 @@ class MyProduct(ModelMixin, BaseModel):
 
     @classmethod
     def from_django(cls, product: ORMProduct) -> MyProduct:
-        return cls(
-            id=product.pk,
-            team_id=product.team.pk,
-            name=product.name,
-            other_identifier=product.other_identifier,
-            type=product.type,
-            last_updated=product.last_updated,
-            publication_status=product.publication_status,
-            has_revision=hasattr(product, "revision"),
-            contracts=[MyContract.from_django(c) for c in product.contracts.order_by("id")],
+        return cls.model_construct(
+            **_converted(
+                cls,
+                {
+                    "id": product.pk,
+                    "team_id": product.team.pk,
+                    "name": product.name,
+                    "other_identifier": product.other_identifier,
+                    "type": product.type,
+                    "last_updated": product.last_updated,
+                    "publication_status": product.publication_status,
+                    "has_revision": hasattr(product, "revision"),
+                    "contracts": [
+                        MyContract.from_django(c)
+                        for c in sorted(product.contracts.all(), key=attrgetter("pk"))
+                    ],
+                },
+            )
         )
 
 
@@ -360,37 +527,55 @@ class ProductList(ModelMixin, BaseModel):
     endorsement: enums.EndorsementLevel | None = None
 
     @classmethod
-    def from_django(cls, product: ORMProduct) -> ProductList:
-        return cls(
-            id=product.pk,
-            name=product.name,
-            description=product.description,
-            other_identifier=product.other_identifier,
-            type=product.type,
-            owner=product.owner,
-            themes=product.themes,
-            last_updated=product.last_updated,
-            language=product.language,
-            is_geo=product.is_geo,
-            schema_url=product.schema_url,
-            publication_status=product.publication_status,
-            contract_count=product.contracts.filter(
-                publication_status=enums.PublicationStatus.PUBLISHED.value
-            ).count(),
-            team_id=product.team.pk,
-            endorsement=product.endorsement,
-            summary={
-                "services": [s.type for s in product.services.all() if s.type is not None],
-                "distributions": [
-                    d.type
-                    for c in product.contracts.all()
-                    for d in c.distributions.all()
-                    if d.type is not None and d.type != enums.DistributionType.API.value
-                ],
-            },
+    def from_django(
+        cls, product: ORMProduct, fields: Collection[str] | None = None
+    ) -> ProductList:
+        """Build the DTO from a product fetched by `ProductRepository.list_for_publication_status`.
+
+        Only the requested fields are read from the product, so columns and relations that
+        were not fetched for them are never touched.
+        """
+        getters = PRODUCT_LIST_GETTERS
+        names = getters.keys() if fields is None else [f for f in fields if f in getters]
+        return cls.model_construct(
+            **_converted(cls, {name: getters[name](product) for name in names})
         )
 
 
+def _product_summary(product: ORMProduct) -> dict[str, list[str]]:
+    return {
+        "services": [s.type for s in product.services.all() if s.type is not None],
+        "distributions": [
+            d.type
+            for c in product.contracts.all()
+            for d in c.distributions.all()
+            if d.type is not None and d.type != enums.DistributionType.API.value
+        ],
+    }
+
+
+# How to read each ProductList field from a product. The `contract_count` is annotated
+# by the repository.
+PRODUCT_LIST_GETTERS: dict[str, Callable[[ORMProduct], Any]] = {
+    "id": attrgetter("pk"),
+    "name": attrgetter("name"),
+    "description": attrgetter("description"),
+    "other_identifier": attrgetter("other_identifier"),
+    "type": attrgetter("type"),
+    "owner": attrgetter("owner"),
+    "themes": attrgetter("themes"),
+    "last_updated": attrgetter("last_updated"),
+    "language": attrgetter("language"),
+    "summary": _product_summary,
+    "is_geo": attrgetter("is_geo"),
+    "schema_url": attrgetter("schema_url"),
+    "publication_status": attrgetter("publication_status"),
+    "contract_count": attrgetter("contract_count"),
+    "team_id": attrgetter("team_id"),
+    "endorsement": attrgetter("endorsement"),
+}
+
+
 class PaginatedResponse[T](BaseModel):
     count: int
     next: str | None
@@ -483,3 +668,176 @@ class ProductQueryParams(BaseModel):
         elif self.has_schema_url is False:
             return {"schema_url__regex": r"schema"}
         return {}
+
+
+class ProductDetailQueryParams(BaseModel):
+    fields: list[str] | None = None
+    include: set[Literal["contracts", "contracts.distributions", "services"]] | None = None
+
+    @field_validator("fields", mode="before")
+    def validate_fields(cls, raw):
+        if raw == "*":
+            return None
+        return ["id"] + raw.split(",")
+
+    @field_validator("include", mode="before")
+    def validate_include(cls, raw):
+        if raw == "":
+            return set()
+        return raw.split(",")
+
+    @property
+    def relations(self) -> set[str] | None:
+        """The relations of the product to fetch, or None if all of them are needed."""
+        if self.fields is None and self.include is None:
+            return None
+        relations = (
+            set(objects.PRODUCT_RELATIONS)
+            if self.include is None
+            else {*self.include, "sources", "sinks"}
+        )
+        if "contracts.distributions" in relations:
+            relations.add("contracts")
+        if self.fields is not None:
+            relations = {r for r in relations if r.split(".")[0] in self.fields}
+        return relations
+
+    @property
+    def with_revision_url(self) -> bool:
+        return self.fields is None or "revision_url" in self.fields
+
+    @property
+    def read_fields(self) -> set[str] | None:
+        """The fields to read from the product, including those the revision_url is based on."""
+        if self.fields is None:
+            return None
+        read_fields = set(self.fields)
+        if self.with_revision_url:
+            read_fields |= {"has_revision", "publication_status"}
+        return read_fields
+
+    def select(self, data: dict) -> dict:
+        """Limit the response data to the requested fields and included relations."""
+        if self.fields is not None:
+            data = {key: value for key, value in data.items() if key in self.fields}
+        if self.include is not None:
+            if not self.include & {"contracts", "contracts.distributions"}:
+                data.pop("contracts", None)
+            elif "contracts.distributions" not in self.include:
+                for contract in data.get("contracts") or []:
+                    contract.pop("distributions", None)
+            if "services" not in self.include:
+                data.pop("services", None)
+        return data
+
+
+class LineageQueryParams(BaseModel):
+    direction: enums.LineageDirection = enums.LineageDirection.DOWNSTREAM
+    depth: int = Field(default=3, ge=1, le=10)
+
+
+class LineageNode(BaseModel):
+    id: int
+    name: str | None = None
+    team_id: int | None = None
+    publication_status: enums.PublicationStatus | None = None
+    depth: int
+
+
+class LineageEdge(BaseModel):
+    source: int
+    sink: int
+
+
+class Lineage(BaseModel):
+    product_id: int
+    direction: enums.LineageDirection
+    depth: int
+    nodes: list[LineageNode]
+    edges: list[LineageEdge]
+
+
+class ChangeQueryParams(BaseModel):
+    since: int = Field(default=0, ge=0)
+    limit: int = Field(default=100, ge=1, le=1000)
+
+
+class Change(BaseModel):
+    id: int
+    created_at: datetime
+    object_type: enums.ChangeObjectType
+    event: enums.ChangeEvent
+    product_id: int
+    contract_id: int | None = None
+    publication_status: enums.PublicationStatus | None = None
+    previous_publication_status: enums.PublicationStatus | None = None
+
+
+class ChangeFeed(BaseModel):
+    changes: list[Change]
+    cursor: int
+    has_more: bool
+
+
+class WebhookSubscriptionCreate(ModelMixin, BaseModel):
+    url: str
+    team_id: int | None = None
+    event_types: list[enums.ChangeEvent] = Field(default_factory=list)
+    publication_statuses: list[enums.PublicationStatus] = Field(
+        default_factory=lambda: [enums.PublicationStatus.PUBLISHED]
+    )
+
+    @field_validator("url")
+    def validate_url(cls, v: str):
+        if not v.startswith("https://"):
+            raise ValueError("The url of a webhook must be an https url.")
+        check_url(v)
+        return v
+
+
+class WebhookSubscription(IdMixin, WebhookSubscriptionCreate):
+    created_at: datetime
+
+
+class WebhookSubscriptionWithSecret(WebhookSubscription):
+    """Only returned when a subscription is created, the secret is never shown again."""
+
+    secret: str
+
+
+# Which DTO to use for each domain object, per type of response.
+DTO_MAPPING: dict[type[BaseObject], dict[str, type[BaseModel]]] = {
+    DomainTeam: {
+        "detail": Team,
+        "list": TeamList,
+        "me": TeamList,
+    },
+    objects.DataContract: {
+        "detail": DataContract,
+        "list": DataContractList,
+    },
+    objects.Product: {
+        "detail": ProductDetail,
+        "list": ProductList,
+        "me": MyProduct,
+    },
+    objects.DataService: {
+        "detail": DataService,
+        "list": DataService,
+    },
+    objects.Distribution: {
+        "detail": Distribution,
+        "list": Distribution,
+    },
+    objects.Lineage: {
+        "detail": Lineage,
+    },
+    objects.ChangeFeed: {
+        "detail": ChangeFeed,
+    },
+    DomainWebhookSubscription: {
+        "detail": WebhookSubscription,
+        "list": WebhookSubscription,
+        "created": WebhookSubscriptionWithSecret,
+    },
+}
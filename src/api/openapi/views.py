@@ -0,0 +1,66 @@
+"""
+Cached OpenAPI schema views.
+
+Generating the schema introspects every view and DTO, which costs hundreds of milliseconds,
+while the schema only changes with a deploy. So it's generated once per format (and
+language) and served with an ETag, so clients can revalidate without downloading it again.
+Its compressed variants are kept along with it, see beheeromgeving/compression.py.
+"""
+
+import hashlib
+from dataclasses import dataclass
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from drf_spectacular.views import SpectacularJSONAPIView, SpectacularYAMLAPIView
+
+from beheeromgeving.compression import CompressedContent, compressed_response
+
+
+@dataclass(frozen=True)
+class RenderedSchema:
+    content: CompressedContent
+    content_type: str
+    content_disposition: str
+    etag: str
+
+
+_schemas: dict[tuple, RenderedSchema] = {}
+
+
+class CachedSchemaMixin:
+    def get(self, request, *args, **kwargs):
+        key = (type(self), request.accepted_media_type, request.GET.get("lang"))
+        schema = _schemas.get(key)
+        if schema is None:
+            schema = _schemas[key] = self._render(super().get(request, *args, **kwargs))
+
+        response = compressed_response(
+            request,
+            schema.content,
+            content_type=schema.content_type,
+            headers={"Content-Disposition": schema.content_disposition, "ETag": schema.etag},
+        )
+        # Clients may keep it, but should check the ETag, the schema changes with a deploy.
+        patch_cache_control(response, public=True, no_cache=True)
+        return get_conditional_response(request, etag=schema.etag, response=response)
+
+    def _render(self, response) -> RenderedSchema:
+        response.accepted_renderer = self.request.accepted_renderer
+        response.accepted_media_type = self.request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        content = response.rendered_content
+        return RenderedSchema(
+            content=CompressedContent(content),
+            content_type=response["Content-Type"],
+            content_disposition=response["Content-Disposition"],
+            etag=quote_etag(hashlib.sha256(content).hexdigest()),
+        )
+
+
+class CachedSpectacularJSONAPIView(CachedSchemaMixin, SpectacularJSONAPIView):
+    pass
+
+
+class CachedSpectacularYAMLAPIView(CachedSchemaMixin, SpectacularYAMLAPIView):
+    pass
@@ -0,0 +1,11 @@
+from rest_framework import renderers
+
+from beheeromgeving.instrumentation import timed
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """The regular JSONRenderer, which adds its time to the serialization metrics."""
+
+    @timed("serialization")
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(data, accepted_media_type, renderer_context)
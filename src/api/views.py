@@ -1,5 +1,9 @@
-from typing import overload
+from functools import wraps
+from typing import Any, overload
 
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
 from drf_spectacular.utils import OpenApiParameter, extend_schema
 from pydantic import BaseModel, ValidationError
 from rest_framework.decorators import action, api_view
@@ -9,10 +13,8 @@ from rest_framework.viewsets import ViewSet
 
 from api import datatransferobjects as dtos
 from api.pagination import NotFound, Pagination
+from api.renderers import JSONRenderer
 from domain import exceptions
-from domain.auth import AuthorizationRepository, AuthorizationService, authorize
-from domain.product import ProductQueryHandler, ProductRepository, ProductService
-from domain.team import TeamRepository, TeamService
 
 
 @api_view(["GET"])
@@ -20,56 +22,38 @@ def health(request):
     return Response({"status": "OK"})
 
 
+HANDLED_EXCEPTIONS = (ValidationError, exceptions.DomainException, NotFound)
+
+
+def error_response(e: Exception) -> tuple[int, Any]:
+    """The status and data of the response for an exception, unknown exceptions are raised."""
+    match e:
+        case ValidationError():
+            return 400, str(e)
+        case exceptions.ValidationError():
+            return 400, e.message
+        case exceptions.IllegalOperation():
+            return 400, e.message
+        case exceptions.NotAuthenticated():
+            return 401, e.message
+        case exceptions.NotAuthorized():
+            return 403, e.message
+        case exceptions.ObjectDoesNotExist():
+            return 404, e.message
+        case NotFound():
+            return 404, e.detail
+        case exceptions.DomainException():
+            return 500, e.message
+    raise e
+
+
 class ExceptionHandlerMixin:
     def handle_exception(self, e):
-        match e:
-            case ValidationError():
-                return Response(status=400, data=str(e))
-            case exceptions.ValidationError():
-                return Response(status=400, data=e.message)
-            case exceptions.IllegalOperation():
-                return Response(status=400, data=e.message)
-            case exceptions.NotAuthenticated():
-                return Response(status=401, data=e.message)
-            case exceptions.NotAuthorized():
-                return Response(status=403, data=e.message)
-            case exceptions.ObjectDoesNotExist():
-                return Response(status=404, data=e.message)
-            case NotFound():
-                return Response(status=404, data=e.detail)
-            case exceptions.DomainException():
-                return Response(status=500, data=e.message)
-        raise e
-
-
-auth_service: AuthorizationService
-product_service: ProductService
-product_query_handler: ProductQueryHandler
-team_service: TeamService
-is_initialized = False
-
-
-def initialize():
-    """
-    Instantiate all necessary services. ViewSets are instantiated for each request,
-    so we share the same services throughout the lifecycle of the application.
-    """
-    global auth_service, product_service, product_query_handler, team_service
-    auth_service = AuthorizationService(AuthorizationRepository())
-    authorize.set_auth_service(auth_service)
-    product_service = ProductService(repo=ProductRepository())
-    product_query_handler = ProductQueryHandler(ProductRepository())
-    team_service = TeamService(repo=TeamRepository())
+        status, data = error_response(e)
+        return Response(status=status, data=data)
 
 
 class TeamViewSet(ExceptionHandlerMixin, ViewSet):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        global is_initialized
-        if not is_initialized:
-            initialize()
-            is_initialized = True
-
     @overload
     def _validate_dto(self, data) -> dtos.TeamCreate: ...
     @overload
@@ -91,26 +75,19 @@ class TeamViewSet(ExceptionHandlerMixin, ViewSet):
     )
     def list(self, request: Request):
         qp = dtos.TeamQueryParams(**request.query_params.dict())
-        teams = team_service.get_teams()
-        if qp.has_published_products is not None:
-            teams = [
-                team
-                for team in teams
-                if (qp.has_published_products and team.product_count)
-                or (not qp.has_published_products and team.product_count == 0)
-            ]
+        teams = _filter_teams(request.services.teams.get_teams(), qp.has_published_products)
         data = dtos.to_response_object(teams)
         return Response(data, status=200)
 
     @extend_schema(responses={200: dtos.Team})
-    def retrieve(self, _request, pk: str):
-        team = team_service.get_team(int(pk))
+    def retrieve(self, request, pk: str):
+        team = request.services.teams.get_team(int(pk))
         return Response(dtos.to_response_object(team), status=200)
 
     @extend_schema(responses={200: dtos.TeamCreate})
     def create(self, request):
         team_dto = self._validate_dto(request.data)
-        team = team_service.create_team(
+        team = request.services.teams.create_team(
             data=team_dto.model_dump(), scopes=request.get_token_scopes
         )
         return Response(status=201, data=team.id)
@@ -118,7 +95,7 @@ class TeamViewSet(ExceptionHandlerMixin, ViewSet):
     @extend_schema(responses={200: dtos.TeamPartial})
     def partial_update(self, request, pk: str):
         team_dto = self._validate_dto(request.data, dtos.TeamPartial)
-        team_service.update_team(
+        request.services.teams.update_team(
             team_id=int(pk),
             data=team_dto.model_dump(exclude_unset=True),
             scopes=request.get_token_scopes,
@@ -127,18 +104,11 @@ class TeamViewSet(ExceptionHandlerMixin, ViewSet):
 
     @extend_schema()
     def destroy(self, request, pk: str):
-        team_service.delete_team(int(pk), scopes=request.get_token_scopes)
+        request.services.teams.delete_team(int(pk), scopes=request.get_token_scopes)
         return Response(status=204)
 
 
 class ProductViewSet(ExceptionHandlerMixin, ViewSet):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        global is_initialized
-        if not is_initialized:
-            initialize()
-            is_initialized = True
-
     @overload
     def _validate_dto(self, data) -> dtos.ProductCreate: ...
 
@@ -149,15 +119,6 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         # Raises if data is invalid
         return dto_type(**data)
 
-    def _attach_revision_metadata(self, *, request, data: dict, base_path: str):
-        path = (
-            f"{base_path}/revision"
-            if data["has_revision"] or data["publication_status"] == "P"
-            else base_path
-        )
-        data["revision_url"] = request.build_absolute_uri(path)
-        return data
-
     @extend_schema(
         responses={200: dtos.PaginatedResponse[dtos.ProductList]},
         parameters=[
@@ -206,18 +167,15 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         ],
     )
     def list(self, request):
-        query_params = request.query_params.dict()
-        # List view can only see published items.
-        query_params["publication_status"] = "P"
-        params = self._validate_dto(data=query_params, dto_type=dtos.ProductQueryParams)
+        params = _product_list_params(request)
         if params.name:
-            product = product_service.get_product_by_name(
+            product = request.services.products.get_product_by_name(
                 name=params.name, scopes=request.get_token_scopes
             )
             data = dtos.to_response_object(product)
             return Response(data, status=200)
 
-        data = product_query_handler.list_products(
+        data = request.services.product_queries.list_products(
             scopes=request.get_token_scopes,
             query=params.query,
             filter=params.filter,
@@ -235,24 +193,40 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         description="Returns the live product state. If a revision exists, the response "
         "includes revision discoverability metadata so clients can navigate to the explicit "
         "revision endpoint intentionally.",
+        parameters=[
+            OpenApiParameter(
+                "fields",
+                description="Comma-separated list of fields to include in the response. "
+                "Use '*' or omit to include all fields.",
+            ),
+            OpenApiParameter(
+                "include",
+                description="Comma-separated list of relations to include in the response: "
+                "contracts, contracts.distributions and/or services. Omit to include all.",
+            ),
+        ],
     )
     def retrieve(self, request, pk: str):
-        product = product_service.get_product(product_id=int(pk), scopes=request.get_token_scopes)
-        data = dtos.to_response_object(product)
-        return Response(
-            self._attach_revision_metadata(
+        params = self._validate_dto(
+            data=request.query_params.dict(), dto_type=dtos.ProductDetailQueryParams
+        )
+        product = request.services.products.get_product(
+            product_id=int(pk), scopes=request.get_token_scopes, include=params.relations
+        )
+        data = dtos.to_response_object(product, fields=params.read_fields)
+        if params.with_revision_url:
+            data = _attach_revision_metadata(
                 request=request,
                 data=data,
                 base_path=f"/products/{pk}",
-            ),
-            status=200,
-        )
+            )
+        return Response(params.select(data), status=200)
 
     @extend_schema(request=dtos.ProductCreate, responses={200: dtos.ProductDetail})
     def create(self, request):
         product_dto = self._validate_dto(request.data)
         # ignore contracts/service as these should be created through their own endpoint
-        product = product_service.create_product(
+        product = request.services.products.create_product(
             data=product_dto.model_dump(exclude={"contracts", "services"}),
             scopes=request.get_token_scopes,
         )
@@ -263,7 +237,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         product_dto = self._validate_dto(request.data, dto_type=dtos.ProductUpdate)
         last_editor = self._get_last_editor(request)
         # ignore contracts/service as these should be updated through their own endpoint
-        product = product_service.update_product(
+        product = request.services.products.update_product(
             product_id=int(pk),
             data=product_dto.model_dump(exclude_unset=True, exclude={"contracts", "services"}),
             scopes=request.get_token_scopes,
@@ -271,6 +245,36 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         )
         return Response(dtos.to_response_object(product), status=200)
 
+    @extend_schema(
+        responses={200: dtos.Lineage},
+        description="Returns the products upstream (sources) or downstream (sinks) of the "
+        "product as a graph of nodes and edges. Only products the caller may read are included.",
+        parameters=[
+            OpenApiParameter(
+                "direction",
+                description="Follow the sources (upstream) or sinks (downstream) of the product.",
+                default="downstream",
+            ),
+            OpenApiParameter(
+                "depth",
+                description="Maximum number of hops from the product. Max = 10.",
+                default=3,
+            ),
+        ],
+    )
+    @action(detail=True, methods=["get"], url_path="lineage", url_name="lineage")
+    def lineage(self, request, pk: str):
+        params = self._validate_dto(
+            data=request.query_params.dict(), dto_type=dtos.LineageQueryParams
+        )
+        lineage = request.services.products.get_lineage(
+            product_id=int(pk),
+            direction=params.direction,
+            depth=params.depth,
+            scopes=request.get_token_scopes,
+        )
+        return Response(dtos.to_response_object(lineage), status=200)
+
     @extend_schema(
         responses={200: dtos.ProductDetail},
         description="Returns the explicit product revision. Live reads continue to use the "
@@ -278,7 +282,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     )
     @action(detail=True, methods=["get"], url_path="revision", url_name="revision-detail")
     def revision_detail(self, request, pk: str):
-        product = product_service.get_product_revision(
+        product = request.services.products.get_product_revision(
             product_id=int(pk),
             scopes=request.get_token_scopes,
         )
@@ -289,7 +293,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     def update_revision(self, request, pk: str):
         product_dto = self._validate_dto(request.data, dto_type=dtos.ProductUpdate)
         last_editor = self._get_last_editor(request)
-        product = product_service.update_product_revision(
+        product = request.services.products.update_product_revision(
             product_id=int(pk),
             data=product_dto.model_dump(exclude_unset=True, exclude={"contracts", "services"}),
             scopes=request.get_token_scopes,
@@ -300,7 +304,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     @extend_schema(description="Delete a product revision", responses={204: None})
     @revision_detail.mapping.delete
     def delete_revision(self, request, pk: str):
-        product_service.discard_product_revision(
+        request.services.products.discard_product_revision(
             product_id=int(pk),
             scopes=request.get_token_scopes,
         )
@@ -314,7 +318,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         url_name="revision-publish",
     )
     def publish_revision(self, request, pk: str):
-        product = product_service.publish_product_revision(
+        product = request.services.products.publish_product_revision(
             product_id=int(pk),
             scopes=request.get_token_scopes,
         )
@@ -326,7 +330,9 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         'publication_status "X" (deleted) instead of being removed from the database.',
     )
     def destroy(self, request, pk: str):
-        product_service.delete_product(product_id=int(pk), scopes=request.get_token_scopes)
+        request.services.products.delete_product(
+            product_id=int(pk), scopes=request.get_token_scopes
+        )
         return Response(status=204)
 
     @extend_schema(request=dtos.SetState, responses={200: dtos.ProductDetail})
@@ -339,7 +345,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     def set_state(self, request, pk: str):
         state_dto = self._validate_dto(request.data, dto_type=dtos.SetState)
 
-        updated_product = product_service.update_publication_status(
+        updated_product = request.services.products.update_publication_status(
             product_id=int(pk),
             data=state_dto.model_dump(exclude_unset=True),
             scopes=request.get_token_scopes,
@@ -358,7 +364,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     @extend_schema(responses={200: dtos.PaginatedResponse[dtos.DataContractList]})
     @action(detail=True, methods=["get"], url_path="contracts", url_name="contracts-list")
     def contracts_list(self, request, pk: str):
-        contracts = product_service.get_contracts(
+        contracts = request.services.products.get_contracts(
             product_id=int(pk), scopes=request.get_token_scopes
         )
         data = dtos.to_response_object(contracts)
@@ -371,7 +377,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     @contracts_list.mapping.post
     def create_contract(self, request, pk: str):
         contract_dto = self._validate_dto(request.data, dtos.DataContractCreateOrUpdate)
-        contract = product_service.create_contract(
+        contract = request.services.products.create_contract(
             product_id=int(pk),
             data=contract_dto.model_dump(),
             scopes=request.get_token_scopes,
@@ -392,14 +398,14 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         url_name="contract-detail",
     )
     def contract_detail(self, request, pk: str, contract_id: str):
-        contract = product_service.get_contract(
+        contract = request.services.products.get_contract(
             product_id=int(pk),
             contract_id=int(contract_id),
             scopes=request.get_token_scopes,
         )
         data = dtos.to_response_object(contract)
         return Response(
-            self._attach_revision_metadata(
+            _attach_revision_metadata(
                 request=request,
                 data=data,
                 base_path=f"/products/{pk}/contracts/{contract_id}",
@@ -412,7 +418,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     def update_contract(self, request, pk: str, contract_id: str):
         contract_dto = self._validate_dto(request.data, dtos.DataContractCreateOrUpdate)
         last_editor = self._get_last_editor(request)
-        contract = product_service.update_contract(
+        contract = request.services.products.update_contract(
             product_id=int(pk),
             contract_id=int(contract_id),
             data=contract_dto.model_dump(exclude_unset=True),
@@ -434,7 +440,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         url_name="contract-revision-detail",
     )
     def contract_revision_detail(self, request, pk: str, contract_id: str):
-        contract = product_service.get_contract_revision(
+        contract = request.services.products.get_contract_revision(
             product_id=int(pk),
             contract_id=int(contract_id),
             scopes=request.get_token_scopes,
@@ -447,7 +453,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     def update_contract_revision(self, request, pk: str, contract_id: str):
         contract_dto = self._validate_dto(request.data, dtos.DataContractCreateOrUpdate)
         last_editor = self._get_last_editor(request)
-        contract = product_service.update_contract_revision(
+        contract = request.services.products.update_contract_revision(
             product_id=int(pk),
             contract_id=int(contract_id),
             data=contract_dto.model_dump(exclude_unset=True),
@@ -460,7 +466,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     @extend_schema(description="Delete a contract revision", responses={204: None})
     @contract_revision_detail.mapping.delete
     def delete_contract_revision(self, request, pk: str, contract_id: str):
-        product_service.discard_contract_revision(
+        request.services.products.discard_contract_revision(
             product_id=int(pk),
             contract_id=int(contract_id),
             scopes=request.get_token_scopes,
@@ -475,7 +481,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         url_name="contract-revision-publish",
     )
     def publish_contract_revision(self, request, pk: str, contract_id: str):
-        contract = product_service.publish_contract_revision(
+        contract = request.services.products.publish_contract_revision(
             product_id=int(pk),
             contract_id=int(contract_id),
             scopes=request.get_token_scopes,
@@ -493,7 +499,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     def set_state_contract(self, request, pk: str, contract_id: str):
         state_dto = self._validate_dto(request.data, dto_type=dtos.SetState)
 
-        updated_contract = product_service.update_contract_publication_status(
+        updated_contract = request.services.products.update_contract_publication_status(
             product_id=int(pk),
             contract_id=int(contract_id),
             data=state_dto.model_dump(exclude_unset=True),
@@ -509,7 +515,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     )
     @contract_detail.mapping.delete
     def delete_contract(self, request, pk: str, contract_id: str):
-        product_service.delete_contract(
+        request.services.products.delete_contract(
             product_id=int(pk),
             contract_id=int(contract_id),
             scopes=request.get_token_scopes,
@@ -524,7 +530,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         url_name="distributions-list",
     )
     def distributions_list(self, request, pk: str, contract_id: str):
-        distributions = product_service.get_distributions(
+        distributions = request.services.products.get_distributions(
             product_id=int(pk),
             contract_id=int(contract_id),
             scopes=request.get_token_scopes,
@@ -538,7 +544,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         distribution_dto = self._validate_dto(
             request.data, dto_type=dtos.DistributionCreateOrUpdate
         )
-        distribution = product_service.create_distribution(
+        distribution = request.services.products.create_distribution(
             product_id=int(pk),
             contract_id=int(contract_id),
             data=distribution_dto.model_dump(),
@@ -555,7 +561,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         url_name="distributions-detail",
     )
     def distribution_detail(self, request, pk: str, contract_id: str, distribution_id: str):
-        distribution = product_service.get_distribution(
+        distribution = request.services.products.get_distribution(
             product_id=int(pk),
             contract_id=int(contract_id),
             distribution_id=int(distribution_id),
@@ -568,7 +574,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     @distribution_detail.mapping.patch
     def update_distribution(self, request, pk: str, contract_id: str, distribution_id: str):
         distribution_dto = self._validate_dto(request.data, dtos.DistributionCreateOrUpdate)
-        distribution = product_service.update_distribution(
+        distribution = request.services.products.update_distribution(
             product_id=int(pk),
             contract_id=int(contract_id),
             distribution_id=int(distribution_id),
@@ -581,7 +587,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     @extend_schema()
     @distribution_detail.mapping.delete
     def delete_distribution(self, request, pk: str, contract_id: str, distribution_id: str):
-        product_service.delete_distribution(
+        request.services.products.delete_distribution(
             product_id=int(pk),
             contract_id=int(contract_id),
             distribution_id=int(distribution_id),
@@ -592,7 +598,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     @extend_schema(responses={200: dtos.PaginatedResponse[dtos.DataService]})
     @action(detail=True, methods=["get"], url_path="services", url_name="services-list")
     def services_list(self, request, pk: str):
-        services = product_service.get_services(
+        services = request.services.products.get_services(
             product_id=int(pk), scopes=request.get_token_scopes
         )
         data = dtos.to_response_object(services)
@@ -602,7 +608,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     @services_list.mapping.post
     def create_service(self, request, pk: str):
         service_dto = self._validate_dto(request.data, dtos.DataServiceCreateOrUpdate)
-        service = product_service.create_service(
+        service = request.services.products.create_service(
             product_id=int(pk),
             data=service_dto.model_dump(),
             scopes=request.get_token_scopes,
@@ -618,7 +624,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         url_name="service-detail",
     )
     def service_detail(self, request, pk: str, service_id: str):
-        service = product_service.get_service(
+        service = request.services.products.get_service(
             product_id=int(pk),
             service_id=int(service_id),
             scopes=request.get_token_scopes,
@@ -630,7 +636,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     @service_detail.mapping.patch
     def update_service(self, request, pk: str, service_id: str):
         service_dto = self._validate_dto(request.data, dtos.DataServiceCreateOrUpdate)
-        service = product_service.update_service(
+        service = request.services.products.update_service(
             product_id=int(pk),
             service_id=int(service_id),
             data=service_dto.model_dump(exclude_unset=True),
@@ -642,7 +648,7 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
     @extend_schema()
     @service_detail.mapping.delete
     def delete_service(self, request, pk: str, service_id: str):
-        product_service.delete_service(
+        request.services.products.delete_service(
             product_id=int(pk),
             service_id=int(service_id),
             scopes=request.get_token_scopes,
@@ -650,6 +656,71 @@ class ProductViewSet(ExceptionHandlerMixin, ViewSet):
         return Response(status=204)
 
 
+class WebhookViewSet(ExceptionHandlerMixin, ViewSet):
+    @extend_schema(responses={200: dtos.WebhookSubscription})
+    def list(self, request: Request):
+        subscriptions = request.services.webhooks.get_subscriptions(
+            scopes=request.get_token_scopes
+        )
+        return Response(dtos.to_response_object(subscriptions), status=200)
+
+    @extend_schema(responses={200: dtos.WebhookSubscription})
+    def retrieve(self, request, pk: str):
+        subscription = request.services.webhooks.get_subscription(
+            subscription_id=int(pk), scopes=request.get_token_scopes
+        )
+        return Response(dtos.to_response_object(subscription), status=200)
+
+    @extend_schema(
+        request=dtos.WebhookSubscriptionCreate,
+        responses={201: dtos.WebhookSubscriptionWithSecret},
+        description="Subscribe to the changes of the products of a team, or of all products "
+        "(admins only) if there's no team_id. The deliveries are signed with the secret that "
+        "is returned, see beheeromgeving/webhooks.py.",
+    )
+    def create(self, request):
+        subscription_dto = dtos.WebhookSubscriptionCreate(**request.data)
+        subscription = request.services.webhooks.create_subscription(
+            data=subscription_dto.model_dump(), scopes=request.get_token_scopes
+        )
+        return Response(dtos.to_response_object(subscription, dto_type="created"), status=201)
+
+    @extend_schema(responses={204: None})
+    def destroy(self, request, pk: str):
+        request.services.webhooks.delete_subscription(
+            subscription_id=int(pk), scopes=request.get_token_scopes
+        )
+        return Response(status=204)
+
+
+def _filter_teams(teams: list, has_published_products: bool | None) -> list:
+    if has_published_products is None:
+        return teams
+    return [
+        team
+        for team in teams
+        if (has_published_products and team.product_count)
+        or (not has_published_products and team.product_count == 0)
+    ]
+
+
+def _product_list_params(request) -> dtos.ProductQueryParams:
+    query_params = request.query_params.dict()
+    # List view can only see published items.
+    query_params["publication_status"] = "P"
+    return dtos.ProductQueryParams(**query_params)
+
+
+def _attach_revision_metadata(*, request, data: dict, base_path: str):
+    path = (
+        f"{base_path}/revision"
+        if data["has_revision"] or data["publication_status"] == "P"
+        else base_path
+    )
+    data["revision_url"] = request.build_absolute_uri(path)
+    return data
+
+
 def _attach_product_revision_metadata(*, request, product_data: dict) -> dict:
     product_id = product_data["id"]
     path = (
@@ -669,21 +740,40 @@ def _attach_product_revision_metadata(*, request, product_data: dict) -> dict:
     return product_data
 
 
+def _me_params(request) -> dtos.ProductQueryParams:
+    query_params = request.query_params.dict()
+    if "publication_status" not in query_params:
+        query_params["publication_status"] = "*"
+    return dtos.ProductQueryParams(**query_params)
+
+
+def _me_data(request, params: dtos.ProductQueryParams, teams: list, product_data: list) -> dict:
+    if params.fields in (None, "*") or {
+        "has_revision",
+        "revision_url",
+        "contracts",
+    }.intersection(params.fields or []):
+        product_data = [
+            _attach_product_revision_metadata(request=request, product_data=product)
+            for product in product_data
+        ]
+    pagination = Pagination()
+    product_data = pagination.paginate(product_data, request)
+    return {
+        "teams": dtos.to_response_object(teams, dto_type="me"),
+        "products": pagination.get_paginated_response_body(product_data),
+    }
+
+
 @extend_schema(responses={200: dtos.MeDetail})
 @api_view(["GET"])
 def me(request):
     try:
-        query_params = request.query_params.dict()
-        if "publication_status" not in query_params:
-            query_params["publication_status"] = "*"
-        params = dtos.ProductQueryParams(**query_params)
+        params = _me_params(request)
     except ValidationError as e:
         return Response(status=400, data=str(e))
-    team_service = TeamService(repo=TeamRepository())
-    scopes = request.get_token_scopes
-    teams = team_service.get_teams_from_scopes(scopes)
-    product_query_handler = ProductQueryHandler(ProductRepository())
-    product_data = product_query_handler.list_my_products(
+    teams = request.services.teams.get_teams_from_scopes(request.get_token_scopes)
+    product_data = request.services.product_queries.list_my_products(
         teams=teams,
         query=params.query,
         filter=params.filter,
@@ -691,22 +781,131 @@ def me(request):
         order=params.order or ("last_updated", True),
         fields=params.fields,
     )
-    if params.fields in (None, "*") or {
-        "has_revision",
-        "revision_url",
-        "contracts",
-    }.intersection(params.fields or []):
-        product_data = [
-            _attach_product_revision_metadata(request=request, product_data=product)
-            for product in product_data
-        ]
-    pagination = Pagination()
     try:
-        product_data = pagination.paginate(product_data, request)
+        data = _me_data(request, params, teams, product_data)
     except NotFound as e:
         return Response(status=404, data=e.detail)
-    data = {
-        "teams": dtos.to_response_object(teams, dto_type="me"),
-        "products": pagination.get_paginated_response_body(product_data),
-    }
     return Response(data, status=200)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            "since",
+            description="Cursor of the last change seen, the cursor of the previous page.",
+            type=int,
+            default=0,
+        ),
+        OpenApiParameter(
+            "limit", description="Maximum number of changes (1-1000).", type=int, default=100
+        ),
+    ],
+    responses={200: dtos.ChangeFeed},
+    description="The changes to products and contracts (created, updated, published, deleted) "
+    "in the order they were committed. Poll again with the returned cursor.",
+)
+@api_view(["GET"])
+def changes(request):
+    try:
+        params = dtos.ChangeQueryParams(**request.query_params.dict())
+    except ValidationError as e:
+        return Response(status=400, data=str(e))
+    feed = request.services.product_queries.list_changes(
+        since=params.since, limit=params.limit, scopes=request.get_token_scopes
+    )
+    return Response(dtos.to_response_object(feed), status=200)
+
+
+# Async variants of the read views, for the ASGI application (see beheeromgeving/asgi.py).
+# DRF views are synchronous, so these are plain Django views that use the same DTOs and
+# pagination, but read through the async methods of the services. Only GET and HEAD requests
+# are served by them, see with_sync_fallback().
+
+
+def _render(data, status: int = 200) -> HttpResponse:
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, content_type="application/json"
+    )
+
+
+def async_read_view(func):
+    """Give the view a DRF Request, and handle exceptions like ExceptionHandlerMixin."""
+
+    @wraps(func)
+    async def view(request, *args, **kwargs):
+        try:
+            return await func(Request(request), *args, **kwargs)
+        except HANDLED_EXCEPTIONS as e:
+            status, data = error_response(e)
+            return _render(data, status)
+
+    return view
+
+
+def with_sync_fallback(async_view, sync_view):
+    """Serve GET and HEAD requests with the async_view, and the rest with the (DRF) sync_view."""
+
+    @csrf_exempt
+    @wraps(async_view)
+    async def view(request, *args, **kwargs):
+        if request.method in ("GET", "HEAD"):
+            return await async_view(request, *args, **kwargs)
+        return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+    return view
+
+
+@async_read_view
+async def async_team_list(request: Request):
+    qp = dtos.TeamQueryParams(**request.query_params.dict())
+    teams = _filter_teams(await request.services.teams.aget_teams(), qp.has_published_products)
+    return _render(dtos.to_response_object(teams))
+
+
+@async_read_view
+async def async_product_list(request: Request):
+    params = _product_list_params(request)
+    if params.name:
+        product = await request.services.products.aget_product_by_name(
+            name=params.name, scopes=request.get_token_scopes
+        )
+        return _render(dtos.to_response_object(product))
+
+    data = await request.services.product_queries.alist_products(
+        scopes=request.get_token_scopes,
+        query=params.query,
+        filter=params.filter,
+        exclude=params.exclude,
+        order=params.order,
+        fields=params.fields,
+    )
+    pagination = Pagination()
+    paginated_data = pagination.paginate(data, request)
+    return _render(pagination.get_paginated_response_body(paginated_data))
+
+
+@async_read_view
+async def async_product_detail(request: Request, pk: str):
+    params = dtos.ProductDetailQueryParams(**request.query_params.dict())
+    product = await request.services.products.aget_product(
+        product_id=int(pk), scopes=request.get_token_scopes, include=params.relations
+    )
+    data = dtos.to_response_object(product, fields=params.read_fields)
+    if params.with_revision_url:
+        data = _attach_revision_metadata(request=request, data=data, base_path=f"/products/{pk}")
+    return _render(params.select(data))
+
+
+@async_read_view
+async def async_me(request: Request):
+    params = _me_params(request)
+    teams = await request.services.teams.aget_teams_from_scopes(request.get_token_scopes)
+    product_data = await request.services.product_queries.alist_my_products(
+        teams=teams,
+        query=params.query,
+        filter=params.filter,
+        exclude=params.exclude,
+        order=params.order or ("last_updated", True),
+        fields=params.fields,
+    )
+    return _render(_me_data(request, params, teams, product_data))
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class BeheeromgevingConfig(AppConfig):
+    name = "beheeromgeving"
+
+    def ready(self):
+        # Build the services once, instead of on the first request of each worker.
+        from beheeromgeving.container import container
+
+        container.services  # noqa: B018
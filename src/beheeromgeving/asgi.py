@@ -0,0 +1,28 @@
+"""
+ASGI config for Beheeromgeving Catalogus project.
+
+It exposes the ASGI callable as a module-level variable named ``application``. Products,
+teams and /me are read by async views (see urls_asgi.py), so a slow query doesn't hold up a
+worker. Serve it with an ASGI server, e.g. `uvicorn beheeromgeving.asgi:application`.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+
+from beheeromgeving.telemetry import configure_telemetry
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "beheeromgeving.settings")
+os.environ.setdefault("ROOT_URLCONF", "beheeromgeving.urls_asgi")
+# The async ORM runs the queries in threads, that can't share persistent connections.
+# Use a connection pool instead (DATABASE_POOL=true).
+os.environ.setdefault("DATABASE_CONN_MAX_AGE", "0")
+
+configure_telemetry()
+application = get_asgi_application()
+
+if settings.WARM_UP:
+    from beheeromgeving.bootstrap import prebuild_validators
+
+    prebuild_validators()
@@ -0,0 +1,90 @@
+"""
+Warm-up of the WSGI application before it serves requests.
+
+Much of the request path is built lazily: Pydantic builds the validators of models with
+forward references on first use, Django populates the URL resolver on the first request,
+and DRF, the renderers and the authorization middleware all have their own first-call
+costs. warm_up() pays for those once, when wsgi.py is imported. The Dockerfile has uWSGI
+load the application in every worker (lazy-apps), so each warms up after it's forked, and
+none inherits the connections or threads of another. The warm-up requests don't start the
+invalidation listener, the first real request of the worker does.
+"""
+
+import logging
+import time
+from io import BytesIO
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from pydantic import BaseModel
+
+from api import datatransferobjects as dtos
+from beheeromgeving.invalidation import WARM_UP_ENVIRON_KEY
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_PATHS = ["/pulse", "/teams", "/products?pagesize=1", "/openapi.json", "/openapi.yaml"]
+
+
+def prebuild_validators() -> int:
+    """Build the validators and serializers of all DTOs that Pydantic deferred."""
+    built = 0
+    for dto in vars(dtos).values():
+        if isinstance(dto, type) and issubclass(dto, BaseModel) and not dto.__pydantic_complete__:
+            dto.model_rebuild()
+            built += 1
+    return built
+
+
+def _host() -> str:
+    hosts = [host for host in settings.ALLOWED_HOSTS if host != "*"]
+    return hosts[0].lstrip(".") if hosts else "localhost"
+
+
+def wsgi_get(application, path: str) -> int:
+    """Do a GET request on the WSGI application, without a server, and return the status."""
+    path_info, _, query_string = path.partition("?")
+    environ = {
+        "REQUEST_METHOD": "GET",
+        "PATH_INFO": path_info,
+        "QUERY_STRING": query_string,
+        "HTTP_HOST": _host(),
+        "wsgi.input": BytesIO(),
+        WARM_UP_ENVIRON_KEY: True,
+    }
+    setup_testing_defaults(environ)
+    status = []
+    body = application(
+        environ, lambda status_line, headers, exc_info=None: status.append(status_line)
+    )
+    try:
+        b"".join(body)
+    finally:
+        if hasattr(body, "close"):
+            body.close()
+    return int(status[0].split()[0])
+
+
+def warm_up(application):
+    start = time.perf_counter()
+    built = prebuild_validators()
+    get_resolver().reverse_dict  # noqa: B018 (populates the resolver)
+    for path in WARM_UP_PATHS:
+        try:
+            status = wsgi_get(application, path)
+        except Exception:
+            # Starting without a warm cache beats not starting at all.
+            logger.exception("Warm-up request to %s failed", path)
+            continue
+        if status != 200:
+            logger.warning("Warm-up request to %s returned %s", path, status)
+    # Don't share database connections (or pools) with forked workers.
+    connections.close_all()
+    for connection in connections.all():
+        if getattr(connection, "pool", None) is not None:
+            connection.close_pool()
+    logger.info(
+        "Warmed up in %.0fms (%s validators built)", (time.perf_counter() - start) * 1000, built
+    )
@@ -0,0 +1,513 @@
+"""
+Caching of hydrated product aggregates, and coalescing of identical computations.
+
+Hydrating a product takes several queries, while products are read far more often than they
+change. The ProductCache keeps the products a worker read last in a bounded LRU, in front of
+the cache backend that all workers share (the default one of CACHES, e.g. Redis through
+CACHE_URL). Products are stored pickled, so every read gets a copy of its own to modify.
+
+The local tier is evicted by the handler of the invalidation listener (see invalidation.py),
+so it is only used while the listener listens. The shared tier can't be evicted by every
+worker, its keys are versioned instead: the worker that changes a product gives it a new
+version, and when a team changes all products get a new generation (their owner may have
+changed). Entries under old versions are never read again, and expire after
+PRODUCT_CACHE_TIMEOUT seconds. Without CACHE_URL, the "shared" tier is a LocMemCache in the
+memory of each worker, which the others can't give new versions. Then every worker does so
+when it's notified, and the tier is only used while the listener listens, like the local one.
+
+Products that are modified and saved are loaded from the database (see
+ProductRepository.get), as saving an outdated product would undo the changes since.
+
+Products are cached whole, before they're restricted to what the caller may read. Nothing is
+cached within a transaction, as it may hold changes that are rolled back. What is cached is
+read from the primary, not from a read replica that may lag behind a change (see routers.py).
+
+The hits and misses are counted per request (see instrumentation.py) and per worker.
+
+A SingleFlight makes concurrent calls with the same key share one computation, e.g. when a
+crawler or a deploy of the front-end requests the same product list many times at once:
+the first call computes, the others wait for its result. With SINGLE_FLIGHT_SHARED the
+workers coordinate with a lock in the shared cache as well. The async views only share
+computations within their event loop.
+
+Product lists are cached in the shared cache with StaleWhileRevalidate: a list is fresh for
+the PRODUCT_LIST_FRESHNESS (seconds) of its read level, and when it has expired or a product
+in it changed, it's still served for PRODUCT_LIST_MAX_STALENESS seconds, while a background
+thread computes it again. When a product enters or leaves the lists, e.g. because it's
+published or deleted, the lists are invalidated for good, they're computed before they are
+served again, by every worker. Without CACHE_URL the lists are cached in the memory of each
+worker, and only while the invalidation listener listens. Like products, they're computed
+from the primary.
+"""
+
+import asyncio
+import hashlib
+import logging
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, BaseCache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from beheeromgeving.instrumentation import count
+from beheeromgeving.invalidation import Invalidation, listener, on_invalidate
+from beheeromgeving.routers import reading_from_primary
+from domain.product.objects import Product
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "product-cache:generation"
+# Seconds between checks whether another worker finished a shared computation.
+SHARED_POLL_INTERVAL = 0.05
+
+
+@dataclass
+class CacheStats:
+    local_hits: int = 0
+    shared_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return (self.local_hits + self.shared_hits) / lookups if lookups else 0.0
+
+
+def _version_key(id: int) -> str:
+    return f"product-cache:{id}:version"
+
+
+def _new_version() -> str:
+    # Random, so a version that was evicted from the backend is never used again.
+    return uuid.uuid4().hex
+
+
+def _in_worker_memory(cache: BaseCache) -> bool:
+    """Whether the cache is kept by the worker itself, so other workers don't see it."""
+    return isinstance(cache, LocMemCache)
+
+
+def _versions(cache: BaseCache, keys: list[str]) -> dict[str, str]:
+    """The current versions under keys, new ones for those that are missing."""
+    versions = cache.get_many(keys)
+    for key in set(keys) - versions.keys():
+        # Another worker may add one at the same time, use whichever was first.
+        cache.add(key, _new_version(), timeout=None)
+        versions[key] = cache.get(key)
+    return versions
+
+
+async def _aversions(cache: BaseCache, keys: list[str]) -> dict[str, str]:
+    versions = await cache.aget_many(keys)
+    for key in set(keys) - versions.keys():
+        await cache.aadd(key, _new_version(), timeout=None)
+        versions[key] = await cache.aget(key)
+    return versions
+
+
+class ProductCache:
+    def __init__(self, alias: str = DEFAULT_CACHE_ALIAS):
+        self.alias = alias
+        self.stats = CacheStats()
+        # The pickled products by id, least recently used first, with their team.
+        self._entries: OrderedDict[int, tuple[int, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+        # Counts the evictions, so a product that was loaded before one isn't stored after it.
+        self._evictions = 0
+
+    @property
+    def shared(self) -> BaseCache:
+        return caches[self.alias]
+
+    def _enabled(self) -> bool:
+        if not settings.PRODUCT_CACHE or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return False
+        # Only the listener evicts a cache in the memory of the worker.
+        return not _in_worker_memory(self.shared) or listener.listening.is_set()
+
+    def _local_enabled(self) -> bool:
+        return settings.PRODUCT_CACHE_SIZE > 0 and listener.listening.is_set()
+
+    def get(self, id: int, load: Callable[[], Product], *, store: bool = True) -> Product:
+        """The product from the cache, or else loaded (and stored, unless store is false)."""
+        if not self._enabled():
+            return load()
+        evictions = self._evictions
+        local = self._local_enabled()
+        if local and (data := self._get_local(id)) is not None:
+            return self._hit("local", data)
+
+        key = self._key(id, _versions(self.shared, [GENERATION_KEY, _version_key(id)]))
+        if (data := self.shared.get(key)) is not None:
+            product = self._hit("shared", data)
+            if local:
+                self._put_local(product, data, evictions)
+            return product
+
+        self._miss()
+        if not store:
+            return load()
+        with reading_from_primary():
+            product = load()
+        data = pickle.dumps(product, pickle.HIGHEST_PROTOCOL)
+        self.shared.set(key, data, settings.PRODUCT_CACHE_TIMEOUT)
+        if local:
+            self._put_local(product, data, evictions)
+        return product
+
+    async def aget(
+        self, id: int, load: Callable[[], Awaitable[Product]], *, store: bool = True
+    ) -> Product:
+        """The async variant of get()."""
+        if not self._enabled():
+            return await load()
+        evictions = self._evictions
+        local = self._local_enabled()
+        if local and (data := self._get_local(id)) is not None:
+            return self._hit("local", data)
+
+        key = self._key(id, await _aversions(self.shared, [GENERATION_KEY, _version_key(id)]))
+        if (data := await self.shared.aget(key)) is not None:
+            product = self._hit("shared", data)
+            if local:
+                self._put_local(product, data, evictions)
+            return product
+
+        self._miss()
+        if not store:
+            return await load()
+        with reading_from_primary():
+            product = await load()
+        data = pickle.dumps(product, pickle.HIGHEST_PROTOCOL)
+        await self.shared.aset(key, data, settings.PRODUCT_CACHE_TIMEOUT)
+        if local:
+            self._put_local(product, data, evictions)
+        return product
+
+    @staticmethod
+    def _key(id: int, versions: dict[str, str]) -> str:
+        return f"product-cache:{id}:{versions[GENERATION_KEY]}:{versions[_version_key(id)]}"
+
+    def _get_local(self, id: int) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(id)
+            if entry is None:
+                return None
+            self._entries.move_to_end(id)
+            return entry[1]
+
+    def _put_local(self, product: Product, data: bytes, evictions: int):
+        with self._lock:
+            if evictions != self._evictions:
+                # It may have changed since it was loaded.
+                return
+            self._entries[product.id] = (product.team_id, data)
+            self._entries.move_to_end(product.id)
+            while len(self._entries) > settings.PRODUCT_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def _hit(self, tier: str, data: bytes) -> Product:
+        if tier == "local":
+            self.stats.local_hits += 1
+        else:
+            self.stats.shared_hits += 1
+        count(f"product_cache_{tier}_hits")
+        return pickle.loads(data)  # noqa: S301 (only what was pickled by this cache)
+
+    def _miss(self):
+        self.stats.misses += 1
+        count("product_cache_misses")
+
+    def invalidate(self, invalidation: Invalidation):
+        with self._lock:
+            self._evictions += 1
+            if invalidation.everything:
+                self._entries.clear()
+            for id in invalidation.product_ids:
+                self._entries.pop(id, None)
+            if invalidation.team_ids:
+                for id, (team_id, _data) in list(self._entries.items()):
+                    if team_id in invalidation.team_ids:
+                        del self._entries[id]
+
+        # The other workers see the new versions, unless they keep the cache themselves.
+        if settings.PRODUCT_CACHE and (invalidation.local or _in_worker_memory(self.shared)):
+            versions = {_version_key(id): _new_version() for id in invalidation.product_ids}
+            if invalidation.team_ids:
+                versions[GENERATION_KEY] = _new_version()
+            self.shared.set_many(versions, timeout=None)
+
+    def clear(self):
+        """Empty the local tier, the entries of the shared tier are left to expire."""
+        self.invalidate(Invalidation(everything=True))
+
+
+product_cache = ProductCache()
+on_invalidate(product_cache.invalidate)
+
+
+@dataclass
+class _Flight:
+    done: threading.Event = field(default_factory=threading.Event)
+    result: Any = None
+    error: BaseException | None = None
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one computation. The result is shared as
+    well, so it must not be modified."""
+
+    def __init__(self, name: str, alias: str = DEFAULT_CACHE_ALIAS):
+        self.name = name
+        self.alias = alias
+        self._flights: dict[str, _Flight] = {}
+        self._futures: dict[tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def do[T](self, key: str, compute: Callable[[], T]) -> T:
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # It may see changes of the transaction, that others shouldn't.
+            return compute()
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            if flight.done.wait(settings.SINGLE_FLIGHT_TIMEOUT):
+                count(f"{self.name}_coalesced")
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result
+            return compute()
+
+        try:
+            flight.result = self._compute_shared(key, compute)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _compute_shared[T](self, key: str, compute: Callable[[], T]) -> T:
+        """Compute it, unless another worker already does, then take its result."""
+        if not settings.SINGLE_FLIGHT_SHARED:
+            return compute()
+        cache = caches[self.alias]
+        prefix = f"single-flight:{self.name}:{hashlib.sha256(key.encode()).hexdigest()}"
+        lock_key = f"{prefix}:lock"
+        token = uuid.uuid4().hex
+        holder = None
+        deadline = time.monotonic() + settings.SINGLE_FLIGHT_TIMEOUT
+        while time.monotonic() < deadline:
+            if cache.add(lock_key, token, settings.SINGLE_FLIGHT_TIMEOUT):
+                try:
+                    result = compute()
+                    cache.set(f"{prefix}:{token}", result, settings.SINGLE_FLIGHT_TIMEOUT)
+                    return result
+                finally:
+                    cache.delete(lock_key)
+            # The holder stores its result under its token, before it releases the lock.
+            holder = cache.get(lock_key) or holder
+            if holder is not None and (result := cache.get(f"{prefix}:{holder}")) is not None:
+                count(f"{self.name}_coalesced")
+                return result
+            time.sleep(SHARED_POLL_INTERVAL)
+        return compute()
+
+    async def ado[T](self, key: str, compute: Callable[[], Awaitable[T]]) -> T:
+        """The async variant of do(), without sharing between workers."""
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return await compute()
+        loop = asyncio.get_running_loop()
+        future = self._futures.get((loop, key))
+        if future is not None:
+            count(f"{self.name}_coalesced")
+            return await asyncio.shield(future)
+
+        future = self._futures[(loop, key)] = loop.create_future()
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieved, so it isn't reported when no other call waits for it.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._futures[(loop, key)]
+
+
+product_lists = SingleFlight("product_list")
+
+
+@dataclass
+class _ListEntry:
+    data: Any
+    computed_at: float
+    # The version of the lists when it was computed.
+    version: str
+
+
+class StaleWhileRevalidate:
+    """Serves cached lists that expired (or changed) while they're computed again."""
+
+    def __init__(self, name: str, alias: str = DEFAULT_CACHE_ALIAS):
+        self.name = name
+        self.alias = alias
+        # Changed for every change to a listed product (soft), or to what's listed (hard).
+        self.version_key = f"{name}:version"
+        self.generation_key = f"{name}:generation"
+        # The refreshes in progress, by cache key.
+        self._refreshing: dict[str, threading.Thread | asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self) -> BaseCache:
+        return caches[self.alias]
+
+    def _enabled(self) -> bool:
+        if not settings.PRODUCT_LIST_CACHE or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return False
+        # Only the listener invalidates a cache in the memory of the worker.
+        return not _in_worker_memory(self.shared) or listener.listening.is_set()
+
+    def _cache_key(self, key: str, versions: dict[str, str]) -> str:
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return f"{self.name}:{versions[self.generation_key]}:{digest}"
+
+    def _serve(self, entry: _ListEntry | None, version: str, freshness: int) -> str | None:
+        """Whether the entry is "fresh" or "stale" (and can be served), None if neither."""
+        if entry is None:
+            return None
+        age = time.time() - entry.computed_at
+        if entry.version == version and age < freshness:
+            return "fresh"
+        if age < freshness + settings.PRODUCT_LIST_MAX_STALENESS:
+            return "stale"
+        return None
+
+    def get[T](self, key: str, freshness: int, compute: Callable[[], T]) -> T:
+        """The list from the cache, or else computed, fresh for freshness seconds."""
+        if not self._enabled():
+            return compute()
+        versions = _versions(self.shared, [self.generation_key, self.version_key])
+        cache_key = self._cache_key(key, versions)
+        entry = self.shared.get(cache_key)
+        served = self._serve(entry, versions[self.version_key], freshness)
+        if served is not None:
+            count(f"{self.name}_{served}_hits")
+            if served == "stale":
+                self._refresh(cache_key, versions[self.version_key], freshness, compute)
+            return entry.data
+
+        count(f"{self.name}_misses")
+        with reading_from_primary():
+            data = compute()
+        return self._store(cache_key, versions[self.version_key], freshness, data)
+
+    async def aget[T](self, key: str, freshness: int, compute: Callable[[], Awaitable[T]]) -> T:
+        """The async variant of get(), that refreshes in a task instead of a thread."""
+        if not self._enabled():
+            return await compute()
+        versions = await _aversions(self.shared, [self.generation_key, self.version_key])
+        cache_key = self._cache_key(key, versions)
+        entry = await self.shared.aget(cache_key)
+        served = self._serve(entry, versions[self.version_key], freshness)
+        if served is not None:
+            count(f"{self.name}_{served}_hits")
+            if served == "stale":
+                self._arefresh(cache_key, versions[self.version_key], freshness, compute)
+            return entry.data
+
+        count(f"{self.name}_misses")
+        with reading_from_primary():
+            data = await compute()
+        await self.shared.aset(
+            cache_key, *self._entry(data, versions[self.version_key], freshness)
+        )
+        return data
+
+    @staticmethod
+    def _entry(data: Any, version: str, freshness: int) -> tuple[_ListEntry, int]:
+        """The entry to store, with its timeout. The version is the one from before it was
+        computed, so a change during the computation makes it stale."""
+        timeout = freshness + settings.PRODUCT_LIST_MAX_STALENESS
+        return _ListEntry(data, time.time(), version), timeout
+
+    def _store[T](self, cache_key: str, version: str, freshness: int, data: T) -> T:
+        self.shared.set(cache_key, *self._entry(data, version, freshness))
+        return data
+
+    def _refresh(self, cache_key: str, version: str, freshness: int, compute: Callable):
+        def run():
+            try:
+                with reading_from_primary():
+                    data = compute()
+                self._store(cache_key, version, freshness, data)
+            except Exception:
+                logger.exception("Refresh of %s failed", self.name)
+            finally:
+                # The thread has connections of its own.
+                connections.close_all()
+                with self._lock:
+                    del self._refreshing[cache_key]
+
+        with self._lock:
+            if cache_key in self._refreshing:
+                return
+            thread = threading.Thread(target=run, name=f"{self.name}-refresh", daemon=True)
+            self._refreshing[cache_key] = thread
+        thread.start()
+
+    def _arefresh(self, cache_key: str, version: str, freshness: int, compute: Callable):
+        async def run():
+            try:
+                with reading_from_primary():
+                    data = await compute()
+                await self.shared.aset(cache_key, *self._entry(data, version, freshness))
+            except Exception:
+                logger.exception("Refresh of %s failed", self.name)
+            finally:
+                with self._lock:
+                    del self._refreshing[cache_key]
+
+        with self._lock:
+            if cache_key in self._refreshing:
+                return
+            # Referenced until it's done, so it isn't garbage collected before.
+            self._refreshing[cache_key] = asyncio.get_running_loop().create_task(run())
+
+    def invalidate(self, invalidation: Invalidation):
+        if not settings.PRODUCT_LIST_CACHE:
+            return
+        versions = {}
+        # The other workers see the new versions, unless they keep the cache themselves.
+        if invalidation.local or _in_worker_memory(self.shared):
+            versions[self.version_key] = _new_version()
+        # What's listed changed, so every worker drops the lists, none serves them stale.
+        if invalidation.published:
+            versions[self.generation_key] = _new_version()
+        if versions:
+            self.shared.set_many(versions, timeout=None)
+
+
+product_list_cache = StaleWhileRevalidate("product_lists")
+on_invalidate(product_list_cache.invalidate)
@@ -0,0 +1,246 @@
+"""
+Compression of responses with zstd, Brotli or gzip, whichever the client prefers.
+
+The CompressionMiddleware replaces Django's GZipMiddleware. It negotiates the encoding with
+the Accept-Encoding header (preferring those earlier in COMPRESSION_ENCODINGS when the client
+has no preference), and compresses streaming responses as they stream. Zstandard comes with
+Python (`compression.zstd`), Brotli with the brotli package.
+
+Content that is kept by a worker, like the OpenAPI schema, is wrapped in a
+CompressedContent. That compresses each encoding once, harder than per request, and keeps
+it, so a hit is served by `compressed_response()` without compressing it again. The
+middleware leaves responses that are already encoded alone.
+
+Unlike Django's GZipMiddleware, the compressed content isn't padded against BREACH. That needs
+credentials that a browser sends along by itself, while this API only accepts bearer tokens.
+"""
+
+import gzip
+import zlib
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import Protocol
+
+import brotli
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from beheeromgeving.instrumentation import timed
+
+try:
+    from compression import zstd
+except ImportError:  # Python built without zstd
+    zstd = None
+
+# It's not worth compressing really short responses.
+MIN_LENGTH = 200
+
+
+class Stream(Protocol):
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk, and flush it so it can be sent right away."""
+
+    def finish(self) -> bytes: ...
+
+
+@dataclass(frozen=True)
+class Encoding:
+    name: str
+    compress: Callable[[bytes, int], bytes]
+    stream: Callable[[int], Stream]
+    # For responses that are compressed per request.
+    level: int
+    # For content that is compressed once and kept.
+    cached_level: int
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _ZstdStream:
+    def __init__(self, level: int):
+        self._compressor = zstd.ZstdCompressor(level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data, zstd.ZstdCompressor.FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+ENCODINGS: dict[str, Encoding] = {
+    "gzip": Encoding(
+        "gzip",
+        compress=lambda data, level: gzip.compress(data, compresslevel=level, mtime=0),
+        stream=_GzipStream,
+        level=6,
+        cached_level=9,
+    ),
+    "br": Encoding(
+        "br",
+        compress=lambda data, level: brotli.compress(data, quality=level),
+        stream=_BrotliStream,
+        level=4,
+        cached_level=9,
+    ),
+}
+if zstd is not None:
+    ENCODINGS["zstd"] = Encoding(
+        "zstd",
+        compress=lambda data, level: zstd.compress(data, level),
+        stream=_ZstdStream,
+        level=3,
+        cached_level=12,
+    )
+
+
+def _qvalues(accept_encoding: str) -> dict[str, float]:
+    qvalues = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[name] = q
+    return qvalues
+
+
+def negotiate(accept_encoding: str) -> Encoding | None:
+    """The encoding the client prefers, of COMPRESSION_ENCODINGS, or None for no compression."""
+    qvalues = _qvalues(accept_encoding)
+    default = qvalues.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in settings.COMPRESSION_ENCODINGS:
+        encoding = ENCODINGS.get(name)
+        if encoding is None:
+            continue
+        q = qvalues.get(name, default)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress_sequence(sequence: Iterable[bytes], encoding: Encoding) -> Iterator[bytes]:
+    stream = encoding.stream(encoding.level)
+    for item in sequence:
+        if data := stream.compress(item):
+            yield data
+    yield stream.finish()
+
+
+async def acompress_sequence(
+    sequence: AsyncIterable[bytes], encoding: Encoding
+) -> AsyncIterator[bytes]:
+    stream = encoding.stream(encoding.level)
+    async for item in sequence:
+        if data := stream.compress(item):
+            yield data
+    yield stream.finish()
+
+
+def _weaken_etag(response: HttpResponse):
+    # A strong ETag is for the exact bytes, see RFC 9110 section 8.8.1. A weak one still
+    # matches conditional requests.
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response.headers["ETag"] = "W/" + etag
+
+
+class CompressedContent:
+    """Content with the variants it's been compressed to."""
+
+    def __init__(self, content: bytes):
+        self.content = content
+        # Two threads may compress the same variant at the same time, which is harmless.
+        self._variants: dict[str, bytes] = {}
+
+    def encode(self, accept_encoding: str) -> tuple[Encoding | None, bytes]:
+        """The negotiated encoding and the content in it, compressed only the first time."""
+        encoding = negotiate(accept_encoding) if len(self.content) >= MIN_LENGTH else None
+        if encoding is None:
+            return None, self.content
+        variant = self._variants.get(encoding.name)
+        if variant is None:
+            with timed("compression"):
+                variant = encoding.compress(self.content, encoding.cached_level)
+            self._variants[encoding.name] = variant
+        if len(variant) >= len(self.content):
+            return None, self.content
+        return encoding, variant
+
+
+def compressed_response(request, content: CompressedContent, **kwargs) -> HttpResponse:
+    """A response with the content in the encoding the client prefers."""
+    encoding, body = content.encode(request.headers.get("Accept-Encoding", ""))
+    response = HttpResponse(body, **kwargs)
+    patch_vary_headers(response, ["Accept-Encoding"])
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding.name
+        _weaken_etag(response)
+    return response
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Like Django's GZipMiddleware, with the encoding that's negotiated."""
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < MIN_LENGTH:
+            return response
+        if response.has_header("Content-Encoding"):
+            return response
+
+        patch_vary_headers(response, ["Accept-Encoding"])
+        encoding = negotiate(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_sequence(
+                    response.streaming_content, encoding
+                )
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, encoding
+                )
+            # The compressed size isn't known until it's streamed.
+            del response.headers["Content-Length"]
+        else:
+            compressed = encoding.compress(response.content, encoding.level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        _weaken_etag(response)
+        response.headers["Content-Encoding"] = encoding.name
+        return response
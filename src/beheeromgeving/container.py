@@ -0,0 +1,68 @@
+"""
+The dependency container, that builds the services and hands them to each request.
+
+The services and their repositories don't keep state between calls, and each service checks
+authorization with its own AuthorizationService, so a single set of them can be shared by
+all threads (and coroutines) of a worker. The container builds that set once, on first use,
+behind a lock. The ServicesMiddleware gives every request its scope: the services it uses, as
+`request.services`. Code that isn't serving a request (e.g. management commands) uses
+`container.services`.
+"""
+
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from domain.auth import AuthorizationRepository, AuthorizationService
+from domain.product import ProductQueryHandler, ProductRepository, ProductService
+from domain.team import TeamRepository, TeamService
+from domain.webhook import WebhookRepository, WebhookService
+
+
+@dataclass(frozen=True)
+class Services:
+    auth: AuthorizationService
+    products: ProductService
+    product_queries: ProductQueryHandler
+    teams: TeamService
+    webhooks: WebhookService
+
+
+def build_services() -> Services:
+    auth = AuthorizationService(AuthorizationRepository())
+    return Services(
+        auth=auth,
+        products=ProductService(ProductRepository(), auth=auth),
+        product_queries=ProductQueryHandler(ProductRepository(), auth=auth),
+        teams=TeamService(TeamRepository(), auth=auth),
+        webhooks=WebhookService(WebhookRepository(), auth=auth),
+    )
+
+
+class Container:
+    def __init__(self, factory: Callable[[], Services] = build_services):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._services: Services | None = None
+
+    @property
+    def services(self) -> Services:
+        services = self._services
+        if services is None:
+            with self._lock:
+                if self._services is None:
+                    self._services = self._factory()
+                services = self._services
+        return services
+
+
+container = Container()
+
+
+class ServicesMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.services = container.services
+        return self.get_response(request)
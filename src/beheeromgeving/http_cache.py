@@ -0,0 +1,132 @@
+"""
+HTTP caching by a CDN or reverse proxy (e.g. Azure Front Door or Varnish) in front of us.
+
+The repositories tag each request with surrogate keys for what they read, e.g.
+`product-1 team-2 contract-3`, or `products` for a list of products. The HttpCacheMiddleware
+lets the proxy cache the tagged GET requests without Authorization for
+HTTP_CACHE_MAX_AGE seconds (`s-maxage`), and adds the keys in the Surrogate-Key header.
+Browsers revalidate, and responses to authenticated requests are private.
+
+When data changes, the worker that changed it purges the keys that it affects, once the
+transaction commits. Purgers are registered with `on_purge()`. The default one sends a
+PURGE request with the keys in a Surrogate-Key header (like Varnish with xkey, or Fastly) to
+HTTP_CACHE_PURGE_URL, when that's set.
+"""
+
+import logging
+from collections.abc import Callable, Iterable
+from contextvars import ContextVar
+
+import requests
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from beheeromgeving.invalidation import Invalidation, on_invalidate
+
+logger = logging.getLogger(__name__)
+
+SURROGATE_KEY_HEADER = "Surrogate-Key"
+PRODUCT_LIST_KEY = "products"
+TEAM_LIST_KEY = "teams"
+
+_surrogate_keys: ContextVar[set[str] | None] = ContextVar("surrogate_keys", default=None)
+
+
+def tag(*keys: str):
+    """Add surrogate keys to the response of the current request."""
+    keys_ = _surrogate_keys.get()
+    if keys_ is not None:
+        keys_.update(keys)
+
+
+def product_key(id: int) -> str:
+    return f"product-{id}"
+
+
+def team_key(id: int) -> str:
+    return f"team-{id}"
+
+
+def contract_key(id: int) -> str:
+    return f"contract-{id}"
+
+
+class HttpCacheMiddleware:
+    def __init__(self, get_response):
+        if not settings.HTTP_CACHE_MAX_AGE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        keys: set[str] = set()
+        token = _surrogate_keys.set(keys)
+        try:
+            response = self.get_response(request)
+        finally:
+            _surrogate_keys.reset(token)
+
+        if request.method not in ("GET", "HEAD"):
+            return response
+        patch_vary_headers(response, ["Authorization"])
+        if response.has_header("Cache-Control"):
+            # The view knows best.
+            return response
+        if "Authorization" in request.headers:
+            patch_cache_control(response, private=True)
+        elif keys and response.status_code == 200:
+            patch_cache_control(
+                response, public=True, max_age=0, s_maxage=settings.HTTP_CACHE_MAX_AGE
+            )
+            response[SURROGATE_KEY_HEADER] = " ".join(sorted(keys))
+        return response
+
+
+Purger = Callable[[set[str]], None]
+
+_purgers: list[Purger] = []
+
+
+def on_purge(purger: Purger) -> Purger:
+    """Register a purger of surrogate keys, can be used as decorator."""
+    _purgers.append(purger)
+    return purger
+
+
+def keys_to_purge(invalidation: Invalidation) -> set[str]:
+    keys = {product_key(id) for id in invalidation.product_ids}
+    # A change to a product comes with its team, which only changes along with it when the
+    # product is (un)published or deleted: that changes its count of published products.
+    if invalidation.published or not invalidation.product_ids:
+        keys |= {team_key(id) for id in invalidation.team_ids}
+        if invalidation.team_ids:
+            keys.add(TEAM_LIST_KEY)
+    if invalidation.published:
+        keys.add(PRODUCT_LIST_KEY)
+    return keys
+
+
+@on_invalidate
+def purge(invalidation: Invalidation):
+    # Only by the worker that made the change, the proxy is shared.
+    if not invalidation.local or not settings.HTTP_CACHE_MAX_AGE:
+        return
+    keys = keys_to_purge(invalidation)
+    for purger in list(_purgers):
+        try:
+            purger(keys)
+        except Exception:
+            logger.exception("Purging %s with %r failed", " ".join(sorted(keys)), purger)
+
+
+@on_purge
+def http_purge(keys: Iterable[str]):
+    if not settings.HTTP_CACHE_PURGE_URL:
+        return
+    response = requests.request(
+        "PURGE",
+        settings.HTTP_CACHE_PURGE_URL,
+        headers={SURROGATE_KEY_HEADER: " ".join(sorted(keys))},
+        timeout=settings.HTTP_CACHE_PURGE_TIMEOUT,
+    )
+    response.raise_for_status()
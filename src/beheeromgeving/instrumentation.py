@@ -0,0 +1,160 @@
+"""
+Per-request performance metrics.
+
+The RequestMetricsMiddleware counts the SQL queries of each request and how long they took.
+Other parts of the application add their own timings with `timed()`, e.g.
+`with timed("serialization"): ...` or `@timed("authorization")`, and count events with `count()`,
+e.g. the hits of a cache. At the end of the request the
+metrics are added to the OpenTelemetry span, logged, and (for admins or when the
+SERVER_TIMING setting is on) returned in a Server-Timing header. With a connection pool
+(DATABASE_POOL) its state at the end of the request is added as well.
+"""
+
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connections
+from opentelemetry import trace
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RequestMetrics:
+    started: float = field(default_factory=time.perf_counter)
+    sql_count: int = 0
+    durations: dict[str, float] = field(default_factory=dict)
+    counts: dict[str, int] = field(default_factory=dict)
+
+    def add(self, name: str, seconds: float):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def count(self, name: str):
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def __call__(self, execute, sql, params, many, context):
+        """Used as database execute_wrapper, to measure each query."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.add("db", time.perf_counter() - start)
+
+    @property
+    def durations_ms(self) -> dict[str, float]:
+        return {name: round(seconds * 1000, 2) for name, seconds in self.durations.items()}
+
+
+def pool_metrics() -> dict[str, int]:
+    """Connections in use, available and requests waiting for one, of the default pool."""
+    pool = getattr(connections["default"], "pool", None)
+    if pool is None:
+        return {}
+    stats = pool.get_stats()
+    return {
+        "in_use": stats["pool_size"] - stats["pool_available"],
+        "available": stats["pool_available"],
+        "waiting": stats.get("requests_waiting", 0),
+    }
+
+
+_current_metrics: ContextVar[RequestMetrics | None] = ContextVar("request_metrics", default=None)
+
+
+def current_metrics() -> RequestMetrics | None:
+    return _current_metrics.get()
+
+
+@contextmanager
+def timed(name: str):
+    """Add the time spent in the block (or decorated function) to the current request."""
+    metrics = _current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.perf_counter() - start)
+
+
+def count(name: str):
+    """Count an event in the current request."""
+    metrics = _current_metrics.get()
+    if metrics is not None:
+        metrics.count(name)
+
+
+class RequestMetricsMiddleware:
+    """Collects the RequestMetrics of a request.
+
+    Should be placed before the authorization middleware, so the token verification is
+    measured as well (see token_cache.py).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _current_metrics.reset(token)
+        metrics.add("total", time.perf_counter() - metrics.started)
+        self._report(request, response, metrics)
+        return response
+
+    def _report(self, request, response, metrics: RequestMetrics):
+        durations_ms = metrics.durations_ms
+        pool = pool_metrics()
+
+        span = trace.get_current_span()
+        if span.is_recording():
+            span.set_attribute("app.db.query_count", metrics.sql_count)
+            for name, duration in durations_ms.items():
+                span.set_attribute(f"app.{name}.duration_ms", duration)
+            for name, value in metrics.counts.items():
+                span.set_attribute(f"app.{name}", value)
+            for name, value in pool.items():
+                span.set_attribute(f"app.db.pool.{name}", value)
+
+        logger.info(
+            "%s %s took %sms",
+            request.method,
+            request.path,
+            durations_ms["total"],
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "status_code": response.status_code,
+                "sql_count": metrics.sql_count,
+                **{f"{name}_ms": duration for name, duration in durations_ms.items()},
+                **metrics.counts,
+                **{f"db_pool_{name}": value for name, value in pool.items()},
+            },
+        )
+
+        if self._show_server_timing(request):
+            response["Server-Timing"] = ", ".join(
+                f'{name};dur={duration};desc="{metrics.sql_count} queries"'
+                if name == "db"
+                else f"{name};dur={duration}"
+                for name, duration in durations_ms.items()
+            )
+
+    def _show_server_timing(self, request) -> bool:
+        if settings.SERVER_TIMING:
+            return True
+        scopes = getattr(request, "get_token_scopes", None) or []
+        return settings.ADMIN_ROLE_NAME in scopes
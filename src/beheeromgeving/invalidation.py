@@ -0,0 +1,170 @@
+"""
+Invalidation of the in-process caches of all workers, with PostgreSQL LISTEN/NOTIFY.
+
+Each worker caches in its own memory. When a repository changes a product or team, it calls
+`notify()` with their ids. That sends a NOTIFY in the transaction of the change, which
+PostgreSQL delivers to the listeners when (and only if) the transaction commits. Every
+worker runs a listener thread, on a connection of its own, that passes the ids to the
+handlers registered with `on_invalidate()`, so they can evict their entries. The worker that
+made the change runs the handlers itself right after the commit, so it reads its own writes
+without waiting for the notification.
+
+A change to a team also changes its products (e.g. their owner), so handlers that cache
+products should evict the products of the invalidated teams as well. When the listener
+(re)connects, notifications may have been missed, so everything is invalidated.
+
+The listener is started by the InvalidationMiddleware on the first request of each worker,
+unless CACHE_INVALIDATION is off. Not on the warm-up requests (see bootstrap.py): when uWSGI
+loads the application in its master, those run before the workers are forked, which would
+share the connection of the listener but not its thread.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field, replace
+
+import psycopg
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "catalogus_invalidation"
+# Seconds between checks whether the listener should stop.
+POLL_TIMEOUT = 5.0
+RECONNECT_DELAY = 5.0
+# Set in the environ of the warm-up requests.
+WARM_UP_ENVIRON_KEY = "beheeromgeving.warm_up"
+
+
+@dataclass(frozen=True)
+class Invalidation:
+    product_ids: frozenset[int] = frozenset()
+    team_ids: frozenset[int] = frozenset()
+    # Whether products were (un)published or deleted, which changes the lists they're in.
+    published: bool = False
+    everything: bool = False
+    # Whether the change was made by this worker, which is the one to update shared caches.
+    local: bool = field(default=False, compare=False)
+
+    def to_payload(self) -> str:
+        data = {"products": sorted(self.product_ids), "teams": sorted(self.team_ids)}
+        if self.published:
+            data["published"] = True
+        return json.dumps(data)
+
+    @classmethod
+    def from_payload(cls, payload: str) -> Invalidation:
+        data = json.loads(payload)
+        return cls(
+            product_ids=frozenset(data["products"]),
+            team_ids=frozenset(data["teams"]),
+            published=data.get("published", False),
+        )
+
+
+Handler = Callable[[Invalidation], None]
+
+_handlers: list[Handler] = []
+
+
+def on_invalidate(handler: Handler) -> Handler:
+    """Register a handler that evicts what is invalidated, can be used as decorator."""
+    _handlers.append(handler)
+    return handler
+
+
+def dispatch(invalidation: Invalidation):
+    for handler in list(_handlers):
+        try:
+            handler(invalidation)
+        except Exception:
+            logger.exception("Cache invalidation handler %r failed", handler)
+
+
+def notify(
+    *,
+    product_ids: Iterable[int | None] = (),
+    team_ids: Iterable[int | None] = (),
+    published: bool = False,
+):
+    """Invalidate the products and teams in all workers, once the transaction commits."""
+    invalidation = Invalidation(
+        product_ids=frozenset(id for id in product_ids if id is not None),
+        team_ids=frozenset(id for id in team_ids if id is not None),
+        published=published,
+    )
+    if not invalidation.product_ids and not invalidation.team_ids:
+        return
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, %s)", [CHANNEL, invalidation.to_payload()])
+    transaction.on_commit(lambda: dispatch(replace(invalidation, local=True)))
+
+
+class Listener:
+    def __init__(self, using: str = DEFAULT_DB_ALIAS):
+        self.using = using
+        self.pid: int | None = None
+        self.thread: threading.Thread | None = None
+        self.listening = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def ensure_running(self):
+        """Start the listener thread of this process, if it isn't running yet. Workers that
+        are forked from the uWSGI master don't inherit its threads, so each starts its own."""
+        if self.pid == os.getpid():
+            return
+        with self._lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self._stop.clear()
+            self.listening.clear()
+            self.thread = threading.Thread(target=self.run, name="cache-invalidation", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.pid = None
+
+    def connect(self) -> psycopg.Connection:
+        # Not a connection of Django (or its pool): this one is kept open for good.
+        params = connections[self.using].get_connection_params()
+        return psycopg.connect(**params, autocommit=True)
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                with self.connect() as connection:
+                    connection.execute(f"LISTEN {CHANNEL}")
+                    dispatch(Invalidation(everything=True))
+                    self.listening.set()
+                    while not self._stop.is_set():
+                        for notification in connection.notifies(timeout=POLL_TIMEOUT):
+                            dispatch(Invalidation.from_payload(notification.payload))
+            except psycopg.Error:
+                logger.warning("Cache invalidation listener lost its connection", exc_info=True)
+                self.listening.clear()
+                self._stop.wait(RECONNECT_DELAY)
+
+
+listener = Listener()
+
+
+class InvalidationMiddleware:
+    def __init__(self, get_response):
+        if not settings.CACHE_INVALIDATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not request.META.get(WARM_UP_ENVIRON_KEY):
+            listener.ensure_running()
+        return self.get_response(request)
@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from beheeromgeving.webhooks import Dispatcher, retry_dead
+
+
+class Command(BaseCommand):
+    help = "Deliver the changes to products and contracts to the webhook subscriptions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            default=False,
+            help="Enqueue and deliver once, instead of polling",
+            dest="once",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--retry-dead",
+            default=False,
+            help="Queue the deliveries that failed too often again",
+            dest="retry_dead",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--interval",
+            default=settings.WEBHOOK_POLL_INTERVAL,
+            type=float,
+            help="Seconds between polls",
+            dest="interval",
+        )
+
+        return super().add_arguments(parser)
+
+    def handle(self, *args, **options):
+        if options["retry_dead"]:
+            self.stdout.write(f"queued {retry_dead()} dead deliveries again")
+
+        dispatcher = Dispatcher()
+        while True:
+            queued, delivered = dispatcher.run_once()
+            if queued or delivered:
+                self.stdout.write(f"queued {queued}, delivered {delivered}")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -16,16 +16,16 @@ from api.datatransferobjects import (
     ProductUpdate,
     RefreshPeriod,
 )
+from beheeromgeving.container import container
 from beheeromgeving.management.commands.refresh_periods import (
     FREQUENCY_MAP,
     REFRESH_MAP,
     UNIT_MAP,
 )
-from domain.auth import AuthorizationRepository, AuthorizationService, authorize
 from domain.exceptions import NotAuthorized, ObjectDoesNotExist, ValidationError
-from domain.product import ProductRepository, ProductService, enums
+from domain.product import ProductService, enums
 from domain.product.objects import Product
-from domain.team import TeamRepository, TeamService
+from domain.team import TeamService
 from domain.team.objects import Team
 
 MARKETPLACE_URL = "https://dmpfunc002.amsterdam.nl/marketplace"
@@ -38,9 +38,8 @@ class Command(BaseCommand):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        authorize.set_auth_service(AuthorizationService(AuthorizationRepository()))
-        self.service = ProductService(ProductRepository())
-        self.team_service = TeamService(TeamRepository())
+        self.service = container.services.products
+        self.team_service = container.services.teams
 
     def add_arguments(self, parser):
         parser.add_argument(
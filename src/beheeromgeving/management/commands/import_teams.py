@@ -3,15 +3,13 @@ from django.conf import settings
 from django.core.management import BaseCommand
 
 from api.datatransferobjects import TeamCreate
-from domain.auth import AuthorizationRepository, AuthorizationService, authorize
+from beheeromgeving.container import container
 from domain.exceptions import ValidationError
-from domain.team import TeamRepository, TeamService
 
 
 class Command(BaseCommand):
     def __init__(self):
-        self.service = TeamService(TeamRepository())
-        authorize.set_auth_service(AuthorizationService(AuthorizationRepository()))
+        self.service = container.services.teams
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -0,0 +1,77 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beheeromgeving", "0029_alter_live_last_updated_defaults"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Change",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "object_type",
+                    models.CharField(
+                        choices=[("product", "Product"), ("contract", "Contract")], max_length=8
+                    ),
+                ),
+                (
+                    "event",
+                    models.CharField(
+                        choices=[
+                            ("create", "Create"),
+                            ("update", "Update"),
+                            ("publish", "Publish"),
+                            ("delete", "Delete"),
+                        ],
+                        max_length=8,
+                    ),
+                ),
+                ("product_id", models.BigIntegerField()),
+                ("contract_id", models.BigIntegerField(blank=True, null=True)),
+                (
+                    "publication_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("D", "Draft"),
+                            ("R", "In review"),
+                            ("A", "Approved"),
+                            ("I", "Internally published"),
+                            ("P", "Published"),
+                            ("E", "Expired"),
+                            ("X", "Deleted"),
+                        ],
+                        max_length=1,
+                        null=True,
+                    ),
+                ),
+                (
+                    "previous_publication_status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("D", "Draft"),
+                            ("R", "In review"),
+                            ("A", "Approved"),
+                            ("I", "Internally published"),
+                            ("P", "Published"),
+                            ("E", "Expired"),
+                            ("X", "Deleted"),
+                        ],
+                        max_length=1,
+                        null=True,
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,125 @@
+import django.contrib.postgres.fields
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+PUBLICATION_STATUSES = [
+    ("D", "Draft"),
+    ("R", "In review"),
+    ("A", "Approved"),
+    ("I", "Internally published"),
+    ("P", "Published"),
+    ("E", "Expired"),
+    ("X", "Deleted"),
+]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beheeromgeving", "0030_change"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WebhookSubscription",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("url", models.URLField(max_length=512, verbose_name="URL")),
+                (
+                    "secret",
+                    models.CharField(
+                        help_text="Key of the signatures", max_length=64, verbose_name="Secret"
+                    ),
+                ),
+                (
+                    "event_types",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(
+                            choices=[
+                                ("create", "Create"),
+                                ("update", "Update"),
+                                ("publish", "Publish"),
+                                ("delete", "Delete"),
+                            ],
+                            max_length=8,
+                        ),
+                        blank=True,
+                        default=list,
+                        size=None,
+                    ),
+                ),
+                (
+                    "publication_statuses",
+                    django.contrib.postgres.fields.ArrayField(
+                        base_field=models.CharField(choices=PUBLICATION_STATUSES, max_length=1),
+                        blank=True,
+                        default=list,
+                        size=None,
+                    ),
+                ),
+                ("cursor", models.BigIntegerField(default=0)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "team",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Het team van wiens producten de wijzigingen worden gestuurd, "
+                        "of alle producten als het leeg is",
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="webhook_subscriptions",
+                        to="beheeromgeving.team",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="WebhookDelivery",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("payload", models.JSONField()),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("delivered", "Delivered"),
+                            ("dead", "Dead"),
+                        ],
+                        default="pending",
+                        max_length=9,
+                    ),
+                ),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("next_attempt_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_error", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("delivered_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "subscription",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="deliveries",
+                        to="beheeromgeving.webhooksubscription",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "next_attempt_at"], name="webhook_delivery_due_idx"
+                    )
+                ],
+            },
+        ),
+    ]
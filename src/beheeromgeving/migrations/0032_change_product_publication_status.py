@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def record_product_publication_status(apps, schema_editor):
+    """The changes to contracts so far get the current status of their product."""
+    Change = apps.get_model("beheeromgeving", "Change")
+    Product = apps.get_model("beheeromgeving", "Product")
+    Change.objects.filter(object_type="contract").update(
+        product_publication_status=Subquery(
+            Product.objects.filter(pk=OuterRef("product_id")).values("publication_status")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("beheeromgeving", "0031_webhooksubscription_webhookdelivery"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="change",
+            name="product_publication_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("D", "Draft"),
+                    ("R", "In review"),
+                    ("A", "Approved"),
+                    ("I", "Internally published"),
+                    ("P", "Published"),
+                    ("E", "Expired"),
+                    ("X", "Deleted"),
+                ],
+                max_length=1,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(record_product_publication_status, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+from collections.abc import Collection, Iterable
+
 from django.contrib.postgres.fields import ArrayField
 from django.core.validators import EmailValidator
-from django.db import models
+from django.db import connections, models, router
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from domain.product import enums, objects
 from domain.team import Team as DomainTeam
+from domain.webhook import WebhookSubscription as DomainWebhookSubscription
+from domain.webhook.enums import DeliveryStatus
+
+
+def _sorted_by_pk[M: models.Model](instances: Iterable[M]) -> list[M]:
+    """Order related objects in Python rather than with .order_by(), which would bypass
+    prefetched relations and query them again."""
+    return sorted(instances, key=lambda instance: instance.pk)
 
 
 class Product(models.Model):
@@ -166,10 +176,21 @@ class Product(models.Model):
         else:
             self._owner = None
 
-    def to_domain(self, published_only: bool = False):
+    def to_domain(self, published_only: bool = False, include: Collection[str] | None = None):
+        """Convert to a domain Product. Only the relations in include (see PRODUCT_RELATIONS)
+        are hydrated, all of them by default."""
         if published_only and self.publication_status != enums.PublicationStatus.PUBLISHED.value:
             return None
-        contracts = [c.to_domain() for c in self.contracts.order_by("id")]
+        if include is None:
+            include = objects.PRODUCT_RELATIONS
+        contracts = (
+            [
+                c.to_domain(include_distributions="contracts.distributions" in include)
+                for c in _sorted_by_pk(self.contracts.all())
+            ]
+            if "contracts" in include
+            else []
+        )
         if published_only:
             contracts = [
                 c
@@ -203,9 +224,13 @@ class Product(models.Model):
             contact_email=self.contact_email,
             data_steward=self.data_steward,
             endorsement=self.endorsement,
-            services=[s.to_domain() for s in self.services.order_by("id")],
-            sources=list(self.sources.values_list("pk", flat=True)),
-            sinks=list(self.sinks.values_list("pk", flat=True)),
+            services=(
+                [s.to_domain() for s in _sorted_by_pk(self.services.all())]
+                if "services" in include
+                else []
+            ),
+            sources=sorted(p.pk for p in self.sources.all()) if "sources" in include else [],
+            sinks=sorted(p.pk for p in self.sinks.all()) if "sinks" in include else [],
         )
 
     @classmethod
@@ -504,7 +529,7 @@ class DataContract(models.Model):
         else:
             return None
 
-    def to_domain(self):
+    def to_domain(self, include_distributions: bool = True):
         return objects.DataContract(
             id=self.pk,
             has_revision=hasattr(self, "revision"),
@@ -519,7 +544,11 @@ class DataContract(models.Model):
             confidentiality=self.confidentiality,
             start_date=self.start_date,
             retainment_period=self.retainment_period,
-            distributions=[d.to_domain() for d in self.distributions.order_by("id")],
+            distributions=(
+                [d.to_domain() for d in _sorted_by_pk(self.distributions.all())]
+                if include_distributions
+                else []
+            ),
             tables=self.tables,
             schema_url=self.schema_url,
         )
@@ -618,9 +647,7 @@ class DataContractRevision(models.Model):
         if self.has_distribution_draft:
             domain_contract.distributions = [
                 distribution.to_domain()
-                for distribution in self.distributions.select_related(
-                    "live_distribution"
-                ).order_by("id")
+                for distribution in _sorted_by_pk(self.distributions.all())
             ]
         return domain_contract
 
@@ -819,7 +846,11 @@ class Team(models.Model):
             po_email=self.po_email,
             contact_email=self.contact_email,
             scope=self.scope,
-            product_count=self.products.filter(publication_status__in=["P", "I"]).count(),
+            product_count=(
+                self.published_product_count
+                if hasattr(self, "published_product_count")
+                else self.products.filter(publication_status__in=["P", "I"]).count()
+            ),
         )
 
     @classmethod
@@ -946,3 +977,142 @@ class DataService(models.Model):
             defaults={**service.items(), "product_id": product_id}
         )
         return instance.pk
+
+
+# The key of the advisory lock that serializes writes to the outbox.
+CHANGE_LOCK_ID = 0x6368616E676573
+
+
+class Change(models.Model):
+    """The outbox: one row per change to a product or contract, written in the transaction
+    of the change itself. The id is the cursor of the change feed (GET /changes).
+
+    The product and contract ids aren't foreign keys, deletions are recorded as well. Changes
+    to a contract also record the publication status of its product (before it was deleted,
+    when it's deleted with the product), which decides who may see them.
+    """
+
+    created_at = models.DateTimeField(default=timezone.now)
+    object_type = models.CharField(max_length=8, choices=enums.ChangeObjectType.choices())
+    event = models.CharField(max_length=8, choices=enums.ChangeEvent.choices())
+    product_id = models.BigIntegerField()
+    contract_id = models.BigIntegerField(null=True, blank=True)
+    publication_status = models.CharField(
+        max_length=1, null=True, blank=True, choices=enums.PublicationStatus.choices()
+    )
+    previous_publication_status = models.CharField(
+        max_length=1, null=True, blank=True, choices=enums.PublicationStatus.choices()
+    )
+    product_publication_status = models.CharField(
+        max_length=1, null=True, blank=True, choices=enums.PublicationStatus.choices()
+    )
+
+    def __str__(self):
+        return f"{self.pk}: {self.event} {self.object_type} {self.contract_id or self.product_id}"
+
+    def to_domain(self):
+        return objects.Change(
+            id=self.pk,
+            created_at=self.created_at,
+            object_type=self.object_type,
+            event=self.event,
+            product_id=self.product_id,
+            contract_id=self.contract_id,
+            publication_status=self.publication_status,
+            previous_publication_status=self.previous_publication_status,
+        )
+
+    @classmethod
+    def record(cls, changes: Iterable[Change]):
+        """Add changes to the outbox, must be called inside the transaction of the change.
+
+        Ids are taken from a sequence when a row is inserted, not when it is committed, so
+        a reader could see id 11 before a concurrent transaction commits id 10 and skip it
+        for good. The transaction-scoped advisory lock makes writers take ids in the order
+        they commit in.
+        """
+        changes = list(changes)
+        if not changes:
+            return
+        using = router.db_for_write(cls)
+        with connections[using].cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [CHANGE_LOCK_ID])
+        cls.objects.using(using).bulk_create(changes)
+
+
+class WebhookSubscription(models.Model):
+    url = models.URLField(_("URL"), max_length=512)
+    secret = models.CharField(_("Secret"), max_length=64, help_text="Key of the signatures")
+    team = models.ForeignKey[Team](
+        "Team",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="webhook_subscriptions",
+        help_text="Het team van wiens producten de wijzigingen worden gestuurd, of alle "
+        "producten als het leeg is",
+    )
+    event_types = ArrayField(
+        models.CharField(max_length=8, choices=enums.ChangeEvent.choices()),
+        default=list,
+        blank=True,
+    )
+    publication_statuses = ArrayField(
+        models.CharField(max_length=1, choices=enums.PublicationStatus.choices()),
+        default=list,
+        blank=True,
+    )
+    # The id of the last Change that was queued for delivery.
+    cursor = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.url
+
+    def to_domain(self) -> DomainWebhookSubscription:
+        return DomainWebhookSubscription(
+            id=self.pk,
+            url=self.url,
+            team_id=self.team_id,
+            event_types=self.event_types,
+            publication_statuses=self.publication_statuses,
+            secret=self.secret,
+            created_at=self.created_at,
+        )
+
+    @classmethod
+    def from_domain(
+        cls, subscription: DomainWebhookSubscription, cursor: int | None = None
+    ) -> DomainWebhookSubscription:
+        defaults = subscription.items()
+        if cursor is not None:
+            defaults["cursor"] = cursor
+        instance, _created = cls.objects.filter(pk=subscription.id).update_or_create(
+            defaults=defaults
+        )
+        return instance.to_domain()
+
+
+class WebhookDelivery(models.Model):
+    """A batch of changes to post to a subscription, kept after the last attempt failed."""
+
+    subscription = models.ForeignKey[WebhookSubscription](
+        "WebhookSubscription", on_delete=models.CASCADE, related_name="deliveries"
+    )
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=9, choices=DeliveryStatus.choices(), default=DeliveryStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(default=timezone.now)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="webhook_delivery_due_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.pk}: {self.status}"
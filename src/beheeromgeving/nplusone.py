@@ -0,0 +1,132 @@
+"""
+Detection of N+1 queries, for development and test runs.
+
+A related object is loaded lazily when it comes neither from select_related nor from the
+prefetch cache, e.g. `product.contracts.order_by("id")` or a deferred field. Doing that for
+a single instance costs one query, doing it for every product of a list is an N+1 query.
+
+With the NPLUSONE_DETECTION setting set to "log" or "raise", the NPlusOneMiddleware watches
+GET requests and logs (or raises NPlusOneQuery) with the call site as soon as a relation of
+a Product, DataContract, Distribution or ProductRevision is loaded lazily for a second
+instance. Mutations save aggregates row by row on purpose, so they aren't watched.
+"""
+
+import functools
+import logging
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.models import Model, QuerySet
+
+from beheeromgeving import models as orm
+
+logger = logging.getLogger(__name__)
+
+WATCHED_MODELS = (orm.Product, orm.DataContract, orm.Distribution, orm.ProductRevision)
+PROJECT_ROOT = str(Path(__file__).resolve().parents[2])
+
+
+class NPlusOneQuery(Exception):
+    pass
+
+
+def _call_site() -> str:
+    """The innermost frame of our own code (or tests), where the lazy load was triggered."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (
+            filename.startswith(PROJECT_ROOT)
+            and "site-packages" not in filename
+            and filename != __file__
+        ):
+            return f"{filename}:{frame.lineno} in {frame.name}"
+    return "unknown location"
+
+
+@dataclass
+class Detector:
+    mode: str
+    # The primary keys of the instances a relation was loaded for, by (model, related model).
+    loads: dict[tuple[type[Model], type[Model]], set] = field(default_factory=dict)
+    depth: int = 0
+
+    def record(self, queryset: QuerySet):
+        # Related managers, related descriptors and deferred fields add the instance they
+        # load for as a hint to the queryset.
+        instance = queryset._hints.get("instance")
+        if not isinstance(instance, WATCHED_MODELS):
+            return
+        key = (type(instance), queryset.model)
+        instances = self.loads.setdefault(key, set())
+        instances.add(instance.pk)
+        if len(instances) == 2:
+            self.report(*key)
+
+    def report(self, model: type[Model], related_model: type[Model]):
+        message = (
+            f"N+1 query: {related_model.__name__} of {model.__name__} is loaded lazily "
+            f"for multiple instances, at {_call_site()}"
+        )
+        if self.mode == "raise":
+            raise NPlusOneQuery(message)
+        logger.warning(message)
+
+
+_current_detector: ContextVar[Detector | None] = ContextVar("nplusone_detector", default=None)
+
+
+def _watched(method):
+    @functools.wraps(method)
+    def wrapper(self: QuerySet, *args, **kwargs):
+        detector = _current_detector.get()
+        if detector is None or self._result_cache is not None:
+            return method(self, *args, **kwargs)
+        # Queries inside another query are prefetches, those are what we want.
+        if detector.depth == 0:
+            detector.record(self)
+        detector.depth += 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            detector.depth -= 1
+
+    wrapper.watched = True
+    return wrapper
+
+
+def install():
+    """Watch the queryset methods that hit the database. Idempotent."""
+    for name in ("_fetch_all", "count", "exists"):
+        method = getattr(QuerySet, name)
+        if not getattr(method, "watched", False):
+            setattr(QuerySet, name, _watched(method))
+
+
+@contextmanager
+def detect_n_plus_one(mode: str = "raise"):
+    """Detect N+1 queries in the block, e.g. in a test or a shell session."""
+    install()
+    token = _current_detector.set(Detector(mode))
+    try:
+        yield
+    finally:
+        _current_detector.reset(token)
+
+
+class NPlusOneMiddleware:
+    def __init__(self, get_response):
+        if not settings.NPLUSONE_DETECTION:
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ("GET", "HEAD"):
+            return self.get_response(request)
+        with detect_n_plus_one(settings.NPLUSONE_DETECTION):
+            return self.get_response(request)
@@ -0,0 +1,51 @@
+"""
+The PostgreSQL backend of Django, with support for passwords that are rotated.
+
+On Azure the password is an Entra ID access token in a file, which is refreshed before it
+expires. With PASSWORD_FILE (instead of PASSWORD) in the database settings, that file is read
+for every new physical connection, also for the connections of the psycopg pool.
+"""
+
+import functools
+from pathlib import Path
+
+import psycopg
+from django.db.backends.postgresql import base
+
+from beheeromgeving.instrumentation import timed
+
+
+@functools.cache
+def password_file_connection(password_file: str) -> type[psycopg.Connection]:
+    """A connection class for the psycopg pool, which reads the password on connect."""
+
+    class PasswordFileConnection(psycopg.Connection):
+        @classmethod
+        def connect(cls, conninfo: str = "", **kwargs):
+            kwargs["password"] = Path(password_file).read_text()
+            return super().connect(conninfo, **kwargs)
+
+    return PasswordFileConnection
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, settings_dict, *args, **kwargs):
+        pool_options = settings_dict["OPTIONS"].get("pool")
+        if pool_options and (password_file := settings_dict.get("PASSWORD_FILE")):
+            settings_dict["OPTIONS"]["pool"] = {
+                **({} if pool_options is True else pool_options),
+                "connection_class": password_file_connection(password_file),
+            }
+        super().__init__(settings_dict, *args, **kwargs)
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        if password_file := self.settings_dict.get("PASSWORD_FILE"):
+            params["password"] = Path(password_file).read_text()
+        return params
+
+    @timed("connect")
+    def get_new_connection(self, conn_params):
+        # Without a pool that's connecting (TCP, TLS, authentication), with a pool the wait
+        # until a connection is available.
+        return super().get_new_connection(conn_params)
@@ -0,0 +1,83 @@
+"""
+Read replicas.
+
+The ReplicaMiddleware marks safe (GET, HEAD) requests as read-only, and the ReplicaRouter
+sends the reads of those requests to one of the DATABASE_REPLICAS. Everything else, like
+mutations and anything in a transaction, uses the primary (default) database.
+
+Replicas lag behind a little, so after a successful mutation the client gets a cookie that
+pins its reads to the primary for DATABASE_REPLICA_PIN_SECONDS, so it reads its own writes.
+Clients that don't keep cookies can send the X-Read-Primary header instead.
+
+What is cached beyond the request is read inside `reading_from_primary()`, as a cache would
+keep what a lagging replica returned after the change was invalidated.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = "catalogus_read_primary"
+PIN_HEADER = "X-Read-Primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_read_only: ContextVar[bool] = ContextVar("read_only", default=False)
+
+
+@contextmanager
+def reading_from_primary():
+    """Send the reads in the block to the primary, also in a read-only request."""
+    token = _read_only.set(False)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _read_only.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)  # noqa: S311 (not for security)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            if response.status_code < 400:
+                response.set_cookie(
+                    PIN_COOKIE,
+                    "1",
+                    max_age=settings.DATABASE_REPLICA_PIN_SECONDS,
+                    secure=request.is_secure(),
+                    httponly=True,
+                    samesite="Lax",
+                )
+            return response
+
+        pinned = PIN_COOKIE in request.COOKIES or PIN_HEADER in request.headers
+        token = _read_only.set(not pinned)
+        try:
+            return self.get_response(request)
+        finally:
+            _read_only.reset(token)
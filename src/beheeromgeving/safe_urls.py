@@ -0,0 +1,45 @@
+"""
+Checks of urls that the server itself requests, such as the urls of webhooks.
+
+Anyone with a team can choose such a url, so without a check the server could be made to
+post to the services in its own network, or to the metadata endpoint of the cloud
+(169.254.169.254). The host of a url must resolve to public addresses only, unless it's
+in WEBHOOK_ALLOWED_HOSTS.
+"""
+
+import ipaddress
+import socket
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+
+class UnsafeURL(ValueError):
+    """A url that the server shouldn't request."""
+
+
+def check_url(url: str) -> None:
+    """Raise UnsafeURL if the host of the url isn't allowed, or resolves to an address
+    that isn't public (loopback, private, link-local, reserved, ...)."""
+    host = urlsplit(url).hostname
+    if not host:
+        raise UnsafeURL(f"The url {url} has no host.")
+    if host in settings.WEBHOOK_ALLOWED_HOSTS:
+        return
+    for address in _addresses(host):
+        if not address.is_global:
+            raise UnsafeURL(f"The host {host} resolves to {address}, not a public address.")
+
+
+def _addresses(host: str) -> set[ipaddress.IPv4Address | ipaddress.IPv6Address]:
+    try:
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        raise UnsafeURL(f"The host {host} can't be resolved.") from e
+    addresses = set()
+    for *_, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        addresses.add(address)
+    return addresses
@@ -0,0 +1,86 @@
+"""
+OpenTelemetry tracing and audit logging to Azure Monitor.
+
+Importing the Azure Monitor distro and the OpenTelemetry SDK takes a large part of the startup
+time, so this is only done by the process that serves requests (see wsgi.py), and not on every
+import of the settings, e.g. by management commands and migrations.
+"""
+
+from django.conf import settings
+
+
+def configure_telemetry():
+    """Enable the telemetry that is configured in the settings.
+
+    Must be called before the WSGI application is created: the Django instrumentor adds its
+    middleware and the audit log handler is added to the LOGGING settings.
+    """
+    if settings.AZURE_APPI_CONNECTION_STRING is not None:
+        _configure_azure_monitor(settings.AZURE_APPI_CONNECTION_STRING)
+    if settings.AZURE_APPI_AUDIT_CONNECTION_STRING is not None:
+        _configure_audit_logging(settings.AZURE_APPI_AUDIT_CONNECTION_STRING)
+
+
+def _response_hook(span, request, response):
+    if (
+        span.is_recording()
+        and hasattr(request, "get_token_claims")
+        and (email := request.get_token_claims.get("email", request.get_token_subject))
+    ):
+        span.set_attribute("user.AuthenticatedId", email)
+
+
+def _configure_azure_monitor(connection_string: str):
+    from azure.monitor.opentelemetry import configure_azure_monitor
+    from opentelemetry.instrumentation.django import DjangoInstrumentor
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.semconv.attributes.service_attributes import SERVICE_NAME
+
+    configure_azure_monitor(
+        connection_string=connection_string,
+        logger_name="root",
+        instrumentation_options={
+            "azure_sdk": {"enabled": False},
+            "django": {"enabled": False},  # Manually done
+            "fastapi": {"enabled": False},
+            "flask": {"enabled": False},
+            "psycopg": {"enabled": False},  # Manually done
+            "requests": {"enabled": True},
+            "urllib": {"enabled": True},
+            "urllib3": {"enabled": True},
+        },
+        resource=Resource.create({SERVICE_NAME: "beheeromgeving-catalogus"}),
+    )
+    print("OpenTelemetry has been enabled")
+
+    DjangoInstrumentor().instrument(response_hook=_response_hook)
+    print("Django instrumentor enabled")
+
+    # Psycopg2Instrumentor().instrument(enable_commenter=True, commenter_options={})
+    # print("Psycopg instrumentor enabled")
+
+
+def _configure_audit_logging(connection_string: str):
+    """Configure audit logging to an extra log."""
+    from azure.monitor.opentelemetry.exporter import AzureMonitorLogExporter
+    from opentelemetry.sdk._logs import LoggerProvider
+    from opentelemetry.sdk._logs.export import BatchLogRecordProcessor
+
+    audit_logger_provider = LoggerProvider()
+    audit_logger_provider.add_log_record_processor(
+        BatchLogRecordProcessor(AzureMonitorLogExporter(connection_string=connection_string))
+    )
+
+    # Attach LoggingHandler to namespaced logger
+    # same as: handler = LoggingHandler(logger_provider=audit_logger_provider)
+    logging_config = settings.LOGGING
+    logging_config["handlers"]["audit_console"] = {
+        "level": "DEBUG",
+        "class": "opentelemetry.sdk._logs.LoggingHandler",
+        "logger_provider": audit_logger_provider,
+        "formatter": "audit_json",
+    }
+    for logger_details in logging_config["loggers"].values():
+        if "audit_console" in logger_details["handlers"]:
+            logger_details["handlers"] = ["audit_console", "console"]
+    print("Audit logging has been enabled")
@@ -0,0 +1,146 @@
+"""
+A cache of the bearer tokens that authorization_django validated.
+
+The frontend and service accounts use the same token for many requests, while verifying its
+signature and claims takes a while each time. The TokenCacheMiddleware wraps the
+authorization_django middleware. When that accepts a token, the attributes it sets on the
+request (the claims, subject and scopes) are kept by the worker, keyed by the hash of the
+token, until the token expires but at most TOKEN_CACHE_TIMEOUT seconds. The TOKEN_CACHE_SIZE
+tokens used last are kept. A request with one of those gets the attributes without verifying
+the token again.
+
+The scopes are made a frozenset, so checking one doesn't scan a list, and what's derived from
+them can be cached for the token as well (like the ProductReadLevel, see
+domain/product/policies.py).
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+
+from authorization_django import authorization_middleware
+from django.conf import settings
+
+from beheeromgeving.instrumentation import count, timed
+
+# What authorization_django sets on the request for a token.
+TOKEN_ATTRIBUTES = (
+    "get_token_subject",
+    "get_token_scopes",
+    "get_token_claims",
+    "is_authorized_for",
+)
+
+
+@dataclass(frozen=True)
+class ValidatedToken:
+    expires_at: float
+    attributes: dict[str, Any]
+
+
+class TokenCache:
+    def __init__(self):
+        self._tokens: OrderedDict[str, ValidatedToken] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> ValidatedToken | None:
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None:
+                return None
+            if token.expires_at <= time.time():
+                del self._tokens[key]
+                return None
+            self._tokens.move_to_end(key)
+            return token
+
+    def put(self, key: str, token: ValidatedToken):
+        with self._lock:
+            self._tokens[key] = token
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > settings.TOKEN_CACHE_SIZE:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+
+token_cache = TokenCache()
+
+
+def _bearer_key(request) -> str | None:
+    authorization = request.headers.get("Authorization", "")
+    if not authorization.startswith("Bearer "):
+        return None
+    return hashlib.sha256(authorization.encode()).hexdigest()
+
+
+def _enabled() -> bool:
+    # The checks authorization_django does after verifying a token (for protected paths or a
+    # minimal scope) would be skipped for a cached one. With ALWAYS_OK, it verifies nothing.
+    authz = settings.DATAPUNT_AUTHZ
+    return settings.TOKEN_CACHE_SIZE > 0 and not any(
+        authz.get(name) for name in ("PROTECTED", "MIN_SCOPE", "ALWAYS_OK")
+    )
+
+
+class TokenCacheMiddleware:
+    """authorization_django's middleware, which skips the tokens it verified before."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.authorize = authorization_middleware(self._validated)
+
+    def __call__(self, request):
+        key = _bearer_key(request) if _enabled() else None
+        if key is None:
+            return self._authorize(request)
+
+        token = token_cache.get(key)
+        if token is None:
+            count("token_cache_misses")
+            return self._authorize(request)
+
+        count("token_cache_hits")
+        for name, value in token.attributes.items():
+            setattr(request, name, value)
+        return self.get_response(request)
+
+    def _authorize(self, request):
+        """Let authorization_django verify the token, timed as "token". It calls _validated,
+        and the rest of the request, when it lets the request through, which ends the timing."""
+        request._token_timing = ExitStack()
+        request._token_timing.enter_context(timed("token"))
+        try:
+            return self.authorize(request)
+        finally:
+            request._token_timing.close()
+
+    def _validated(self, request):
+        """Called by authorization_django for the requests it lets through."""
+        request._token_timing.close()
+        scopes = getattr(request, "get_token_scopes", None)
+        if scopes is not None:
+            request.get_token_scopes = frozenset(scopes)
+        claims = getattr(request, "get_token_claims", None)
+        if claims is not None:
+            # Shared by the requests with the token.
+            request.get_token_claims = MappingProxyType(claims)
+
+        key = _bearer_key(request) if _enabled() else None
+        if key is not None and claims and "exp" in claims:
+            expires_at = min(float(claims["exp"]), time.time() + settings.TOKEN_CACHE_TIMEOUT)
+            attributes = {
+                name: getattr(request, name) for name in TOKEN_ATTRIBUTES if hasattr(request, name)
+            }
+            token_cache.put(key, ValidatedToken(expires_at, attributes))
+        return self.get_response(request)
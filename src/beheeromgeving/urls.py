@@ -1,22 +1,21 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.urls import include, path
-from drf_spectacular.views import (
-    SpectacularJSONAPIView,
-    SpectacularSwaggerView,
-    SpectacularYAMLAPIView,
-)
+from drf_spectacular.views import SpectacularSwaggerView
 from rest_framework.routers import DefaultRouter
 
-from api.views import ProductViewSet, TeamViewSet, health, me
+from api.openapi.views import CachedSpectacularJSONAPIView, CachedSpectacularYAMLAPIView
+from api.views import ProductViewSet, TeamViewSet, WebhookViewSet, changes, health, me
 
 router = DefaultRouter(trailing_slash=False)
 router.register(r"teams", TeamViewSet, basename="teams")
 router.register(r"products", ProductViewSet, basename="products")
+router.register(r"webhooks", WebhookViewSet, basename="webhooks")
 
 urlpatterns = [
-    path("pulse", health),
-    path("me", me),
+    path("pulse", health, name="health"),
+    path("me", me, name="me"),
+    path("changes", changes, name="changes"),
     path(
         "schema",
         SpectacularSwaggerView.as_view(
@@ -25,8 +24,8 @@ urlpatterns = [
         ),
         name="swagger-ui",
     ),
-    path("openapi.json", SpectacularJSONAPIView.as_view(), name="schema-json"),
-    path("openapi.yaml", SpectacularYAMLAPIView.as_view(), name="schema-yaml"),
+    path("openapi.json", CachedSpectacularJSONAPIView.as_view(), name="schema-json"),
+    path("openapi.yaml", CachedSpectacularYAMLAPIView.as_view(), name="schema-yaml"),
 ] + router.urls
 
 if settings.DEBUG:
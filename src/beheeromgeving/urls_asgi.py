@@ -0,0 +1,43 @@
+"""
+The URLs of the ASGI application (see asgi.py).
+
+The same URLs as beheeromgeving/urls.py, but with async views in front of them for reading
+products, teams and /me. Other methods on those URLs go to the regular views.
+"""
+
+from django.urls import URLPattern, path, re_path
+
+from api.views import (
+    async_me,
+    async_product_detail,
+    async_product_list,
+    async_team_list,
+    with_sync_fallback,
+)
+from beheeromgeving.urls import urlpatterns as sync_urlpatterns
+
+sync_views = {
+    pattern.name: pattern.callback
+    for pattern in sync_urlpatterns
+    if isinstance(pattern, URLPattern)
+}
+
+urlpatterns = [
+    path("me", with_sync_fallback(async_me, sync_views["me"]), name="me"),
+    path(
+        "teams",
+        with_sync_fallback(async_team_list, sync_views["teams-list"]),
+        name="teams-list",
+    ),
+    path(
+        "products",
+        with_sync_fallback(async_product_list, sync_views["products-list"]),
+        name="products-list",
+    ),
+    re_path(
+        r"^products/(?P<pk>[^/.]+)$",
+        with_sync_fallback(async_product_detail, sync_views["products-detail"]),
+        name="products-detail",
+    ),
+    *sync_urlpatterns,
+]
@@ -0,0 +1,199 @@
+"""
+Delivery of webhooks, outside of the requests that change the products.
+
+Every change to a product or contract is recorded in the outbox (models.Change), in the
+transaction of the change. The dispatcher (`manage.py dispatch_webhooks`) runs in its own
+process and does two things in a loop:
+
+- enqueue: for every subscription, the changes after its cursor that match it are queued
+  as a WebhookDelivery of at most WEBHOOK_BATCH_SIZE changes, and the cursor moves on.
+- deliver: due deliveries are posted to their url, signed with the secret of the
+  subscription, if its host still resolves to a public address (see safe_urls.py).
+  A delivery that fails is retried with exponential backoff, starting at
+  WEBHOOK_RETRY_DELAY seconds, and is kept as dead after WEBHOOK_MAX_ATTEMPTS attempts.
+
+Deliveries are at least once: a subscriber should use the ids of the changes to skip the
+ones it has seen. Multiple dispatchers can run at the same time, they skip the rows that
+another one has locked.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import time
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max, Q, QuerySet
+from django.utils import timezone
+
+from api import datatransferobjects as dtos
+from beheeromgeving import models as orm
+from beheeromgeving.safe_urls import UnsafeURL, check_url
+from domain.webhook.enums import DeliveryStatus
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+TIMESTAMP_HEADER = "X-Webhook-Timestamp"
+DELIVERY_HEADER = "X-Webhook-Delivery"
+
+
+def sign(secret: str, timestamp: str, body: bytes) -> str:
+    """The signature of a delivery: an HMAC-SHA256 of the timestamp and body, so a
+    subscriber can check where it came from, and reject replays of old ones."""
+    digest = hmac.new(secret.encode(), timestamp.encode() + b"." + body, hashlib.sha256)
+    return f"sha256={digest.hexdigest()}"
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """The time to wait after the given number of failed attempts."""
+    seconds = settings.WEBHOOK_RETRY_DELAY * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.WEBHOOK_MAX_RETRY_DELAY))
+
+
+def matching_changes(subscription: orm.WebhookSubscription) -> QuerySet[orm.Change]:
+    changes = orm.Change.objects.all()
+    if subscription.event_types:
+        changes = changes.filter(event__in=subscription.event_types)
+    if subscription.publication_statuses:
+        changes = changes.filter(
+            Q(publication_status__in=subscription.publication_statuses)
+            | Q(previous_publication_status__in=subscription.publication_statuses)
+        )
+    if subscription.team_id is not None:
+        # Drafts that were deleted for good are gone, along with their team.
+        changes = changes.filter(
+            product_id__in=orm.Product.objects.filter(team_id=subscription.team_id).values("pk")
+        )
+    return changes
+
+
+class Dispatcher:
+    def __init__(self, session: requests.Session | None = None):
+        # A session keeps connections to subscribers open between deliveries.
+        self.session = session or requests.Session()
+
+    def run_once(self) -> tuple[int, int]:
+        """Enqueue new changes and deliver what's due, returns the number of each."""
+        return self.enqueue(), self.deliver()
+
+    def enqueue(self) -> int:
+        # Ids are committed in order (see Change.record), so there are no gaps below this.
+        last_change = orm.Change.objects.aggregate(last=Max("pk"))["last"] or 0
+        queued = 0
+        for subscription_id in orm.WebhookSubscription.objects.filter(
+            cursor__lt=last_change
+        ).values_list("pk", flat=True):
+            with transaction.atomic():
+                subscription = (
+                    orm.WebhookSubscription.objects.select_for_update(skip_locked=True)
+                    .filter(pk=subscription_id)
+                    .first()
+                )
+                if subscription is not None:
+                    queued += self._enqueue_for(subscription, last_change)
+        return queued
+
+    def _enqueue_for(self, subscription: orm.WebhookSubscription, last_change: int) -> int:
+        changes = list(
+            matching_changes(subscription)
+            .filter(pk__gt=subscription.cursor, pk__lte=last_change)
+            .order_by("pk")[: settings.WEBHOOK_BATCH_SIZE]
+        )
+        # A full batch may be followed by more matching changes, continue after it.
+        full = len(changes) == settings.WEBHOOK_BATCH_SIZE
+        subscription.cursor = changes[-1].pk if full else last_change
+        subscription.save(update_fields=["cursor"])
+        if not changes:
+            return 0
+        orm.WebhookDelivery.objects.create(
+            subscription=subscription,
+            payload={
+                "subscription_id": subscription.pk,
+                "changes": [
+                    dtos.Change.model_validate(
+                        change.to_domain(), from_attributes=True
+                    ).model_dump(mode="json")
+                    for change in changes
+                ],
+            },
+        )
+        return 1
+
+    def deliver(self) -> int:
+        return sum(self._send(delivery) for delivery in self._claim())
+
+    def _claim(self) -> list[orm.WebhookDelivery]:
+        """Take the due deliveries, and postpone them while they are sent, so other
+        dispatchers don't send them as well."""
+        now = timezone.now()
+        with transaction.atomic():
+            deliveries = list(
+                orm.WebhookDelivery.objects.select_related("subscription")
+                .select_for_update(skip_locked=True, of=("self",))
+                .filter(status=DeliveryStatus.PENDING, next_attempt_at__lte=now)
+                .order_by("pk")[: settings.WEBHOOK_BATCH_SIZE]
+            )
+            orm.WebhookDelivery.objects.filter(pk__in=[d.pk for d in deliveries]).update(
+                next_attempt_at=now + timedelta(seconds=2 * settings.WEBHOOK_TIMEOUT)
+            )
+        return deliveries
+
+    def _send(self, delivery: orm.WebhookDelivery) -> bool:
+        body = json.dumps(delivery.payload, cls=DjangoJSONEncoder).encode()
+        timestamp = str(int(time.time()))
+        headers = {
+            "Content-Type": "application/json",
+            DELIVERY_HEADER: str(delivery.pk),
+            TIMESTAMP_HEADER: timestamp,
+            SIGNATURE_HEADER: sign(delivery.subscription.secret, timestamp, body),
+        }
+        try:
+            check_url(delivery.subscription.url)
+            response = self.session.post(
+                delivery.subscription.url,
+                data=body,
+                headers=headers,
+                timeout=settings.WEBHOOK_TIMEOUT,
+                allow_redirects=False,
+            )
+            error = "" if 200 <= response.status_code < 300 else f"HTTP {response.status_code}"
+        except (requests.RequestException, UnsafeURL) as e:
+            error = str(e) or type(e).__name__
+
+        delivery.attempts += 1
+        delivery.last_error = error
+        now = timezone.now()
+        if not error:
+            delivery.status = DeliveryStatus.DELIVERED
+            delivery.delivered_at = now
+        elif delivery.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            delivery.status = DeliveryStatus.DEAD
+            logger.warning(
+                "Webhook delivery %s to %s failed %s times, giving up: %s",
+                delivery.pk,
+                delivery.subscription.url,
+                delivery.attempts,
+                error,
+            )
+        else:
+            delivery.next_attempt_at = now + retry_delay(delivery.attempts)
+        delivery.save(
+            update_fields=["attempts", "last_error", "status", "delivered_at", "next_attempt_at"]
+        )
+        return not error
+
+
+def retry_dead(subscription_id: int | None = None) -> int:
+    """Queue the dead deliveries (of a subscription) again, returns how many."""
+    deliveries = orm.WebhookDelivery.objects.filter(status=DeliveryStatus.DEAD)
+    if subscription_id is not None:
+        deliveries = deliveries.filter(subscription_id=subscription_id)
+    return deliveries.update(
+        status=DeliveryStatus.PENDING, attempts=0, next_attempt_at=timezone.now()
+    )
@@ -10,7 +10,15 @@ from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 from whitenoise import WhiteNoise
 
+from beheeromgeving.telemetry import configure_telemetry
+
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "beheeromgeving.settings")
 
+configure_telemetry()
 application = get_wsgi_application()
 application = WhiteNoise(application, root=settings.STATIC_ROOT)
+
+if settings.WARM_UP:
+    from beheeromgeving.bootstrap import warm_up
+
+    warm_up(application)
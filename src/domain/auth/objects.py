@@ -69,6 +69,12 @@ class Rule:
     def method_name(self, name):
         self._method_name = name
 
+    @property
+    def needs_lookup(self) -> bool:
+        """Whether checking the rule looks up data (e.g. the team of a product), rather than
+        only looking at the roles in the scopes."""
+        return self.method_name != "require"
+
 
 # Define standard rules.
 RULES = [
@@ -1,6 +1,9 @@
+from collections.abc import Collection
+
 from django.conf import settings
 
 from beheeromgeving import models as orm
+from beheeromgeving.instrumentation import timed
 from domain.auth import Scope
 from domain.base import AbstractAuthRepository
 
@@ -11,11 +14,26 @@ class AuthorizationRepository(AbstractAuthRepository):
         self.employee_role: str = settings.EMPLOYEE_ROLE_NAME
         self.feature_enabled: bool = settings.FEATURE_FLAG_USE_AUTH
 
-    def can_access_team(self, team_id: int, scopes: list[Scope]) -> bool:
+    @timed("authorization")
+    def can_access_team(self, team_id: int, scopes: Collection[Scope]) -> bool:
         return orm.Team.objects.filter(pk=team_id, scope__in=scopes).exists()
 
-    def can_access_product(self, product_id: int, scopes: list[Scope]) -> bool:
+    @timed("authorization")
+    def can_access_product(self, product_id: int, scopes: Collection[Scope]) -> bool:
         return orm.Product.objects.filter(pk=product_id, team__scope__in=scopes).exists()
 
-    def can_access_product_name(self, name: str, scopes: list[Scope]) -> bool:
+    @timed("authorization")
+    def can_access_product_name(self, name: str, scopes: Collection[Scope]) -> bool:
         return orm.Product.objects.filter(name__iexact=name, team__scope__in=scopes).exists()
+
+    async def acan_access_product(self, product_id: int, scopes: Collection[Scope]) -> bool:
+        with timed("authorization"):
+            return await orm.Product.objects.filter(
+                pk=product_id, team__scope__in=scopes
+            ).aexists()
+
+    async def acan_access_product_name(self, name: str, scopes: Collection[Scope]) -> bool:
+        with timed("authorization"):
+            return await orm.Product.objects.filter(
+                name__iexact=name, team__scope__in=scopes
+            ).aexists()
@@ -1,6 +1,7 @@
-from collections.abc import Callable
-from functools import wraps
+from collections.abc import Callable, Collection
+from functools import partial, wraps
 from typing import ParamSpec, Protocol, TypeVar
+from weakref import WeakKeyDictionary
 
 from domain.auth import (
     RULES,
@@ -35,7 +36,7 @@ class AuthorizationService:
     def require(
         self,
         *args,
-        scopes: list[Scope],
+        scopes: Collection[Scope],
         role: Role | None = None,
         **kwargs,
     ) -> AuthorizationResult:
@@ -51,7 +52,7 @@ class AuthorizationService:
         self,
         *args,
         team_id: TeamId,
-        scopes: list[Scope],
+        scopes: Collection[Scope],
         data: dict,
         permission: Permission,
         **kwargs,
@@ -74,7 +75,7 @@ class AuthorizationService:
     def is_team_member(
         self,
         *args,
-        scopes: list[Scope],
+        scopes: Collection[Scope],
         data: dict | None = None,
         product_id: ProductId | None = None,
         name: str | None = None,
@@ -99,37 +100,49 @@ class AuthorizationService:
         else:
             return AuthorizationResult.DENIED
 
-    def is_allowed(self, scopes: list[Scope], role: Role):
+    def is_allowed(self, scopes: Collection[Scope], role: Role):
         if role is Role.ADMIN:
             return self.admin_role in scopes
         if role is Role.EMPLOYEE:
             return self.employee_role in scopes
         return False
 
-    def has_role(self, *, scopes: list[Scope], role: Role) -> bool:
+    def has_role(self, *, scopes: Collection[Scope], role: Role) -> bool:
         return self.require(scopes=scopes, role=role) == AuthorizationResult.GRANTED
 
-    def is_admin(self, *, scopes: list[Scope]) -> bool:
+    def is_admin(self, *, scopes: Collection[Scope]) -> bool:
         return self.has_role(scopes=scopes, role=Role.ADMIN)
 
-    def is_employee(self, *, scopes: list[Scope]) -> bool:
+    def is_employee(self, *, scopes: Collection[Scope]) -> bool:
         return self.has_role(scopes=scopes, role=Role.EMPLOYEE)
 
-    def is_team_member_of_product(self, *, product_id: ProductId, scopes: list[Scope]) -> bool:
+    def is_team_member_of_product(
+        self, *, product_id: ProductId, scopes: Collection[Scope]
+    ) -> bool:
         return (
             self.is_team_member(scopes=scopes, product_id=product_id)
             == AuthorizationResult.GRANTED
         )
 
-    def is_team_member_of_team(self, *, team_id: TeamId, scopes: list[Scope]) -> bool:
+    def is_team_member_of_team(self, *, team_id: TeamId, scopes: Collection[Scope]) -> bool:
         return (
             self.is_team_member(scopes=scopes, data={"team_id": team_id})
             == AuthorizationResult.GRANTED
         )
 
-    def is_team_member_of_product_name(self, *, name: str, scopes: list[Scope]) -> bool:
+    def is_team_member_of_product_name(self, *, name: str, scopes: Collection[Scope]) -> bool:
         return self.is_team_member(scopes=scopes, name=name) == AuthorizationResult.GRANTED
 
+    async def ais_team_member_of_product(
+        self, *, product_id: ProductId, scopes: Collection[Scope]
+    ) -> bool:
+        return await self.repo.acan_access_product(int(product_id), scopes)
+
+    async def ais_team_member_of_product_name(
+        self, *, name: str, scopes: Collection[Scope]
+    ) -> bool:
+        return await self.repo.acan_access_product_name(str(name), scopes)
+
 
 P = ParamSpec("P")
 R = TypeVar("R")
@@ -139,31 +152,38 @@ class AuthorizationDecorator(Protocol):
     def __call__(self, func: Callable[P, R]) -> Callable[P, R]: ...
 
 
+Check = Callable[..., AuthorizationResult]
+
+
 class Authorizer:
     """Syntactic sugar around the AuthorizationService that allows us to use
     decorators to do all the authorization checks.
 
-    Initialization:
-    ```
-    authorize = Authorizer()
-    authorize.set_auth_service(AuthorizationService(repo=AuthorizationRepository))
-    ```
     Usage:
 
     ```
     class SomeService:
-        ...
+        def __init__(self, auth: AuthorizationService):
+            self.auth = auth
 
         @authorize.is_admin
+        @authorize.is_team_member
         def protected_method(self, *args, **kwargs):
             pass
     ```
 
-    The decorators are created dynamically, based on the RULES defined in auth/objects.py
+    The checks are done by the `auth` of the service. Services without one use the
+    AuthorizationService set with `authorize.set_auth_service()`.
+
+    The decorators are created dynamically, based on the RULES defined in auth/objects.py.
+    Stacked decorators allow a call when any of their rules does. They're compiled into a single
+    wrapper around the method, which checks the rules that only look at the roles in the scopes
+    before those that look up data, and stops at the first one that grants access. The checks
+    are bound to an AuthorizationService once.
     """
 
     def __init__(self):
-        self.auth = None
+        self.auth: AuthorizationService | None = None
         self.decorators = {}
         for rule in RULES:
             self.register_auth(rule)
@@ -173,54 +193,55 @@ class Authorizer:
 
     def set_auth_service(self, auth: AuthorizationService):
         self.auth = auth
-        self.NO_AUTH = not auth.feature_enabled
 
-    def _create_lambda(self, rule: Rule):
-        if self.auth is None:
+    def auth_for(self, service) -> AuthorizationService:
+        auth = getattr(service, "auth", None) or self.auth
+        if auth is None:
             raise DomainException(
                 "Authorizer doesn't have an AuthorizationService, please call set_auth_service()"
             )
+        return auth
+
+    def _bind(self, rule: Rule, auth: AuthorizationService) -> Check:
         try:
-            service_method = getattr(self.auth, rule.method_name)
-            return lambda self, *args, **kwargs: service_method(
-                *args, permission=rule.permission, role=rule.role, **kwargs
-            )
+            service_method = getattr(auth, rule.method_name)
         except AttributeError:
             raise DomainException(
                 f"Method {rule.method_name} does not exist on AuthorizationService"
             ) from None
+        return partial(service_method, permission=rule.permission, role=rule.role)
 
-    def _create_decorator(auth_self, rule: Rule):
-        def decorator(func):
-            @wraps(func)
-            def wrapper(self, *args, **kwargs):
-                if auth_self.NO_AUTH:
-                    return func(self, *args, **kwargs)
-                already_allowed = kwargs.pop("already_allowed", False)
-                if already_allowed:
-                    return func(self, *args, **kwargs)
+    def _compile(auth_self, func, rules: tuple[Rule, ...]):
+        # sorted() is stable, otherwise the order of the decorators is kept.
+        rules = tuple(sorted(rules, key=lambda rule: rule.needs_lookup))
+        chains: WeakKeyDictionary[AuthorizationService, tuple[Check, ...]] = WeakKeyDictionary()
 
-                scopes = kwargs.get("scopes")
-                if not scopes:
-                    raise NotAuthenticated("Authentication required.")
-
-                try:
-                    authorization_function = auth_self._create_lambda(rule)
-                except KeyError:
-                    raise DomainException(
-                        f"Authorization Type does not exist: {rule.decorator_name}"
-                    ) from None
-                allowed = (
-                    authorization_function(self, *args, **kwargs) == AuthorizationResult.GRANTED
-                )
-                if hasattr(func, "__wrapped__"):
-                    return func(self, *args, already_allowed=allowed, **kwargs)
-
-                if not allowed:
-                    raise NotAuthorized("You are not authorized to perform this operation.")
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            auth = auth_self.auth_for(self)
+            if not auth.feature_enabled:
                 return func(self, *args, **kwargs)
+            if not kwargs.get("scopes"):
+                raise NotAuthenticated("Authentication required.")
+
+            checks = chains.get(auth)
+            if checks is None:
+                checks = chains[auth] = tuple(auth_self._bind(rule, auth) for rule in rules)
+            for check in checks:
+                if check(*args, **kwargs) is AuthorizationResult.GRANTED:
+                    return func(self, *args, **kwargs)
+            raise NotAuthorized("You are not authorized to perform this operation.")
+
+        wrapper.authorization_rules = rules
+        return wrapper
 
-            return wrapper
+    def _create_decorator(self, rule: Rule):
+        def decorator(func):
+            rules = getattr(func, "authorization_rules", None)
+            if rules is not None:
+                # Stacked on other rules, a single wrapper of the method checks them all.
+                return self._compile(func.__wrapped__, (rule, *rules))
+            return self._compile(func, (rule,))
 
         return decorator
 
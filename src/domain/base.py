@@ -1,4 +1,5 @@
 import abc
+from collections.abc import Collection
 from dataclasses import asdict, dataclass, fields
 from datetime import UTC, datetime
 from typing import Any
@@ -44,28 +45,60 @@ class AbstractRepository[T](abc.ABC):
     def get(self, id: int) -> T:
         raise NotImplementedError
 
-    def get_for_publication_status(self, id: int, allowed_statuses: list_[Any]) -> T:
+    async def aget(self, id: int, include: Collection[str] | None = None) -> T:
+        raise NotImplementedError
+
+    def get_for_publication_status(
+        self,
+        id: int,
+        allowed_statuses: list_[Any],
+        include: Collection[str] | None = None,
+        *,
+        cached: bool = True,
+    ) -> T:
+        raise NotImplementedError
+
+    async def aget_for_publication_status(
+        self, id: int, allowed_statuses: list_[Any], include: Collection[str] | None = None
+    ) -> T:
         raise NotImplementedError
 
     @abc.abstractmethod
     def get_by_name(self, name: str) -> T:
         raise NotImplementedError
 
+    async def aget_by_name(self, name: str) -> T:
+        raise NotImplementedError
+
     def get_for_publication_status_by_name(self, name: str, allowed_statuses: list_[Any]) -> T:
         raise NotImplementedError
 
+    async def aget_for_publication_status_by_name(
+        self, name: str, allowed_statuses: list_[Any]
+    ) -> T:
+        raise NotImplementedError
+
     def list(self) -> list_:
         raise NotImplementedError
 
+    async def alist(self) -> list_:
+        raise NotImplementedError
+
     def list_for_publication_status(self, allowed_statuses: list_[Any]) -> list_:
         raise NotImplementedError
 
+    async def alist_for_publication_status(self, allowed_statuses: list_[Any]) -> list_:
+        raise NotImplementedError
+
     def list_all(self) -> list_[T]:
         raise NotImplementedError
 
     def list_mine(self, *, query, filter, order, teams) -> list_:
         raise NotImplementedError
 
+    async def alist_mine(self, *, query, filter, order, teams) -> list_:
+        raise NotImplementedError
+
     @abc.abstractmethod
     def save(self, item: T) -> T:
         raise NotImplementedError
@@ -105,15 +138,21 @@ class AbstractAuthRepository(abc.ABC):
     employee_role: str
 
     @abc.abstractmethod
-    def can_access_team(self, team_id: int, scopes: list[Any]) -> bool:
+    def can_access_team(self, team_id: int, scopes: Collection[Any]) -> bool:
         raise NotImplementedError
 
     @abc.abstractmethod
-    def can_access_product(self, product_id: int, scopes: list[Any]) -> bool:
+    def can_access_product(self, product_id: int, scopes: Collection[Any]) -> bool:
         raise NotImplementedError
 
     @abc.abstractmethod
-    def can_access_product_name(self, name: str, scopes: list[Any]) -> bool:
+    def can_access_product_name(self, name: str, scopes: Collection[Any]) -> bool:
+        raise NotImplementedError
+
+    async def acan_access_product(self, product_id: int, scopes: Collection[Any]) -> bool:
+        raise NotImplementedError
+
+    async def acan_access_product_name(self, name: str, scopes: Collection[Any]) -> bool:
         raise NotImplementedError
 
 
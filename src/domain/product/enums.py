@@ -105,3 +105,20 @@ class TimeUnit(StrChoicesEnum):
     WEEK = "WEEK"
     MONTH = "MONTH"
     YEAR = "YEAR"
+
+
+class LineageDirection(StrChoicesEnum):
+    UPSTREAM = "upstream"
+    DOWNSTREAM = "downstream"
+
+
+class ChangeObjectType(StrChoicesEnum):
+    PRODUCT = "product"
+    CONTRACT = "contract"
+
+
+class ChangeEvent(StrChoicesEnum):
+    CREATE = "create"
+    UPDATE = "update"
+    PUBLISH = "publish"
+    DELETE = "delete"
@@ -255,6 +255,13 @@ class ProductValidator:
         return True
 
 
+# The relations of a Product that are hydrated by the repository. Reads that don't need all
+# of them can pass a subset to skip fetching the others.
+PRODUCT_RELATIONS = frozenset(
+    {"contracts", "contracts.distributions", "services", "sources", "sinks"}
+)
+
+
 @dataclass(kw_only=True)
 class Product(BaseObject):
     id: int | None = None
@@ -473,3 +480,52 @@ class Product(BaseObject):
 
 
 AllObjects = Product | DataContract | DataService | Distribution
+
+
+@dataclass(kw_only=True)
+class LineageNode(BaseObject):
+    id: int
+    name: str | None = None
+    team_id: int | None = None
+    publication_status: enums.PublicationStatus | None = None
+    depth: int = 0
+
+
+@dataclass(kw_only=True)
+class LineageEdge(BaseObject):
+    source: int
+    sink: int
+
+
+@dataclass(kw_only=True)
+class Lineage(BaseObject):
+    """The products upstream (sources) or downstream (sinks) of a product, as a graph."""
+
+    product_id: int
+    direction: enums.LineageDirection
+    depth: int
+    nodes: list[LineageNode] = field(default_factory=list)
+    edges: list[LineageEdge] = field(default_factory=list)
+
+
+@dataclass(kw_only=True)
+class Change(BaseObject):
+    """A change to a product or contract, as recorded in the outbox. The id is its cursor."""
+
+    id: int
+    created_at: datetime
+    object_type: enums.ChangeObjectType
+    event: enums.ChangeEvent
+    product_id: int
+    contract_id: int | None = None
+    publication_status: enums.PublicationStatus | None = None
+    previous_publication_status: enums.PublicationStatus | None = None
+
+
+@dataclass(kw_only=True)
+class ChangeFeed(BaseObject):
+    """A page of the change feed, the next page starts after cursor."""
+
+    changes: list[Change] = field(default_factory=list)
+    cursor: int = 0
+    has_more: bool = False
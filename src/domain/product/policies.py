@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+from collections.abc import Collection
 from dataclasses import dataclass
 from enum import Enum, auto
+from functools import lru_cache
 
 from domain.auth import AuthorizationService, ProductId, Scope
 
@@ -12,39 +14,73 @@ class ProductReadLevel(Enum):
     PUBLISHED = auto()
 
 
+@lru_cache(maxsize=1024)
+def _role_level(auth: AuthorizationService, scopes: Collection[Scope]) -> ProductReadLevel:
+    if auth.is_admin(scopes=scopes):
+        return ProductReadLevel.FULL
+    if auth.is_employee(scopes=scopes):
+        return ProductReadLevel.INTERNAL
+    return ProductReadLevel.PUBLISHED
+
+
 @dataclass(frozen=True)
 class ProductReadPolicy:
     auth: AuthorizationService
 
-    def level(self, *, scopes: list[Scope] | None) -> ProductReadLevel:
+    def _role_level(self, scopes: Collection[Scope]) -> ProductReadLevel:
+        # The scopes of a token are a frozenset (see beheeromgeving/token_cache.py), the level
+        # of its roles is derived once.
+        if isinstance(scopes, frozenset):
+            return _role_level(self.auth, scopes)
+        return _role_level.__wrapped__(self.auth, scopes)
+
+    def level(self, *, scopes: Collection[Scope] | None) -> ProductReadLevel:
         if scopes is None:
             return ProductReadLevel.PUBLISHED
-        if self.auth.is_admin(scopes=scopes):
-            return ProductReadLevel.FULL
-        if self.auth.is_employee(scopes=scopes):
-            return ProductReadLevel.INTERNAL
-        return ProductReadLevel.PUBLISHED
+        return self._role_level(scopes)
 
     def level_for_product(
-        self, *, product_id: ProductId, scopes: list[Scope] | None
+        self, *, product_id: ProductId, scopes: Collection[Scope] | None
     ) -> ProductReadLevel:
         if scopes is None:
             return ProductReadLevel.PUBLISHED
-        if self.auth.is_admin(scopes=scopes) or self.auth.is_team_member_of_product(
+        level = self._role_level(scopes)
+        if level is ProductReadLevel.FULL or self.auth.is_team_member_of_product(
             product_id=product_id, scopes=scopes
         ):
             return ProductReadLevel.FULL
+        return level
 
-        if self.auth.is_employee(scopes=scopes):
-            return ProductReadLevel.INTERNAL
-
+    def level_for_product_name(
+        self, *, name: str, scopes: Collection[Scope] | None
+    ) -> ProductReadLevel:
+        if scopes is None:
+            return ProductReadLevel.PUBLISHED
+        if self._role_level(scopes) is ProductReadLevel.FULL or (
+            self.auth.is_team_member_of_product_name(name=name, scopes=scopes)
+        ):
+            return ProductReadLevel.FULL
         return ProductReadLevel.PUBLISHED
 
-    def level_for_product_name(self, *, name: str, scopes: list[Scope] | None) -> ProductReadLevel:
+    async def alevel_for_product(
+        self, *, product_id: ProductId, scopes: Collection[Scope] | None
+    ) -> ProductReadLevel:
+        if scopes is None:
+            return ProductReadLevel.PUBLISHED
+        level = self._role_level(scopes)
+        if level is ProductReadLevel.FULL or await self.auth.ais_team_member_of_product(
+            product_id=product_id, scopes=scopes
+        ):
+            return ProductReadLevel.FULL
+        return level
+
+    async def alevel_for_product_name(
+        self, *, name: str, scopes: Collection[Scope] | None
+    ) -> ProductReadLevel:
         if scopes is None:
             return ProductReadLevel.PUBLISHED
-        if self.auth.is_admin(scopes=scopes) or self.auth.is_team_member_of_product_name(
-            name=name, scopes=scopes
+        if self._role_level(scopes) is ProductReadLevel.FULL or (
+            await self.auth.ais_team_member_of_product_name(name=name, scopes=scopes)
         ):
             return ProductReadLevel.FULL
         return ProductReadLevel.PUBLISHED
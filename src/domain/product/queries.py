@@ -1,34 +1,56 @@
+from collections.abc import Collection
+
 from domain import exceptions
-from domain.auth import Scope, authorize
+from domain.auth import AuthorizationService, Scope, authorize
 from domain.product import enums
+from domain.product.objects import ChangeFeed
 from domain.product.policies import ProductReadLevel, ProductReadPolicy
 from domain.product.repositories import ProductRepository
 from domain.team import Team
 
 
 class ProductQueryHandler:
-    def __init__(self, repository: ProductRepository):
+    def __init__(self, repository: ProductRepository, auth: AuthorizationService | None = None):
         self.repository = repository
+        self.auth = auth
 
-    def list_products(self, *, scopes: list[Scope] | None = None, **kwargs):
-        if authorize.auth is None:
+    def _readable_statuses(
+        self, scopes: Collection[Scope] | None
+    ) -> list[enums.PublicationStatus]:
+        auth = self.auth or authorize.auth
+        if auth is None:
             raise exceptions.DomainException(
                 "Authorizer doesn't have an AuthorizationService, please call set_auth_service()"
             )
-        policy = ProductReadPolicy(authorize.auth)
+        policy = ProductReadPolicy(auth)
         level = policy.level(scopes=scopes)
         if level in (ProductReadLevel.FULL, ProductReadLevel.INTERNAL):
-            return self.repository.list_for_publication_status(
-                [
-                    enums.PublicationStatus.INTERNALLY_PUBLISHED,
-                    enums.PublicationStatus.PUBLISHED,
-                ],
-                **kwargs,
-            )
+            return [
+                enums.PublicationStatus.INTERNALLY_PUBLISHED,
+                enums.PublicationStatus.PUBLISHED,
+            ]
+        return [enums.PublicationStatus.PUBLISHED]
+
+    def list_products(self, *, scopes: Collection[Scope] | None = None, **kwargs):
         return self.repository.list_for_publication_status(
-            [enums.PublicationStatus.PUBLISHED],
-            **kwargs,
+            self._readable_statuses(scopes), **kwargs
+        )
+
+    async def alist_products(self, *, scopes: Collection[Scope] | None = None, **kwargs):
+        return await self.repository.alist_for_publication_status(
+            self._readable_statuses(scopes), **kwargs
         )
 
     def list_my_products(self, teams: list[Team], **kwargs):
         return self.repository.list_mine(teams=teams, **kwargs)
+
+    async def alist_my_products(self, teams: list[Team], **kwargs):
+        return await self.repository.alist_mine(teams=teams, **kwargs)
+
+    def list_changes(
+        self, *, since: int = 0, limit: int = 100, scopes: Collection[Scope] | None = None
+    ) -> ChangeFeed:
+        """The changes to products and contracts that were, or became, readable."""
+        return self.repository.list_changes(
+            since=since, limit=limit, statuses=self._readable_statuses(scopes)
+        )
@@ -1,100 +1,343 @@
-from django.db import transaction
-from django.db.models import F, Q, QuerySet, Value
+import json
+from collections.abc import Collection
+from datetime import datetime
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, F, OuterRef, Prefetch, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.db.utils import IntegrityError
 from django.utils import timezone
 
 from api.datatransferobjects import MyProduct, ProductList
 from beheeromgeving import models as orm
+from beheeromgeving.caching import product_cache, product_list_cache, product_lists
+from beheeromgeving.http_cache import PRODUCT_LIST_KEY, contract_key, product_key, tag, team_key
+from beheeromgeving.instrumentation import timed
+from beheeromgeving.invalidation import notify
 from domain import exceptions
 from domain.base import AbstractRepository
 from domain.product import DataContract, Product, enums
+from domain.product.objects import (
+    PRODUCT_RELATIONS,
+    ChangeFeed,
+    Lineage,
+    LineageEdge,
+    LineageNode,
+)
 from domain.team import Team
 
 # alias for typing
 list_ = list
 
+# The columns each ProductList field is read from, so a list only selects what is asked for.
+# The summary and contract_count are fetched separately, see _product_list_queryset().
+PRODUCT_LIST_COLUMNS: dict[str, tuple[str, ...]] = {
+    "id": ("id",),
+    "name": ("name",),
+    "description": ("description",),
+    "other_identifier": ("other_identifier",),
+    "type": ("type",),
+    "owner": ("_owner", "team", "team__po_name"),
+    "themes": ("themes",),
+    "last_updated": ("last_updated",),
+    "language": ("language",),
+    "summary": (),
+    "is_geo": ("is_geo",),
+    "schema_url": ("schema_url",),
+    "publication_status": ("publication_status",),
+    "contract_count": (),
+    "team_id": ("team",),
+    "endorsement": ("endorsement",),
+}
+
+
+# The statuses of the products that appear in the lists of any read level.
+LISTED_STATUSES = frozenset(
+    {enums.PublicationStatus.PUBLISHED.value, enums.PublicationStatus.INTERNALLY_PUBLISHED.value}
+)
+
+
+class StatusSnapshot(NamedTuple):
+    """A product before it is changed, to record what changed."""
+
+    publication_status: str | None
+    team_id: int
+    # The status and last update of each of its contracts.
+    contracts: dict[int, tuple[str | None, datetime]]
+
 
 class ProductRepository(AbstractRepository[Product]):
     manager: QuerySet[orm.Product]
 
     def __init__(self):
-        self.manager = orm.Product.objects.select_related("team").prefetch_related(
-            "sources__pk", "team", "contracts", "contracts__distributions", "services"
-        )
+        self.manager = self._product_queryset()
         self.revision_manager = orm.ProductRevision.objects.select_related(
-            "product", "product__team", "team"
-        ).prefetch_related(
-            "product__sources__pk",
-            "product__team",
-            "product__contracts",
-            "product__contracts__distributions",
-            "product__services",
-        )
+            "product", "product__team", "product__revision", "team"
+        ).prefetch_related(*self._product_prefetches(prefix="product__"))
         self.contract_revision_manager = orm.DataContractRevision.objects.select_related(
-            "contract", "contract__product"
-        ).prefetch_related(
-            "contract__distributions", "distributions", "distributions__live_distribution"
+            "contract", "contract__product", "contract__revision"
+        ).prefetch_related("contract__distributions", "distributions")
+
+    def _product_prefetches(
+        self, include: Collection[str] = PRODUCT_RELATIONS, prefix: str = ""
+    ) -> list_[Prefetch]:
+        """The prefetches needed to convert products to the domain without extra queries."""
+        prefetches = []
+        if "contracts" in include:
+            prefetches.append(
+                Prefetch(
+                    f"{prefix}contracts",
+                    queryset=orm.DataContract.objects.select_related("revision"),
+                )
+            )
+        if "contracts.distributions" in include:
+            prefetches.append(Prefetch(f"{prefix}contracts__distributions"))
+        if "services" in include:
+            prefetches.append(Prefetch(f"{prefix}services"))
+        for relation in ("sources", "sinks"):
+            if relation in include:
+                prefetches.append(
+                    Prefetch(f"{prefix}{relation}", queryset=orm.Product.objects.only("pk"))
+                )
+        return prefetches
+
+    def _product_queryset(
+        self, include: Collection[str] = PRODUCT_RELATIONS
+    ) -> QuerySet[orm.Product]:
+        # The relations that aren't included are never touched, so don't prefetch them.
+        return orm.Product.objects.select_related("team", "revision").prefetch_related(
+            *self._product_prefetches(include)
         )
 
-    def get(self, id: int) -> Product:
+    def _detail_queryset(self, include: Collection[str] | None) -> QuerySet[orm.Product]:
+        return self.manager if include is None else self._product_queryset(include)
+
+    def _load(self, id: int, include: Collection[str] | None) -> Product:
         try:
-            return self.manager.get(pk=id).to_domain()
+            return self._detail_queryset(include).get(pk=id).to_domain(include=include)
         except orm.Product.DoesNotExist as e:
             raise exceptions.ObjectDoesNotExist from e
 
-    def get_for_publication_status(
-        self, id: int, allowed_statuses: list_[enums.PublicationStatus]
-    ) -> Product:
-        allowed = {status.value for status in allowed_statuses}
+    async def _aload(self, id: int, include: Collection[str] | None) -> Product:
         try:
-            product = self.manager.get(pk=id)
+            product = await self._detail_queryset(include).aget(pk=id)
         except orm.Product.DoesNotExist as e:
             raise exceptions.ObjectDoesNotExist from e
+        return product.to_domain(include=include)
+
+    @staticmethod
+    def _only_relations(product: Product, include: Collection[str] | None) -> Product:
+        """The product with only the relations in include, like to_domain() hydrates them."""
+        if include is None:
+            return product
+        if "contracts" not in include:
+            product.contracts = []
+        elif "contracts.distributions" not in include:
+            for contract in product.contracts:
+                contract.distributions = []
+        for relation in ("services", "sources", "sinks"):
+            if relation not in include:
+                setattr(product, relation, [])
+        return product
+
+    @staticmethod
+    def _tagged(product: Product) -> Product:
+        """Tag the response with the surrogate keys of the product, see http_cache.py."""
+        tag(
+            product_key(product.id),
+            team_key(product.team_id),
+            *(contract_key(contract.id) for contract in product.contracts),
+        )
+        return product
+
+    def get(
+        self, id: int, include: Collection[str] | None = None, *, cached: bool = True
+    ) -> Product:
+        """The product, from the product cache unless cached is false. A product that gets
+        modified and saved must not be cached, it may be older than the one in the database."""
+        if not cached:
+            return self._tagged(self._load(id, include))
+        # Only whole products are cached, but a part of one is taken from the cache as well.
+        product = product_cache.get(id, lambda: self._load(id, include), store=include is None)
+        return self._tagged(self._only_relations(product, include))
+
+    async def aget(self, id: int, include: Collection[str] | None = None) -> Product:
+        product = await product_cache.aget(
+            id, lambda: self._aload(id, include), store=include is None
+        )
+        return self._tagged(self._only_relations(product, include))
 
+    def _restrict_to_statuses(
+        self,
+        product: Product,
+        allowed_statuses: list_[enums.PublicationStatus],
+        *,
+        denied_message: str,
+    ) -> Product:
+        """The product with only its contracts of the allowed statuses, if it has one itself."""
+        allowed = {status.value for status in allowed_statuses}
         if product.publication_status not in allowed:
-            raise exceptions.AuthException(f"Not authorized to access product with id {id}.")
+            raise exceptions.AuthException(denied_message)
 
-        domain_product = product.to_domain()
-        domain_product.contracts = [
-            contract
-            for contract in domain_product.contracts
-            if contract.publication_status in allowed
+        product.contracts = [
+            contract for contract in product.contracts if contract.publication_status in allowed
         ]
-        return domain_product
+        return product
 
-    def _get_by_name(self, name: str) -> orm.Product:
-        product = (
-            self.manager.annotate(search_name=Value(name))
-            .filter(search_name__iexact=F("name"))
-            .first()
+    def get_for_publication_status(
+        self,
+        id: int,
+        allowed_statuses: list_[enums.PublicationStatus],
+        include: Collection[str] | None = None,
+        *,
+        cached: bool = True,
+    ) -> Product:
+        return self._restrict_to_statuses(
+            self.get(id, include, cached=cached),
+            allowed_statuses,
+            denied_message=f"Not authorized to access product with id {id}.",
+        )
+
+    async def aget_for_publication_status(
+        self,
+        id: int,
+        allowed_statuses: list_[enums.PublicationStatus],
+        include: Collection[str] | None = None,
+    ) -> Product:
+        return self._restrict_to_statuses(
+            await self.aget(id, include),
+            allowed_statuses,
+            denied_message=f"Not authorized to access product with id {id}.",
         )
+
+    def _by_name_queryset(self, name: str) -> QuerySet[orm.Product]:
+        return self.manager.annotate(search_name=Value(name)).filter(search_name__iexact=F("name"))
+
+    def _get_by_name(self, name: str) -> orm.Product:
+        product = self._by_name_queryset(name).first()
+        if not product:
+            raise exceptions.ObjectDoesNotExist(f"Product with name {name} does not exist.")
+        return product
+
+    async def _aget_by_name(self, name: str) -> orm.Product:
+        product = await self._by_name_queryset(name).afirst()
         if not product:
             raise exceptions.ObjectDoesNotExist(f"Product with name {name} does not exist.")
         return product
 
     def get_by_name(self, name: str) -> Product:
         product = self._get_by_name(name)
-        return product.to_domain()
+        return self._tagged(product.to_domain())
+
+    async def aget_by_name(self, name: str) -> Product:
+        product = await self._aget_by_name(name)
+        return self._tagged(product.to_domain())
 
     def get_for_publication_status_by_name(
         self, name: str, allowed_statuses: list_[enums.PublicationStatus]
     ) -> Product:
-        allowed = {status.value for status in allowed_statuses}
-        product = self._get_by_name(name)
-        if product.publication_status not in allowed:
-            raise exceptions.AuthException(f"Not authorized to access product with name {name}.")
-        domain_product = product.to_domain()
-        domain_product.contracts = [
-            contract
-            for contract in domain_product.contracts
-            if contract.publication_status in allowed
-        ]
-        return domain_product
+        return self._restrict_to_statuses(
+            self.get_by_name(name),
+            allowed_statuses,
+            denied_message=f"Not authorized to access product with name {name}.",
+        )
+
+    async def aget_for_publication_status_by_name(
+        self, name: str, allowed_statuses: list_[enums.PublicationStatus]
+    ) -> Product:
+        return self._restrict_to_statuses(
+            await self.aget_by_name(name),
+            allowed_statuses,
+            denied_message=f"Not authorized to access product with name {name}.",
+        )
+
+    def get_lineage(
+        self,
+        id: int,
+        *,
+        direction: enums.LineageDirection,
+        depth: int,
+        allowed_statuses: list_[enums.PublicationStatus] | None = None,
+    ) -> Lineage:
+        """Traverse the sources (upstream) or sinks (downstream) of a product in a single
+        recursive query. It stops at depth hops, or when it runs into the product itself (a
+        cycle), and only goes through products with one of the allowed statuses.
+
+        The recursion keeps each edge once per depth (UNION, instead of UNION ALL with the path
+        of each row), so it takes at most an edge times depth rows, rather than one for every
+        distinct path, which grows exponentially in a dense graph. Another cycle is followed
+        until depth, but it doesn't add rows once its edges are in the lineage at each depth."""
+        through = orm.Product.sources.through
+        # A raw query, so route it like the ORM would (to a replica, in a read-only request).
+        connection = connections[router.db_for_read(orm.Product)]
+        quote = connection.ops.quote_name
+        # A row in the through table means: sink_column has source_column as a source.
+        sink_column = quote(through._meta.get_field("from_product").column)
+        source_column = quote(through._meta.get_field("to_product").column)
+        if direction == enums.LineageDirection.UPSTREAM:
+            from_column, to_column = sink_column, source_column
+        else:
+            from_column, to_column = source_column, sink_column
+        status_filter = (
+            "AND p.publication_status = ANY(%(statuses)s)" if allowed_statuses is not None else ""
+        )
+        sql = f"""
+            WITH RECURSIVE lineage(source_id, sink_id, node_id, depth) AS (
+                SELECT l.{source_column}, l.{sink_column}, l.{to_column}, 1
+                FROM {quote(through._meta.db_table)} l
+                JOIN {quote(orm.Product._meta.db_table)} p ON p.id = l.{to_column}
+                WHERE l.{from_column} = %(id)s {status_filter}
+              UNION
+                SELECT l.{source_column}, l.{sink_column}, l.{to_column}, lineage.depth + 1
+                FROM lineage
+                JOIN {quote(through._meta.db_table)} l ON l.{from_column} = lineage.node_id
+                JOIN {quote(orm.Product._meta.db_table)} p ON p.id = l.{to_column}
+                WHERE lineage.node_id != %(id)s AND lineage.depth < %(depth)s {status_filter}
+            )
+            SELECT lineage.source_id, lineage.sink_id, p.id, p.name, p.team_id,
+                p.publication_status, MIN(lineage.depth)
+            FROM lineage JOIN {quote(orm.Product._meta.db_table)} p ON p.id = lineage.node_id
+            GROUP BY lineage.source_id, lineage.sink_id, p.id
+            UNION ALL
+            SELECT NULL, NULL, p.id, p.name, p.team_id, p.publication_status, 0
+            FROM {quote(orm.Product._meta.db_table)} p WHERE p.id = %(id)s
+        """  # noqa: S608 (only table and column names are formatted in)
+        params = {
+            "id": id,
+            "depth": depth,
+            "statuses": [status.value for status in allowed_statuses or []],
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+
+        nodes: dict[int, LineageNode] = {}
+        edges: list_[LineageEdge] = []
+        for source_id, sink_id, node_id, name, team_id, status, node_depth in rows:
+            if source_id is not None:
+                edges.append(LineageEdge(source=source_id, sink=sink_id))
+            if node_id not in nodes or node_depth < nodes[node_id].depth:
+                nodes[node_id] = LineageNode(
+                    id=node_id,
+                    name=name,
+                    team_id=team_id,
+                    publication_status=status,
+                    depth=node_depth,
+                )
+        return Lineage(
+            product_id=id,
+            direction=direction,
+            depth=depth,
+            nodes=sorted(nodes.values(), key=lambda node: (node.depth, node.id)),
+            edges=sorted(edges, key=lambda edge: (edge.source, edge.sink)),
+        )
 
     def list_all(self, **kwargs):
         return [p.to_domain() for p in self.manager.all()]
 
-    def list_for_publication_status(
+    def _publication_status_list_queryset(
         self,
         allowed_statuses: list_[enums.PublicationStatus],
         *,
@@ -103,63 +346,219 @@ class ProductRepository(AbstractRepository[Product]):
         exclude: dict | None = None,
         order: tuple[str, bool] | None = ("name", False),
         fields: list[str] | None = None,
-    ) -> list_[dict]:
+    ) -> QuerySet[orm.Product]:
         allowed = {status.value for status in allowed_statuses}
-        products = self.manager.filter(publication_status__in=allowed)
+        products = self._product_list_queryset(fields, query=query).filter(
+            publication_status__in=allowed
+        )
 
         if filter is not None:
             filter = {**filter}
             filter.pop("publication_status", None)
 
-        products = self._apply_filters(
+        return self._apply_filters(
             products,
             query=query,
             filter=filter,
             exclude=exclude,
             order=order,
         )
+
+    def _to_product_list(
+        self, products: list_[orm.Product], *, query: str | None, fields: list[str] | None
+    ) -> list_[dict]:
         dump_kwargs = {}
-        if fields not in (None, "*"):
+        if fields is not None:
             dump_kwargs["include"] = fields
-        return [ProductList.from_django(p).model_dump(**dump_kwargs) for p in products]
+        products = self._sort_on_occurrences(products, query)
+        with timed("serialization"):
+            return [ProductList.from_django(p, fields).model_dump(**dump_kwargs) for p in products]
+
+    def list_for_publication_status(
+        self,
+        allowed_statuses: list_[enums.PublicationStatus],
+        *,
+        query: str | None = None,
+        fields: list[str] | None = None,
+        **kwargs,
+    ) -> list_[dict]:
+        if fields in (None, "*"):
+            fields = None
+
+        def compute() -> list_[dict]:
+            products = self._publication_status_list_queryset(
+                allowed_statuses, query=query, fields=fields, **kwargs
+            )
+            return self._to_product_list(list(products), query=query, fields=fields)
+
+        key = self._list_key(allowed_statuses, query=query, fields=fields, **kwargs)
+        freshness = self._list_freshness(allowed_statuses)
+        products = product_list_cache.get(key, freshness, lambda: product_lists.do(key, compute))
+        return self._tagged_list(products)
+
+    async def alist_for_publication_status(
+        self,
+        allowed_statuses: list_[enums.PublicationStatus],
+        *,
+        query: str | None = None,
+        fields: list[str] | None = None,
+        **kwargs,
+    ) -> list_[dict]:
+        if fields in (None, "*"):
+            fields = None
+
+        async def compute() -> list_[dict]:
+            products = self._publication_status_list_queryset(
+                allowed_statuses, query=query, fields=fields, **kwargs
+            )
+            return self._to_product_list(
+                [product async for product in products], query=query, fields=fields
+            )
+
+        key = self._list_key(allowed_statuses, query=query, fields=fields, **kwargs)
+        freshness = self._list_freshness(allowed_statuses)
+        products = await product_list_cache.aget(
+            key, freshness, lambda: product_lists.ado(key, compute)
+        )
+        return self._tagged_list(products)
+
+    @staticmethod
+    def _tagged_list(products: list_[dict]) -> list_[dict]:
+        tag(PRODUCT_LIST_KEY)
+        for product in products:
+            tag(product_key(product["id"]))
+            if product.get("team_id") is not None:
+                tag(team_key(product["team_id"]))
+        return products
+
+    @staticmethod
+    def _list_freshness(allowed_statuses: list_[enums.PublicationStatus]) -> int:
+        """The seconds a cached list is fresh, for the read level of the statuses."""
+        internal = enums.PublicationStatus.INTERNALLY_PUBLISHED in allowed_statuses
+        return settings.PRODUCT_LIST_FRESHNESS["INTERNAL" if internal else "PUBLISHED"]
+
+    @staticmethod
+    def _list_key(
+        allowed_statuses: list_[enums.PublicationStatus],
+        *,
+        query: str | None,
+        fields: list[str] | None,
+        **kwargs,
+    ) -> str:
+        """Identifies a product list, the same for requests that only differ in notation."""
+        return json.dumps(
+            {
+                "statuses": sorted(status.value for status in allowed_statuses),
+                "query": " ".join(query.split()) if query else None,
+                "fields": sorted(fields) if fields is not None else None,
+                **kwargs,
+            },
+            sort_keys=True,
+            default=str,
+        )
+
+    def _product_list_queryset(
+        self, fields: list_[str] | None, *, query: str | None = None
+    ) -> QuerySet[orm.Product]:
+        """Products queryset for the ProductList of the requested fields (all if None).
+
+        Only the needed columns are selected, and the related objects for the summary and
+        the published contract count are only fetched when these fields are requested.
+        """
+        requested = PRODUCT_LIST_COLUMNS.keys() if fields is None else set(fields)
+        columns = {"id"}
+        for field in requested & PRODUCT_LIST_COLUMNS.keys():
+            columns.update(PRODUCT_LIST_COLUMNS[field])
+        if query:
+            # Needed to sort the results on the number of occurrences of the query words.
+            columns.update(("name", "description"))
+
+        products = orm.Product.objects.only(*columns)
+        if "owner" in requested:
+            products = products.select_related("team")
+        if "contract_count" in requested:
+            published_contracts = (
+                orm.DataContract.objects.filter(
+                    product=OuterRef("pk"),
+                    publication_status=enums.PublicationStatus.PUBLISHED.value,
+                )
+                .order_by()
+                .values("product")
+                .annotate(count=Count("pk"))
+                .values("count")
+            )
+            products = products.annotate(contract_count=Coalesce(Subquery(published_contracts), 0))
+        if query or "summary" in requested:
+            products = products.prefetch_related(
+                Prefetch("contracts", queryset=orm.DataContract.objects.only("product", "name"))
+            )
+        if "summary" in requested:
+            products = products.prefetch_related(
+                Prefetch("services", queryset=orm.DataService.objects.only("product", "type")),
+                Prefetch(
+                    "contracts__distributions",
+                    queryset=orm.Distribution.objects.only("contract", "type"),
+                ),
+            )
+        return products
 
     def _apply_filters(
         self,
-        products,
+        products: QuerySet[orm.Product],
         *,
         query: str | None = None,
         filter: dict | None = None,
         exclude: dict | None = None,
         order: tuple[str, bool] | None = ("name", False),
-    ):
+    ) -> QuerySet[orm.Product]:
         if query:
-            words = query.split()
             q_obj = Q()
-            for word in words:
+            for word in query.split():
                 q_obj |= (
                     Q(name__icontains=word)
                     | Q(description__icontains=word)
                     | Q(contracts__name__icontains=word)
                 )
             products = products.filter(q_obj).distinct()
-
-            def count_occurrences(product: orm.Product) -> int:
-                text = f"{product.name} {product.description} "
-                text += " ".join([(c.name or "") for c in product.contracts.all()])
-                text_lower = text.lower()
-                return sum(1 if word.lower() in text_lower else 0 for word in words)
-
         if filter:
             products = products.filter(**filter).distinct()
         if exclude:
             products = products.exclude(**exclude).distinct()
         if order:
             products = products.order_by(f"{'-' if order[1] else ''}{order[0]}")
-        # If query was used, sort by occurrence count
-        if query:
-            products = sorted(products, key=lambda p: count_occurrences(p), reverse=True)
         return products
 
+    def _sort_on_occurrences(
+        self, products: list_[orm.Product], query: str | None
+    ) -> list_[orm.Product]:
+        """If a query was used, sort (stable) on the number of its words in each product."""
+        if not query:
+            return products
+        words = query.split()
+
+        def count_occurrences(product: orm.Product) -> int:
+            text = f"{product.name} {product.description} "
+            text += " ".join([(c.name or "") for c in product.contracts.all()])
+            text_lower = text.lower()
+            return sum(1 if word.lower() in text_lower else 0 for word in words)
+
+        return sorted(products, key=count_occurrences, reverse=True)
+
+    def _mine_queryset(self, teams: list_[Team], **kwargs) -> QuerySet[orm.Product]:
+        team_ids = [team.id for team in teams]
+        products = self._product_queryset(include={"contracts"}).filter(team_id__in=team_ids)
+        return self._apply_filters(products, **kwargs)
+
+    def _to_my_products(
+        self, products: list_[orm.Product], *, query: str | None, fields: list[str] | None
+    ) -> list_[dict]:
+        dump_kwargs = {}
+        if fields not in (None, "*"):
+            dump_kwargs["include"] = fields
+        products = self._sort_on_occurrences(products, query)
+        with timed("serialization"):
+            return [MyProduct.from_django(p).model_dump(**dump_kwargs) for p in products]
+
     def list_mine(
         self,
         *,
@@ -170,26 +569,152 @@ class ProductRepository(AbstractRepository[Product]):
         fields: list[str] | None = None,
         teams: list_[Team],
     ) -> list_:
-        team_ids = [team.id for team in teams]
-        products = self.manager.filter(team_id__in=team_ids)
-        products = self._apply_filters(
-            products,
-            query=query,
-            filter=filter,
-            exclude=exclude,
-            order=order,
+        products = self._mine_queryset(
+            teams, query=query, filter=filter, exclude=exclude, order=order
+        )
+        return self._to_my_products(list(products), query=query, fields=fields)
+
+    async def alist_mine(
+        self,
+        *,
+        query: str | None = None,
+        filter: dict | None = None,
+        exclude: dict | None = None,
+        order: tuple[str, bool] | None = ("name", False),
+        fields: list[str] | None = None,
+        teams: list_[Team],
+    ) -> list_:
+        products = self._mine_queryset(
+            teams, query=query, filter=filter, exclude=exclude, order=order
+        )
+        return self._to_my_products(
+            [product async for product in products], query=query, fields=fields
         )
-        dump_kwargs = {}
-        if fields not in (None, "*"):
-            dump_kwargs["include"] = fields
-        return [MyProduct.from_django(p).model_dump(**dump_kwargs) for p in products]
 
     def save(self, item: Product) -> Product:
+        return self._save(item)
+
+    def _save(self, item: Product, event: enums.ChangeEvent | None = None) -> Product:
+        """Save the product and record what changed in the outbox, in one transaction."""
         try:
-            return orm.Product.from_domain(item)
+            with transaction.atomic():
+                snapshot = self._status_snapshot(item.id)
+                saved = orm.Product.from_domain(item)
+                orm.Change.record(self._changes_of_save(snapshot, saved, event))
+                previous_status = snapshot.publication_status if snapshot else None
+                notify(
+                    product_ids=[saved.id],
+                    team_ids={saved.team_id, snapshot.team_id if snapshot else None},
+                    published=self._changes_listings(previous_status, saved.publication_status),
+                )
+                return saved
         except IntegrityError as e:
             raise exceptions.ValidationError(f"Error for {item.name}: {e!s}") from e
 
+    def _status_snapshot(self, id: int | None) -> StatusSnapshot | None:
+        if id is None:
+            return None
+        rows = list(
+            orm.Product.objects.filter(pk=id).values_list(
+                "publication_status",
+                "team_id",
+                "contracts__id",
+                "contracts__publication_status",
+                "contracts__last_updated",
+            )
+        )
+        if not rows:
+            return None
+        contracts = {
+            contract_id: (status, last_updated)
+            for _status, _team_id, contract_id, status, last_updated in rows
+            if contract_id is not None
+        }
+        publication_status, team_id, *_contract = rows[0]
+        return StatusSnapshot(publication_status, team_id, contracts)
+
+    @staticmethod
+    def _changes_listings(previous_status: str | None, status: str | None) -> bool:
+        """Whether the product enters or leaves the lists, see list_for_publication_status()."""
+        return status != previous_status and bool({previous_status, status} & LISTED_STATUSES)
+
+    @staticmethod
+    def _event(previous_status: str | None, status: str | None) -> enums.ChangeEvent:
+        if status != previous_status:
+            if status in (
+                enums.PublicationStatus.PUBLISHED,
+                enums.PublicationStatus.INTERNALLY_PUBLISHED,
+            ):
+                return enums.ChangeEvent.PUBLISH
+            if status == enums.PublicationStatus.DELETED:
+                return enums.ChangeEvent.DELETE
+        return enums.ChangeEvent.UPDATE
+
+    def _changes_of_save(
+        self, snapshot: StatusSnapshot | None, saved: Product, event: enums.ChangeEvent | None
+    ) -> list_[orm.Change]:
+        """The product always changed when it is saved, its contracts only when they were
+        added, removed, or updated (which bumps their last_updated)."""
+        previous_status = snapshot.publication_status if snapshot else None
+        previous_contracts = snapshot.contracts if snapshot else {}
+        if event is None:
+            event = (
+                enums.ChangeEvent.CREATE
+                if snapshot is None
+                else self._event(previous_status, saved.publication_status)
+            )
+        changes = [
+            orm.Change(
+                object_type=enums.ChangeObjectType.PRODUCT,
+                event=event,
+                product_id=saved.id,
+                publication_status=saved.publication_status,
+                previous_publication_status=previous_status,
+            )
+        ]
+        previous_contracts = dict(previous_contracts)
+        for contract in saved.contracts or []:
+            previous = previous_contracts.pop(contract.id, None)
+            if previous == (contract.publication_status, contract.last_updated):
+                continue
+            previous_contract_status = previous[0] if previous is not None else None
+            changes.append(
+                orm.Change(
+                    object_type=enums.ChangeObjectType.CONTRACT,
+                    event=(
+                        enums.ChangeEvent.CREATE
+                        if previous is None
+                        else self._event(previous_contract_status, contract.publication_status)
+                    ),
+                    product_id=saved.id,
+                    contract_id=contract.id,
+                    publication_status=contract.publication_status,
+                    previous_publication_status=previous_contract_status,
+                    product_publication_status=saved.publication_status,
+                )
+            )
+        changes.extend(
+            self._deleted_contract_change(saved.id, contract_id, status, saved.publication_status)
+            for contract_id, (status, _last_updated) in previous_contracts.items()
+        )
+        return changes
+
+    @staticmethod
+    def _deleted_contract_change(
+        product_id: int,
+        contract_id: int,
+        previous_status: str | None,
+        product_status: str | None,
+    ) -> orm.Change:
+        return orm.Change(
+            object_type=enums.ChangeObjectType.CONTRACT,
+            event=enums.ChangeEvent.DELETE,
+            product_id=product_id,
+            contract_id=contract_id,
+            previous_publication_status=previous_status,
+            product_publication_status=product_status,
+        )
+
     def get_revision(self, id: int) -> Product:
         try:
             return self.revision_manager.get(product_id=id).to_domain()
@@ -200,11 +725,14 @@ class ProductRepository(AbstractRepository[Product]):
 
     def save_revision(self, item: Product) -> Product:
         try:
-            return orm.ProductRevision.from_domain(item)
+            revision = orm.ProductRevision.from_domain(item)
         except orm.Product.DoesNotExist as e:
             raise exceptions.ObjectDoesNotExist from e
         except IntegrityError as e:
             raise exceptions.ValidationError(f"Error for {item.name}: {e!s}") from e
+        # The live product has a revision now.
+        notify(product_ids=[item.id])
+        return revision
 
     def publish_revision(self, id: int) -> Product:
         try:
@@ -223,7 +751,7 @@ class ProductRepository(AbstractRepository[Product]):
 
                 revision_product = revision.to_domain()
                 revision_product.last_updated = timezone.now()
-                published_product = self.save(revision_product)
+                published_product = self._save(revision_product, enums.ChangeEvent.PUBLISH)
                 revision.delete()
                 return published_product
         except orm.Product.DoesNotExist as e:
@@ -239,6 +767,7 @@ class ProductRepository(AbstractRepository[Product]):
             raise exceptions.ObjectDoesNotExist(
                 f"Product revision for product with id {id} does not exist."
             )
+        notify(product_ids=[id])
 
         return id
 
@@ -255,11 +784,13 @@ class ProductRepository(AbstractRepository[Product]):
 
     def save_contract_revision(self, *, product_id: int, contract: DataContract) -> DataContract:
         try:
-            return orm.DataContractRevision.from_domain(contract, product_id)
+            revision = orm.DataContractRevision.from_domain(contract, product_id)
         except orm.DataContract.DoesNotExist as e:
             raise exceptions.ObjectDoesNotExist from e
         except IntegrityError as e:
             raise exceptions.ValidationError(f"Error for {contract.name}: {e!s}") from e
+        notify(product_ids=[product_id])
+        return revision
 
     def publish_contract_revision(self, *, product_id: int, contract_id: int) -> DataContract:
         try:
@@ -297,7 +828,21 @@ class ProductRepository(AbstractRepository[Product]):
                         distribution.id = None
 
                 saved_contract = orm.DataContract.from_domain(published_contract, product_id)
+                orm.Change.record(
+                    [
+                        orm.Change(
+                            object_type=enums.ChangeObjectType.CONTRACT,
+                            event=enums.ChangeEvent.PUBLISH,
+                            product_id=product_id,
+                            contract_id=contract_id,
+                            publication_status=saved_contract.publication_status,
+                            previous_publication_status=live_contract.publication_status,
+                            product_publication_status=live_contract.product.publication_status,
+                        )
+                    ]
+                )
                 revision.delete()
+                notify(product_ids=[product_id])
                 return saved_contract
         except orm.DataContract.DoesNotExist as e:
             raise exceptions.ObjectDoesNotExist from e
@@ -315,12 +860,66 @@ class ProductRepository(AbstractRepository[Product]):
             raise exceptions.ObjectDoesNotExist(
                 f"Contract revision for contract with id {contract_id} does not exist."
             )
-
+        notify(product_ids=[product_id])
         return contract_id
 
     def delete(self, id: int) -> int:
-        num_delete, _ = orm.Product.objects.filter(pk=id).delete()
-        if num_delete == 0:
-            raise exceptions.ObjectDoesNotExist
+        with transaction.atomic():
+            snapshot = self._status_snapshot(id)
+            if snapshot is None:
+                raise exceptions.ObjectDoesNotExist
+            # The products it was a source or sink of lose it as well.
+            linked = list(
+                orm.Product.sources.through.objects.filter(
+                    Q(from_product_id=id) | Q(to_product_id=id)
+                ).values_list("from_product_id", "to_product_id")
+            )
 
+            orm.Product.objects.filter(pk=id).delete()
+            orm.Change.record(
+                [
+                    orm.Change(
+                        object_type=enums.ChangeObjectType.PRODUCT,
+                        event=enums.ChangeEvent.DELETE,
+                        product_id=id,
+                        previous_publication_status=snapshot.publication_status,
+                    ),
+                    *(
+                        self._deleted_contract_change(
+                            id, contract_id, status, snapshot.publication_status
+                        )
+                        for contract_id, (status, _last_updated) in snapshot.contracts.items()
+                    ),
+                ]
+            )
+            notify(
+                product_ids={id, *(product_id for link in linked for product_id in link)},
+                team_ids=[snapshot.team_id],
+                published=self._changes_listings(snapshot.publication_status, None),
+            )
         return id
+
+    def list_changes(
+        self, *, since: int, limit: int, statuses: Collection[enums.PublicationStatus]
+    ) -> ChangeFeed:
+        """The changes after the since cursor that had one of statuses, before or after. Those
+        to contracts only if their product had one of statuses as well, so the feed doesn't
+        reveal (the ids of) products that aren't published."""
+        changes = list(
+            orm.Change.objects.filter(pk__gt=since)
+            .filter(
+                Q(publication_status__in=statuses) | Q(previous_publication_status__in=statuses)
+            )
+            .filter(
+                Q(object_type=enums.ChangeObjectType.PRODUCT)
+                | Q(product_publication_status__in=statuses)
+            )
+            .order_by("pk")[: limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        return ChangeFeed(
+            changes=[change.to_domain() for change in changes],
+            cursor=changes[-1].pk if changes else since,
+            has_more=has_more,
+        )
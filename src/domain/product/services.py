@@ -1,7 +1,8 @@
 import copy
+from collections.abc import Collection
 
 from domain import exceptions
-from domain.auth import ProductId, Scope, authorize
+from domain.auth import AuthorizationService, ProductId, Scope, authorize
 from domain.base import AbstractRepository, AbstractService
 from domain.product import (
     DataContract,
@@ -11,19 +12,23 @@ from domain.product import (
     RefreshPeriod,
     enums,
 )
+from domain.product.objects import Lineage
 from domain.product.policies import ProductReadLevel, ProductReadPolicy
 
 
 class ProductService(AbstractService):
     repository: AbstractRepository[Product]
 
-    def __init__(self, repo: AbstractRepository[Product]):
+    def __init__(
+        self, repo: AbstractRepository[Product], auth: AuthorizationService | None = None
+    ):
         self.repository = repo
-        if authorize.auth is None:
+        auth = auth or authorize.auth
+        if auth is None:
             raise exceptions.DomainException(
                 "Authorizer doesn't have an AuthorizationService, please call set_auth_service()"
             )
-        self.auth = authorize.auth
+        self.auth = auth
 
     def _normalize_contract_draft_data(self, data: dict) -> dict:
         distributions = data.get("distributions")
@@ -55,7 +60,7 @@ class ProductService(AbstractService):
     def get_all_products(self, **kwargs) -> list[Product]:
         return self.repository.list_all()
 
-    def _get_exception(self, scopes: list[Scope] | None, message: str):
+    def _get_exception(self, scopes: Collection[Scope] | None, message: str):
         if scopes:
             return exceptions.NotAuthorized(message)
         else:
@@ -65,13 +70,18 @@ class ProductService(AbstractService):
         self,
         product_id: int,
         *,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
+        include: Collection[str] | None = None,
+        cached: bool = True,
         **kwargs,
     ) -> Product:
+        """Get a product as far as the scopes allow. Only the relations in include are
+        hydrated (see PRODUCT_RELATIONS), so don't pass it when the product gets modified.
+        A product that gets modified is loaded with cached=False as well."""
         policy = ProductReadPolicy(auth=self.auth)
         level = policy.level_for_product(product_id=ProductId(product_id), scopes=scopes)
         if level is ProductReadLevel.FULL:
-            return self.repository.get(product_id)
+            return self.repository.get(product_id, include=include, cached=cached)
         if level is ProductReadLevel.INTERNAL:
             return self.repository.get_for_publication_status(
                 product_id,
@@ -79,12 +89,48 @@ class ProductService(AbstractService):
                     enums.PublicationStatus.PUBLISHED,
                     enums.PublicationStatus.INTERNALLY_PUBLISHED,
                 ],
+                include=include,
+                cached=cached,
             )
 
         try:
             return self.repository.get_for_publication_status(
                 product_id,
                 [enums.PublicationStatus.PUBLISHED],
+                include=include,
+                cached=cached,
+            )
+        except exceptions.AuthException as exc:
+            raise self._get_exception(scopes, exc.message) from exc
+
+    async def aget_product(
+        self,
+        product_id: int,
+        *,
+        scopes: Collection[Scope] | None = None,
+        include: Collection[str] | None = None,
+        **kwargs,
+    ) -> Product:
+        """The async variant of get_product(), for the async views."""
+        policy = ProductReadPolicy(auth=self.auth)
+        level = await policy.alevel_for_product(product_id=ProductId(product_id), scopes=scopes)
+        if level is ProductReadLevel.FULL:
+            return await self.repository.aget(product_id, include=include)
+        if level is ProductReadLevel.INTERNAL:
+            return await self.repository.aget_for_publication_status(
+                product_id,
+                [
+                    enums.PublicationStatus.PUBLISHED,
+                    enums.PublicationStatus.INTERNALLY_PUBLISHED,
+                ],
+                include=include,
+            )
+
+        try:
+            return await self.repository.aget_for_publication_status(
+                product_id,
+                [enums.PublicationStatus.PUBLISHED],
+                include=include,
             )
         except exceptions.AuthException as exc:
             raise self._get_exception(scopes, exc.message) from exc
@@ -93,7 +139,7 @@ class ProductService(AbstractService):
         self,
         name: str,
         *,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> Product:
         policy = ProductReadPolicy(auth=self.auth)
@@ -117,6 +163,63 @@ class ProductService(AbstractService):
         except exceptions.AuthException as exc:
             raise self._get_exception(scopes, exc.message) from exc
 
+    async def aget_product_by_name(
+        self,
+        name: str,
+        *,
+        scopes: Collection[Scope] | None = None,
+        **kwargs,
+    ) -> Product:
+        """The async variant of get_product_by_name(), for the async views."""
+        policy = ProductReadPolicy(auth=self.auth)
+        level = await policy.alevel_for_product_name(name=name, scopes=scopes)
+        if level is ProductReadLevel.FULL:
+            return await self.repository.aget_by_name(name)
+        if level is ProductReadLevel.INTERNAL:
+            return await self.repository.aget_for_publication_status_by_name(
+                name,
+                [
+                    enums.PublicationStatus.PUBLISHED,
+                    enums.PublicationStatus.INTERNALLY_PUBLISHED,
+                ],
+            )
+
+        try:
+            return await self.repository.aget_for_publication_status_by_name(
+                name,
+                [enums.PublicationStatus.PUBLISHED],
+            )
+        except exceptions.AuthException as exc:
+            raise self._get_exception(scopes, exc.message) from exc
+
+    def get_lineage(
+        self,
+        product_id: int,
+        *,
+        direction: enums.LineageDirection,
+        depth: int,
+        scopes: Collection[Scope] | None = None,
+        **kwargs,
+    ) -> Lineage:
+        """Get the products upstream or downstream of a product, up to depth hops away.
+
+        The product itself must be readable for the caller, the lineage only contains (and is
+        only traversed through) products the caller may read regardless of team membership.
+        """
+        self.get_product(product_id, scopes=scopes, include=set())
+        level = ProductReadPolicy(auth=self.auth).level(scopes=scopes)
+        allowed_statuses = {
+            ProductReadLevel.FULL: None,
+            ProductReadLevel.INTERNAL: [
+                enums.PublicationStatus.PUBLISHED,
+                enums.PublicationStatus.INTERNALLY_PUBLISHED,
+            ],
+            ProductReadLevel.PUBLISHED: [enums.PublicationStatus.PUBLISHED],
+        }[level]
+        return self.repository.get_lineage(
+            product_id, direction=direction, depth=depth, allowed_statuses=allowed_statuses
+        )
+
     @authorize.is_admin
     @authorize.is_team_member
     def create_product(self, *, data: dict, **kwargs) -> Product:
@@ -203,7 +306,7 @@ class ProductService(AbstractService):
     @authorize.is_admin
     @authorize.is_team_member
     def update_product(self, *, product_id: int, data: dict, **kwargs) -> Product:
-        existing_product = self.get_product(product_id=product_id, **kwargs)
+        existing_product = self.get_product(product_id=product_id, cached=False, **kwargs)
         access_url = data.pop("access_url", None) if "access_url" in data else None
         if data.get("refresh_period"):
             data["refresh_period"] = RefreshPeriod.from_dict(data["refresh_period"])
@@ -222,7 +325,7 @@ class ProductService(AbstractService):
     @authorize.is_admin
     @authorize.is_team_member
     def get_product_revision(self, *, product_id: int, **kwargs) -> Product:
-        product = self.repository.get(product_id)
+        product = self.repository.get(product_id, cached=False)
         if product.publication_status != enums.PublicationStatus.PUBLISHED:
             raise exceptions.IllegalOperation(
                 "Product working copies are only available for externally published products."
@@ -232,7 +335,7 @@ class ProductService(AbstractService):
     @authorize.is_admin
     @authorize.is_team_member
     def update_product_revision(self, *, product_id: int, data: dict, **kwargs) -> Product:
-        live_product = self.repository.get(product_id)
+        live_product = self.repository.get(product_id, cached=False)
         if live_product.publication_status != enums.PublicationStatus.PUBLISHED:
             raise exceptions.IllegalOperation(
                 "Product working copies are only available for externally published products."
@@ -260,7 +363,7 @@ class ProductService(AbstractService):
     @authorize.is_admin
     @authorize.is_team_member
     def discard_product_revision(self, *, product_id: int, **kwargs) -> int:
-        product = self.repository.get(product_id)
+        product = self.repository.get(product_id, cached=False)
         if product.publication_status != enums.PublicationStatus.PUBLISHED:
             raise exceptions.IllegalOperation(
                 "Product working copies are only available for externally published products."
@@ -270,7 +373,7 @@ class ProductService(AbstractService):
     @authorize.is_admin
     @authorize.is_team_member
     def publish_product_revision(self, *, product_id: int, **kwargs) -> Product:
-        product = self.repository.get(product_id)
+        product = self.repository.get(product_id, cached=False)
         if product.publication_status != enums.PublicationStatus.PUBLISHED:
             raise exceptions.IllegalOperation(
                 "Product working copies are only available for externally published products."
@@ -295,7 +398,7 @@ class ProductService(AbstractService):
     @authorize.is_admin
     @authorize.is_team_member
     def delete_product(self, *, product_id: int, **kwargs) -> None:
-        product = self.get_product(product_id=product_id, **kwargs)
+        product = self.get_product(product_id=product_id, cached=False, **kwargs)
         if product.publication_date is not None:
             published_contract_ids = [
                 contract.id
@@ -320,7 +423,7 @@ class ProductService(AbstractService):
         self,
         product_id: int,
         *,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> list[DataContract]:
         product = self.get_product(product_id=product_id, scopes=scopes, **kwargs)
@@ -331,7 +434,7 @@ class ProductService(AbstractService):
         product_id: int,
         contract_id: int,
         *,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> DataContract:
         product = self.get_product(product_id=product_id, scopes=scopes, **kwargs)
@@ -342,10 +445,10 @@ class ProductService(AbstractService):
         *,
         product_id: int,
         contract_id: int,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> DataContract:
-        product = self.get_product(product_id=product_id, scopes=scopes, **kwargs)
+        product = self.get_product(product_id=product_id, scopes=scopes, cached=False, **kwargs)
         contract = product.get_contract(contract_id)
         if (
             product.type != enums.ProductType.DATAPRODUCT
@@ -363,10 +466,10 @@ class ProductService(AbstractService):
         *,
         product_id: int,
         contract_id: int,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> Product:
-        product = self.get_product(product_id=product_id, scopes=scopes, **kwargs)
+        product = self.get_product(product_id=product_id, scopes=scopes, cached=False, **kwargs)
         contract = product.get_contract(contract_id)
         if (
             product.type == enums.ProductType.DATAPRODUCT
@@ -409,7 +512,7 @@ class ProductService(AbstractService):
         *,
         product_id: int,
         contract_id: int,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> DataContract:
         self._get_contract_for_revision(
@@ -431,7 +534,7 @@ class ProductService(AbstractService):
         product_id: int,
         contract_id: int,
         data: dict,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> DataContract:
         live_contract = self._get_contract_for_revision(
@@ -468,7 +571,7 @@ class ProductService(AbstractService):
         *,
         product_id: int,
         contract_id: int,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> int:
         self._get_contract_for_revision(
@@ -488,7 +591,7 @@ class ProductService(AbstractService):
         *,
         product_id: int,
         contract_id: int,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> DataContract:
         self._get_contract_for_revision(
@@ -497,7 +600,7 @@ class ProductService(AbstractService):
             scopes=scopes,
             **kwargs,
         )
-        product = self.get_product(product_id=product_id, scopes=scopes, **kwargs)
+        product = self.get_product(product_id=product_id, scopes=scopes, cached=False, **kwargs)
         revision_contract = self.repository.get_contract_revision(
             product_id=product_id,
             contract_id=contract_id,
@@ -514,7 +617,7 @@ class ProductService(AbstractService):
     @authorize.is_admin
     @authorize.is_team_member
     def create_contract(self, product_id: int, data: dict, **kwargs) -> DataContract:
-        product = self.get_product(product_id=product_id, **kwargs)
+        product = self.get_product(product_id=product_id, cached=False, **kwargs)
         contract = DataContract(
             **data,
             publication_status=enums.PublicationStatus.DRAFT,
@@ -545,7 +648,7 @@ class ProductService(AbstractService):
     def update_contract_publication_status(
         self, product_id: int, contract_id: int, data: dict, **kwargs
     ) -> DataContract:
-        product = self.get_product(product_id=product_id, **kwargs)
+        product = self.get_product(product_id=product_id, cached=False, **kwargs)
         product.update_contract_state(contract_id, data)
         updated_product = self._persist(product)
         updated_contract = updated_product.get_contract(contract_id)
@@ -559,7 +662,7 @@ class ProductService(AbstractService):
     @authorize.is_admin
     @authorize.is_team_member
     def delete_contract(self, product_id: int, contract_id: int, **kwargs):
-        product = self.get_product(product_id=product_id, **kwargs)
+        product = self.get_product(product_id=product_id, cached=False, **kwargs)
         contract = product.get_contract(contract_id)
         product.delete_contract(contract_id)
         self._persist(product)
@@ -572,7 +675,7 @@ class ProductService(AbstractService):
     @authorize.is_admin
     @authorize.is_team_member
     def update_publication_status(self, product_id: int, data: dict, **kwargs) -> Product:
-        existing_product = self.repository.get(product_id)
+        existing_product = self.repository.get(product_id, cached=False)
         existing_product.update_state(data)
         updated_product = self._persist(existing_product)
         if updated_product.publication_status == enums.PublicationStatus.DELETED:
@@ -584,7 +687,7 @@ class ProductService(AbstractService):
         product_id: int,
         contract_id: int,
         *,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> list[Distribution]:
         product = self.get_product(product_id=product_id, scopes=scopes, **kwargs)
@@ -596,7 +699,7 @@ class ProductService(AbstractService):
         contract_id: int,
         distribution_id: int,
         *,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> Distribution:
         product = self.get_product(product_id, scopes=scopes, **kwargs)
@@ -657,7 +760,7 @@ class ProductService(AbstractService):
         self,
         product_id: int,
         *,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> list[DataService]:
         product = self.get_product(product_id, scopes=scopes, **kwargs)
@@ -668,7 +771,7 @@ class ProductService(AbstractService):
         product_id: int,
         service_id: int,
         *,
-        scopes: list[Scope] | None = None,
+        scopes: Collection[Scope] | None = None,
         **kwargs,
     ) -> DataService:
         product = self.get_product(product_id, scopes=scopes, **kwargs)
@@ -677,7 +780,7 @@ class ProductService(AbstractService):
     @authorize.is_admin
     @authorize.is_team_member
     def create_service(self, product_id: int, data: dict, **kwargs) -> DataService:
-        product = self.get_product(product_id=product_id, **kwargs)
+        product = self.get_product(product_id=product_id, cached=False, **kwargs)
         product.create_service(data)
         updated_product = self._persist(product)
         return updated_product.services[-1]
@@ -687,7 +790,7 @@ class ProductService(AbstractService):
     def update_service(
         self, product_id: int, service_id: int, data: dict, **kwargs
     ) -> DataService:
-        product = self.get_product(product_id=product_id, **kwargs)
+        product = self.get_product(product_id=product_id, cached=False, **kwargs)
         service = product.update_service(service_id, data)
         self._persist(product)
         return service
@@ -695,7 +798,7 @@ class ProductService(AbstractService):
     @authorize.is_admin
     @authorize.is_team_member
     def delete_service(self, product_id: int, service_id: int, **kwargs) -> int:
-        product = self.get_product(product_id=product_id, **kwargs)
+        product = self.get_product(product_id=product_id, cached=False, **kwargs)
         product.delete_service(service_id)
         self._persist(product)
         return service_id
@@ -1,9 +1,13 @@
-from django.db.models import F, Manager, Value
+from django.db import transaction
+from django.db.models import Count, F, Q, QuerySet, Value
 from django.db.utils import IntegrityError
 
 from beheeromgeving import models as orm
+from beheeromgeving.http_cache import TEAM_LIST_KEY, tag, team_key
+from beheeromgeving.invalidation import notify
 from domain import exceptions
 from domain.base import AbstractRepository
+from domain.product import enums
 from domain.team import Team
 
 # alias for typing
@@ -11,16 +15,23 @@ list_ = list
 
 
 class TeamRepository(AbstractRepository[Team]):
-    manager: Manager[orm.Team]
+    manager: QuerySet[orm.Team]
 
     def __init__(self):
-        self.manager = orm.Team.objects
+        # Count the published products in the same query, instead of once per team.
+        self.manager = orm.Team.objects.annotate(
+            published_product_count=Count(
+                "products", filter=Q(products__publication_status__in=["P", "I"])
+            )
+        )
 
     def get(self, id: int) -> Team:
         try:
-            return self.manager.get(pk=id).to_domain()
+            team = self.manager.get(pk=id).to_domain()
         except orm.Team.DoesNotExist as e:
             raise exceptions.ObjectDoesNotExist(f"Team with id {id} does not exist") from e
+        tag(team_key(id))
+        return team
 
     def get_by_name(self, name: str) -> Team:
         team = (
@@ -30,20 +41,77 @@ class TeamRepository(AbstractRepository[Team]):
         )
         if not team:
             raise exceptions.ObjectDoesNotExist(f"Team with name {name} does not exist")
+        tag(team_key(team.pk))
         return team.to_domain()
 
+    @staticmethod
+    def _tagged_list(teams: list_[Team]) -> list_[Team]:
+        tag(TEAM_LIST_KEY, *(team_key(team.id) for team in teams))
+        return teams
+
     def list(self) -> list_[Team]:
-        return [t.to_domain() for t in self.manager.all()]
+        return self._tagged_list([t.to_domain() for t in self.manager.all()])
+
+    async def alist(self) -> list_[Team]:
+        return self._tagged_list([t.to_domain() async for t in self.manager.all()])
 
     def save(self, item: Team) -> Team:
         try:
             saved_team = orm.Team.from_domain(item)
         except IntegrityError:
             raise exceptions.ValidationError(f"Team {item.acronym} already exists") from None
+        notify(team_ids=[saved_team.id])
         return saved_team
 
+    @staticmethod
+    def _deleted_product_changes(id: int) -> list_[orm.Change]:
+        """The deletions of the products of the team and their contracts, which are deleted
+        along with it, for the outbox."""
+        rows = orm.Product.objects.filter(team_id=id).values_list(
+            "id", "publication_status", "contracts__id", "contracts__publication_status"
+        )
+        products: dict[int, str | None] = {}
+        contracts: list_[orm.Change] = []
+        for product_id, status, contract_id, contract_status in rows.order_by("id"):
+            products[product_id] = status
+            if contract_id is not None:
+                contracts.append(
+                    orm.Change(
+                        object_type=enums.ChangeObjectType.CONTRACT,
+                        event=enums.ChangeEvent.DELETE,
+                        product_id=product_id,
+                        contract_id=contract_id,
+                        previous_publication_status=contract_status,
+                        product_publication_status=status,
+                    )
+                )
+        return [
+            *(
+                orm.Change(
+                    object_type=enums.ChangeObjectType.PRODUCT,
+                    event=enums.ChangeEvent.DELETE,
+                    product_id=product_id,
+                    previous_publication_status=status,
+                )
+                for product_id, status in products.items()
+            ),
+            *contracts,
+        ]
+
     def delete(self, id: int) -> int:
-        num_deleted, _ = orm.Team.objects.filter(id=id).delete()
-        if num_deleted == 0:
-            raise exceptions.ObjectDoesNotExist(f"Team with id {id} does not exist")
+        with transaction.atomic():
+            changes = self._deleted_product_changes(id)
+            # The products of other teams they were a source or sink of lose them as well.
+            product_ids = {change.product_id for change in changes}
+            linked = orm.Product.sources.through.objects.filter(
+                Q(from_product_id__in=product_ids) | Q(to_product_id__in=product_ids)
+            ).values_list("from_product_id", "to_product_id")
+            linked_ids = {product_id for link in linked for product_id in link}
+
+            num_deleted, _ = orm.Team.objects.filter(id=id).delete()
+            if num_deleted == 0:
+                raise exceptions.ObjectDoesNotExist(f"Team with id {id} does not exist")
+            orm.Change.record(changes)
+            # Its products are deleted along with it.
+            notify(product_ids=linked_ids | product_ids, team_ids=[id], published=True)
         return id
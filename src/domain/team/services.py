@@ -1,6 +1,6 @@
 from django.conf import settings
 
-from domain.auth import authorize
+from domain.auth import AuthorizationService, authorize
 from domain.base import AbstractRepository, AbstractService
 from domain.team import Team
 
@@ -8,8 +8,15 @@ from domain.team import Team
 class TeamService(AbstractService):
     repository: AbstractRepository[Team]
 
-    def __init__(self, repo: AbstractRepository[Team], **kwargs):
+    def __init__(
+        self,
+        repo: AbstractRepository[Team],
+        auth: AuthorizationService | None = None,
+        **kwargs,
+    ):
         self.repository = repo
+        # Checks the authorization of the @authorize methods, see Authorizer.
+        self.auth = auth
 
     def get_team(self, team_id: int) -> Team:
         return self.repository.get(team_id)
@@ -17,14 +24,22 @@ class TeamService(AbstractService):
     def get_teams(self) -> list[Team]:
         return self.repository.list()
 
+    async def aget_teams(self) -> list[Team]:
+        return await self.repository.alist()
+
     def get_team_by_name(self, name: str) -> Team:
         return self.repository.get_by_name(name)
 
-    def get_teams_from_scopes(self, scopes) -> list[Team]:
-        all_teams = self.get_teams()
+    def _teams_of_scopes(self, teams: list[Team], scopes) -> list[Team]:
         if settings.ADMIN_ROLE_NAME in scopes:
-            return all_teams
-        return [team for team in all_teams if team.scope in scopes]
+            return teams
+        return [team for team in teams if team.scope in scopes]
+
+    def get_teams_from_scopes(self, scopes) -> list[Team]:
+        return self._teams_of_scopes(self.get_teams(), scopes)
+
+    async def aget_teams_from_scopes(self, scopes) -> list[Team]:
+        return self._teams_of_scopes(await self.aget_teams(), scopes)
 
     @authorize.is_admin
     def create_team(self, *, data, **kwargs) -> Team:
@@ -0,0 +1,5 @@
+from domain.webhook.objects import WebhookSubscription
+from domain.webhook.repositories import WebhookRepository
+from domain.webhook.services import WebhookService
+
+__all__ = [WebhookSubscription, WebhookRepository, WebhookService]
@@ -0,0 +1,7 @@
+from domain.product.enums import StrChoicesEnum
+
+
+class DeliveryStatus(StrChoicesEnum):
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    DEAD = "dead"
@@ -0,0 +1,23 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from domain.base import BaseObject
+from domain.product import enums
+
+
+@dataclass
+class WebhookSubscription(BaseObject):
+    """A subscription of a url to the changes of the products of a team, or of all products
+    if it has no team. Empty event_types or publication_statuses match all of them."""
+
+    url: str
+    team_id: int | None = None
+    event_types: list[enums.ChangeEvent] = field(default_factory=list)
+    publication_statuses: list[enums.PublicationStatus] = field(
+        default_factory=lambda: [enums.PublicationStatus.PUBLISHED]
+    )
+    secret: str | None = None
+    id: int | None = None
+    created_at: datetime | None = None
+
+    _skip_keys = {"created_at"}
@@ -0,0 +1,51 @@
+from django.db.models import Max, QuerySet
+
+from beheeromgeving import models as orm
+from domain import exceptions
+from domain.auth import Scope
+from domain.webhook.objects import WebhookSubscription
+
+# alias for typing
+list_ = list
+
+
+class WebhookRepository:
+    manager: QuerySet[orm.WebhookSubscription]
+
+    def __init__(self):
+        self.manager = orm.WebhookSubscription.objects.all()
+
+    def get(self, id: int) -> WebhookSubscription:
+        try:
+            return self.manager.get(pk=id).to_domain()
+        except orm.WebhookSubscription.DoesNotExist as e:
+            raise exceptions.ObjectDoesNotExist(
+                f"Webhook subscription with id {id} does not exist"
+            ) from e
+
+    def list(self, team_scopes: list_[Scope] | None = None) -> list_[WebhookSubscription]:
+        """All subscriptions, or those of the teams with one of team_scopes."""
+        subscriptions = self.manager.order_by("pk")
+        if team_scopes is not None:
+            subscriptions = subscriptions.filter(team__scope__in=team_scopes)
+        return [subscription.to_domain() for subscription in subscriptions]
+
+    def save(self, item: WebhookSubscription) -> WebhookSubscription:
+        # Foreign keys are only checked on commit, so check the team before saving.
+        if item.team_id is not None and not orm.Team.objects.filter(pk=item.team_id).exists():
+            raise exceptions.ValidationError(f"Team with id {item.team_id} does not exist")
+        # A new subscription gets the changes from now on.
+        cursor = (
+            orm.Change.objects.aggregate(cursor=Max("pk"))["cursor"] or 0
+            if item.id is None
+            else None
+        )
+        return orm.WebhookSubscription.from_domain(item, cursor=cursor)
+
+    def delete(self, id: int) -> int:
+        num_deleted, _ = orm.WebhookSubscription.objects.filter(pk=id).delete()
+        if num_deleted == 0:
+            raise exceptions.ObjectDoesNotExist(
+                f"Webhook subscription with id {id} does not exist"
+            )
+        return id
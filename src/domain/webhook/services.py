@@ -0,0 +1,64 @@
+import secrets
+from collections.abc import Collection
+
+from domain.auth import AuthorizationService, Scope, authorize
+from domain.base import AbstractService
+from domain.exceptions import NotAuthenticated
+from domain.webhook.objects import WebhookSubscription
+from domain.webhook.repositories import WebhookRepository
+
+
+class WebhookService(AbstractService):
+    repository: WebhookRepository
+
+    def __init__(
+        self,
+        repo: WebhookRepository,
+        auth: AuthorizationService | None = None,
+        **kwargs,
+    ):
+        self.repository = repo
+        # Checks the authorization of the @authorize methods, see Authorizer.
+        self.auth = auth
+
+    def get_subscriptions(
+        self, *, scopes: Collection[Scope], **kwargs
+    ) -> list[WebhookSubscription]:
+        """All subscriptions for admins, the subscriptions of their teams for others."""
+        auth = authorize.auth_for(self)
+        if auth.feature_enabled and not scopes:
+            raise NotAuthenticated("Authentication required.")
+        if not auth.feature_enabled or auth.is_admin(scopes=scopes):
+            return self.repository.list()
+        return self.repository.list(team_scopes=scopes)
+
+    def get_subscription(self, *, subscription_id: int, **kwargs) -> WebhookSubscription:
+        subscription = self.repository.get(subscription_id)
+        self._check_access(subscription, **kwargs)
+        return subscription
+
+    def create_subscription(self, *, data: dict, **kwargs) -> WebhookSubscription:
+        subscription = WebhookSubscription(**data, secret=secrets.token_urlsafe(32))
+        self._check_access(subscription, **kwargs)
+        return self.repository.save(subscription)
+
+    def delete_subscription(self, *, subscription_id: int, **kwargs) -> int:
+        subscription = self.repository.get(subscription_id)
+        self._check_access(subscription, **kwargs)
+        return self.repository.delete(subscription_id)
+
+    def _check_access(self, subscription: WebhookSubscription, **kwargs):
+        """Global subscriptions are managed by admins, the others by their team as well."""
+        if subscription.team_id is None:
+            self._check_global_access(**kwargs)
+        else:
+            self._check_team_access(data={"team_id": subscription.team_id}, **kwargs)
+
+    @authorize.is_admin
+    def _check_global_access(self, **kwargs):
+        pass
+
+    @authorize.is_admin
+    @authorize.is_team_member
+    def _check_team_access(self, *, data: dict, **kwargs):
+        pass
@@ -1,5 +1,7 @@
 import json
+import threading
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 import pytest
@@ -12,9 +14,6 @@ from tests.utils import build_jwt_token
 @pytest.fixture()
 def api_client() -> APIClient:
     """Return a client that has unhindered access to the API views"""
-    from api.views import initialize
-
-    initialize()
     api_client = APIClient()
     api_client.default_format = "json"  # instead of multipart
     return api_client
@@ -332,6 +331,18 @@ def non_published_products(orm_team) -> list[Product]:
     return result
 
 
+@pytest.fixture()
+def lineage_products(many_orm_products, non_published_products) -> list[Product]:
+    """a -> b -> c -> d -> b (a cycle), with a draft product as another sink of b."""
+    a, b, c, d = many_orm_products[:4]
+    draft = non_published_products[0]
+    b.sources.add(a, d)
+    c.sources.add(b)
+    d.sources.add(c)
+    draft.sources.add(b)
+    return [a, b, c, d, draft]
+
+
 @pytest.fixture()
 def orm_incomplete_product(orm_team) -> Product:
     product = Product.objects.create(
@@ -432,6 +443,14 @@ def client_with_token(api_client):
     return Client
 
 
+@pytest.fixture()
+def replicas(settings):
+    """Read replicas, which are only used by the ReplicaRouter (not in the tests' DATABASES)."""
+    settings.DATABASE_REPLICAS = ["replica_0", "replica_1"]
+    settings.DATABASE_REPLICA_PIN_SECONDS = 10
+    return settings.DATABASE_REPLICAS
+
+
 @pytest.fixture()
 def product_json():
     with open(Path(__file__).parent / "files" / "product.json") as file:
@@ -454,3 +473,50 @@ def marketplace_detail_json():
 def schema_api_json():
     with open(Path(__file__).parent / "files" / "schema_api.json") as file:
         return json.load(file)
+
+
+class RecordingServer(ThreadingHTTPServer):
+    """A local stand-in for a server that the application sends requests to (a webhook
+    subscriber, a caching proxy), that records the requests with the given method."""
+
+    def __init__(self, method: str):
+        handler = type("Handler", (RecordingHandler,), {f"do_{method}": RecordingHandler.record})
+        super().__init__(("127.0.0.1", 0), handler)
+        self.status = 200
+        self.received: list[tuple[dict, bytes]] = []
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+
+class RecordingHandler(BaseHTTPRequestHandler):
+    server: RecordingServer
+
+    def record(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.received.append((dict(self.headers), body))
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture()
+def recording_server():
+    """Start a RecordingServer for a method, it's stopped after the test."""
+    servers: list[RecordingServer] = []
+
+    def start(method: str) -> RecordingServer:
+        server = RecordingServer(method)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
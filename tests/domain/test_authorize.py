@@ -0,0 +1,76 @@
+from unittest.mock import patch
+
+import pytest
+from django.conf import settings
+
+from domain.auth import authorize
+from domain.exceptions import NotAuthenticated, NotAuthorized
+from domain.product import ProductService
+
+
+class Service:
+    def __init__(self, auth):
+        self.auth = auth
+
+    # In the "wrong" order on purpose: the role is checked first regardless.
+    @authorize.is_team_member
+    @authorize.is_admin
+    def update(self, *, product_id: int, **kwargs):
+        return product_id
+
+
+def rule_names(method) -> list[str]:
+    return [rule.decorator_name for rule in method.authorization_rules]
+
+
+def test_stacked_rules_are_compiled_into_one_wrapper():
+    method = ProductService.update_product
+    assert rule_names(method) == ["is_admin", "is_team_member"]
+    assert not hasattr(method.__wrapped__, "authorization_rules")
+    assert method.__name__ == "update_product"
+
+
+def test_roles_are_checked_before_lookups():
+    assert rule_names(Service.update) == ["is_admin", "is_team_member"]
+
+
+def test_admin_without_lookup(auth_service, auth_repo, product):
+    service = Service(auth_service)
+    with patch.object(
+        auth_repo, "can_access_product", wraps=auth_repo.can_access_product
+    ) as lookup:
+        assert (
+            service.update(product_id=product.id, scopes=[settings.ADMIN_ROLE_NAME]) == product.id
+        )
+    lookup.assert_not_called()
+
+
+def test_team_member(auth_service, product, team):
+    service = Service(auth_service)
+    assert service.update(product_id=product.id, scopes=[team.scope]) == product.id
+
+
+def test_other_team(auth_service, product, other_team):
+    service = Service(auth_service)
+    with pytest.raises(NotAuthorized):
+        service.update(product_id=product.id, scopes=[other_team.scope])
+
+
+@pytest.mark.parametrize("scopes", [None, []])
+def test_not_authenticated(auth_service, product, scopes):
+    service = Service(auth_service)
+    with pytest.raises(NotAuthenticated):
+        service.update(product_id=product.id, scopes=scopes)
+
+
+def test_feature_disabled(auth_service, auth_repo, product):
+    auth_repo.feature_enabled = False
+    assert Service(auth_service).update(product_id=product.id) == product.id
+
+
+def test_checks_are_bound_once(auth_service, product, team):
+    service = Service(auth_service)
+    with patch.object(authorize, "_bind", wraps=authorize._bind) as bind:
+        service.update(product_id=product.id, scopes=[team.scope])
+        service.update(product_id=product.id, scopes=[team.scope])
+    assert bind.call_count == 2
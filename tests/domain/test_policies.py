@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from django.conf import settings
 
 from domain.product.policies import ProductReadLevel, ProductReadPolicy
@@ -78,3 +80,14 @@ class TestProductReadPolicy:
         assert policy.level(scopes=[settings.EMPLOYEE_ROLE_NAME]) is ProductReadLevel.INTERNAL
         assert policy.level(scopes=[]) is ProductReadLevel.PUBLISHED
         assert policy.level(scopes=None) is ProductReadLevel.PUBLISHED
+
+    def test_level_of_a_token_is_derived_once(self, auth_service):
+        policy = ProductReadPolicy(auth=auth_service)
+        scopes = frozenset({settings.EMPLOYEE_ROLE_NAME})
+
+        with patch.object(auth_service, "is_employee", wraps=auth_service.is_employee) as check:
+            assert policy.level(scopes=scopes) is ProductReadLevel.INTERNAL
+            assert policy.level(scopes=frozenset(scopes)) is ProductReadLevel.INTERNAL
+            assert policy.level(scopes=list(scopes)) is ProductReadLevel.INTERNAL
+        # Scopes in a list (not of a token) are checked each time.
+        assert check.call_count == 2
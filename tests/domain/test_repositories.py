@@ -95,6 +95,24 @@ class TestProductRepository:
         assert isinstance(product, Product)
         assert product.id == orm_product.id
 
+    def test_get_without_relations(self, orm_product, django_assert_num_queries):
+        repo = ProductRepository()
+        with django_assert_num_queries(1):
+            product = repo.get(orm_product.id, include=set())
+
+        assert product.name == orm_product.name
+        assert product.owner == orm_product.owner
+        assert product.contracts == []
+        assert product.services == []
+
+    def test_get_with_contracts_without_distributions(self, orm_product):
+        repo = ProductRepository()
+        product = repo.get(orm_product.id, include={"contracts"})
+
+        assert len(product.contracts) == orm_product.contracts.count()
+        assert all(contract.distributions == [] for contract in product.contracts)
+        assert product.services == []
+
     @pytest.mark.xfail(raises=ObjectDoesNotExist)
     def test_get_non_existent(self):
         repo = ProductRepository()
@@ -183,6 +201,73 @@ class TestProductRepository:
                 [enums.PublicationStatus.PUBLISHED],
             )
 
+    def test_get_lineage_downstream(self, lineage_products, django_assert_num_queries):
+        a, b, c, d, draft = lineage_products
+        repo = ProductRepository()
+        with django_assert_num_queries(1):
+            lineage = repo.get_lineage(a.id, direction=enums.LineageDirection.DOWNSTREAM, depth=10)
+
+        assert [(node.id, node.depth) for node in lineage.nodes] == sorted(
+            [(a.id, 0), (b.id, 1), (c.id, 2), (draft.id, 2), (d.id, 3)],
+            key=lambda node: (node[1], node[0]),
+        )
+        assert {(edge.source, edge.sink) for edge in lineage.edges} == {
+            (a.id, b.id),
+            (b.id, c.id),
+            (b.id, draft.id),
+            (c.id, d.id),
+            (d.id, b.id),
+        }
+        assert lineage.nodes[0].name == a.name
+
+    def test_get_lineage_upstream(self, lineage_products):
+        a, b, c, d, _ = lineage_products
+        repo = ProductRepository()
+        lineage = repo.get_lineage(c.id, direction=enums.LineageDirection.UPSTREAM, depth=10)
+
+        assert {node.id: node.depth for node in lineage.nodes} == {
+            c.id: 0,
+            b.id: 1,
+            a.id: 2,
+            d.id: 2,
+        }
+        assert {(edge.source, edge.sink) for edge in lineage.edges} == {
+            (b.id, c.id),
+            (a.id, b.id),
+            (d.id, b.id),
+            (c.id, d.id),
+        }
+
+    def test_get_lineage_depth(self, lineage_products):
+        a, b, *_ = lineage_products
+        repo = ProductRepository()
+        lineage = repo.get_lineage(a.id, direction=enums.LineageDirection.DOWNSTREAM, depth=1)
+
+        assert [node.id for node in lineage.nodes] == [a.id, b.id]
+        assert [(edge.source, edge.sink) for edge in lineage.edges] == [(a.id, b.id)]
+
+    def test_get_lineage_for_publication_status(self, lineage_products):
+        a, b, c, d, draft = lineage_products
+        repo = ProductRepository()
+        lineage = repo.get_lineage(
+            a.id,
+            direction=enums.LineageDirection.DOWNSTREAM,
+            depth=10,
+            allowed_statuses=[enums.PublicationStatus.PUBLISHED],
+        )
+
+        assert {node.id for node in lineage.nodes} == {a.id, b.id, c.id, d.id}
+        assert (b.id, draft.id) not in {(edge.source, edge.sink) for edge in lineage.edges}
+
+    def test_get_lineage_without_relations(self, orm_product):
+        repo = ProductRepository()
+        lineage = repo.get_lineage(
+            orm_product.id, direction=enums.LineageDirection.UPSTREAM, depth=3
+        )
+
+        assert [node.id for node in lineage.nodes] == [orm_product.id]
+        assert lineage.edges == []
+
     def test_list(self, orm_product):
         repo = ProductRepository()
         result = repo.list_for_publication_status([enums.PublicationStatus.PUBLISHED])
@@ -190,6 +275,39 @@ class TestProductRepository:
         assert len(result) == 1
         assert result[0]["id"] == orm_product.id
 
+    def test_list_with_fields_is_a_single_narrow_query(
+        self, orm_product, orm_product2, django_assert_num_queries
+    ):
+        repo = ProductRepository()
+        with django_assert_num_queries(1) as captured:
+            result = repo.list_for_publication_status(
+                [enums.PublicationStatus.PUBLISHED], fields=["id", "name"]
+            )
+
+        assert {p["name"] for p in result} == {orm_product.name, orm_product2.name}
+        assert all(set(p) == {"id", "name"} for p in result)
+        assert '"description"' not in captured.captured_queries[0]["sql"]
+
+    def test_list_query_count_does_not_depend_on_number_of_products(
+        self, orm_product, many_orm_products, django_assert_max_num_queries
+    ):
+        repo = ProductRepository()
+        with django_assert_max_num_queries(4):
+            result = repo.list_for_publication_status([enums.PublicationStatus.PUBLISHED])
+
+        product = next(p for p in result if p["id"] == orm_product.id)
+        assert product["contract_count"] == 1
+        assert product["owner"] == orm_product.team.po_name
+        assert product["summary"] == {"distributions": ["F"], "services": ["REST"]}
+
+    def test_list_with_query_and_fields(self, orm_product, orm_product2):
+        repo = ProductRepository()
+        result = repo.list_for_publication_status(
+            [enums.PublicationStatus.PUBLISHED], query="fietspaden", fields=["id"]
+        )
+
+        assert result == [{"id": orm_product2.id}]
+
     def test_delete(self, orm_product):
         repo = ProductRepository()
         repo.delete(orm_product.id)
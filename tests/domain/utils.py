@@ -64,13 +64,13 @@ class DummyRepository(AbstractRepository):
                     service.id = new_service_id
                     new_service_id += 1
 
-    def get(self, id):
+    def get(self, id, include=None, *, cached=True):
         try:
             return self._items[id]
         except KeyError as e:
             raise exceptions.ObjectDoesNotExist(f"Object with id {id} does not exist") from e
 
-    def get_for_publication_status(self, id, allowed_statuses):
+    def get_for_publication_status(self, id, allowed_statuses, include=None, *, cached=True):
         allowed = {getattr(status, "value", status) for status in allowed_statuses}
         obj = self.get(id)
         obj_status = getattr(obj, "publication_status", None)
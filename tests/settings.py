@@ -44,3 +44,8 @@ STORAGES = {
 FEATURE_FLAG_USE_AUTH = True  # Tests rely on auth being enabled.
 ADMIN_ROLE_NAME = "test_admin"
 EMPLOYEE_ROLE_NAME = "test_employee"
+NPLUSONE_DETECTION = "raise"
+# The listener would keep a connection to the test database open, tests start their own.
+CACHE_INVALIDATION = False
+# The subscribers in the tests run locally, and their hosts aren't resolved.
+WEBHOOK_ALLOWED_HOSTS = ["127.0.0.1", "afnemer.amsterdam.nl"]
@@ -0,0 +1,88 @@
+"""
+Tests for the async read views of the ASGI application (see beheeromgeving/urls_asgi.py).
+
+The async views must respond exactly like the regular views, so every request is done on
+both and the responses are compared.
+"""
+
+import json
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.test import AsyncClient, override_settings
+
+from tests.utils import build_jwt_token
+
+
+def async_request(method: str, path: str, scopes: list[str] | None = None, data=None):
+    headers = {} if scopes is None else {"Authorization": f"Bearer {build_jwt_token(scopes)}"}
+    client = AsyncClient()
+    with override_settings(ROOT_URLCONF="beheeromgeving.urls_asgi"):
+        if data is None:
+            return async_to_sync(getattr(client, method))(path, headers=headers)
+        return async_to_sync(getattr(client, method))(
+            path, data, content_type="application/json", headers=headers
+        )
+
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    @pytest.mark.parametrize(
+        "path",
+        [
+            "/teams",
+            "/teams?has_published_products=true",
+            "/teams?has_published_products=maybe",
+            "/products",
+            "/products?q=bomen",
+            "/products?fields=id,name&order=-name",
+            "/products?name=Bomen",
+            "/products?name=Onbekend",
+            "/products?page=5",
+            "/products/{product}",
+            "/products/{product}?include=contracts&fields=name,contracts",
+            "/products/{draft}",
+            "/products/999999",
+            "/me",
+            "/me?fields=name",
+        ],
+    )
+    @pytest.mark.parametrize(
+        "scopes",
+        [None, ["scope_dadi"], [settings.EMPLOYEE_ROLE_NAME], [settings.ADMIN_ROLE_NAME]],
+    )
+    def test_same_response_as_sync_view(
+        self,
+        orm_product,
+        orm_draft_product,
+        orm_product2,
+        api_client,
+        client_with_token,
+        path,
+        scopes,
+    ):
+        path = path.format(product=orm_product.id, draft=orm_draft_product.id)
+        expected = api_client.get(path) if scopes is None else client_with_token(scopes).get(path)
+
+        response = async_request("get", path, scopes)
+
+        assert response.status_code == expected.status_code
+        assert response["Content-Type"] == "application/json"
+        assert json.loads(response.content) == json.loads(expected.content)
+
+    def test_other_methods_use_the_sync_view(self, orm_product, orm_team, client_with_token):
+        response = async_request(
+            "patch", f"/products/{orm_product.id}", [orm_team.scope], {"name": "Bomen en struiken"}
+        )
+
+        assert response.status_code == 200
+        assert client_with_token([]).get(f"/products/{orm_product.id}").data["name"] == (
+            "Bomen en struiken"
+        )
+
+    def test_other_urls_use_the_sync_view(self, orm_team, client_with_token):
+        response = async_request("get", f"/teams/{orm_team.id}", [settings.ADMIN_ROLE_NAME])
+
+        assert response.status_code == 200
+        assert json.loads(response.content)["name"] == orm_team.name
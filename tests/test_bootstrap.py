@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.wsgi import get_wsgi_application
+from pydantic import BaseModel
+
+from api import datatransferobjects as dtos
+from beheeromgeving import bootstrap
+
+
+def test_prebuild_validators():
+    bootstrap.prebuild_validators()
+    assert all(
+        dto.__pydantic_complete__
+        for dto in vars(dtos).values()
+        if isinstance(dto, type) and issubclass(dto, BaseModel)
+    )
+
+
+def test_wsgi_get():
+    assert bootstrap.wsgi_get(get_wsgi_application(), "/pulse") == 200
+
+
+@pytest.mark.django_db
+def test_warm_up(caplog):
+    with patch.object(bootstrap.connections, "close_all") as close_all:
+        bootstrap.warm_up(get_wsgi_application())
+    close_all.assert_called_once()
+    assert "Warmed up" in caplog.text
+
+
+def test_warm_up_failure(caplog):
+    def application(environ, start_response):
+        raise RuntimeError("database unavailable")
+
+    with patch.object(bootstrap.connections, "close_all"):
+        bootstrap.warm_up(application)
+    assert "Warm-up request to /pulse failed" in caplog.text
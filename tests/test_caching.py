@@ -0,0 +1,543 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from beheeromgeving import instrumentation, invalidation
+from beheeromgeving.caching import (
+    CacheStats,
+    SingleFlight,
+    StaleWhileRevalidate,
+    product_cache,
+    product_list_cache,
+)
+from beheeromgeving.invalidation import Invalidation
+from beheeromgeving.models import DataContract
+from beheeromgeving.routers import ReplicaMiddleware, ReplicaRouter
+from domain.product import ProductRepository
+from domain.product.enums import PublicationStatus
+
+# Nothing is cached in a transaction, so these tests don't run in one.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture(autouse=True)
+def cache(settings, tmp_path):
+    """A product cache with an empty backend that workers share (files), as only tier."""
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path / "cache"),
+        }
+    }
+    settings.PRODUCT_CACHE = True
+    caches["default"].clear()
+    product_cache.clear()
+    product_cache.stats = CacheStats()
+    yield product_cache
+    product_cache.clear()
+
+
+@pytest.fixture()
+def listening(monkeypatch):
+    """The invalidation listener runs, so the local tier is used as well."""
+    event = threading.Event()
+    event.set()
+    monkeypatch.setattr(invalidation.listener, "listening", event)
+
+
+def get(client, product) -> dict:
+    response = client.get(f"/products/{product.id}")
+    assert response.status_code == 200, response.data
+    return response.data
+
+
+def in_read_only_request(call):
+    """The result of call, in a GET request that reads from a replica."""
+
+    def view(request):
+        response = HttpResponse()
+        response.result = call()
+        return response
+
+    return ReplicaMiddleware(view)(RequestFactory().get("/products")).result
+
+
+class TestProductCache:
+    def test_shared_tier(self, cache, orm_product, api_client, django_assert_num_queries):
+        first = get(api_client, orm_product)
+        with django_assert_num_queries(0):
+            assert get(api_client, orm_product) == first
+        assert (cache.stats.shared_hits, cache.stats.misses) == (1, 1)
+
+    def test_local_tier(self, cache, listening, orm_product, api_client):
+        get(api_client, orm_product)
+        get(api_client, orm_product)
+        assert (cache.stats.local_hits, cache.stats.misses) == (1, 1)
+        assert cache.stats.hit_ratio == 0.5
+
+    def test_no_local_tier_without_listener(self, cache, orm_product, api_client):
+        get(api_client, orm_product)
+        get(api_client, orm_product)
+        assert cache.stats.local_hits == 0
+
+    @pytest.mark.parametrize("tiers", ["shared", "both"])
+    def test_update(self, request, tiers, orm_product, orm_team, client_with_token, api_client):
+        if tiers == "both":
+            request.getfixturevalue("listening")
+        get(api_client, orm_product)
+        response = client_with_token([orm_team.scope]).patch(
+            f"/products/{orm_product.id}", {"name": "Bomen en struiken"}
+        )
+        assert response.status_code == 200, response.data
+
+        assert get(api_client, orm_product)["name"] == "Bomen en struiken"
+
+    @pytest.mark.parametrize("tiers", ["shared", "both"])
+    def test_team_update(
+        self, request, tiers, orm_product, orm_team, client_with_token, api_client
+    ):
+        if tiers == "both":
+            request.getfixturevalue("listening")
+        get(api_client, orm_product)
+        response = client_with_token([orm_team.scope]).patch(
+            f"/teams/{orm_team.id}", {"po_name": "Iemand anders"}
+        )
+        assert response.status_code == 200, response.data
+
+        assert get(api_client, orm_product)["owner"] == "Iemand anders"
+
+    def test_contracts_are_restricted_after_the_lookup(
+        self, cache, orm_product, orm_team, client_with_token, api_client
+    ):
+        team_product = get(client_with_token([orm_team.scope]), orm_product)
+        public_product = get(api_client, orm_product)
+
+        assert cache.stats.shared_hits == 1
+        assert len(public_product["contracts"]) < len(team_product["contracts"])
+        assert {c["publication_status"] for c in public_product["contracts"]} == {"P"}
+
+    def test_draft_is_not_shown_from_the_cache(
+        self, orm_draft_product, orm_team, client_with_token, api_client
+    ):
+        get(client_with_token([orm_team.scope]), orm_draft_product)
+        response = api_client.get(f"/products/{orm_draft_product.id}")
+        assert response.status_code == 401
+
+    def test_part_from_the_cache(self, cache, orm_product, api_client):
+        get(api_client, orm_product)
+        response = api_client.get(f"/products/{orm_product.id}?include=contracts")
+        assert response.status_code == 200, response.data
+        assert "services" not in response.data
+        assert "distributions" not in response.data["contracts"][0]
+        assert cache.stats.shared_hits == 1
+
+    def test_part_is_not_stored(self, cache, orm_product):
+        repository = ProductRepository()
+        repository.get(orm_product.id, include=set())
+        assert repository.get(orm_product.id).services
+        assert cache.stats.misses == 2
+
+    def test_stored_from_the_primary(self, replicas, orm_product):
+        reads = []
+
+        def load():
+            reads.append(ReplicaRouter().db_for_read(None))
+            return ProductRepository()._load(orm_product.id, None)
+
+        in_read_only_request(lambda: product_cache.get(orm_product.id, load, store=False))
+        # A replica may not have the latest changes, which the cache would keep.
+        in_read_only_request(lambda: product_cache.get(orm_product.id, load))
+        assert reads[0] in replicas
+        assert reads[1] == "default"
+
+    def test_copies(self, orm_product):
+        repository = ProductRepository()
+        repository.get(orm_product.id).name = "Gewijzigd"
+        assert repository.get(orm_product.id).name == "Bomen"
+
+    def test_delete(self, orm_product, orm_draft_product, orm_team, client_with_token):
+        orm_product.sources.add(orm_draft_product)
+        repository = ProductRepository()
+        assert repository.get(orm_product.id).sources == [orm_draft_product.id]
+
+        response = client_with_token([orm_team.scope]).delete(f"/products/{orm_draft_product.id}")
+        assert response.status_code == 204
+        assert repository.get(orm_product.id).sources == []
+
+    def test_lru(self, cache, listening, orm_product, orm_draft_product, settings):
+        settings.PRODUCT_CACHE_SIZE = 1
+        repository = ProductRepository()
+        repository.get(orm_product.id)
+        repository.get(orm_draft_product.id)
+        settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+        repository.get(orm_draft_product.id)
+        repository.get(orm_product.id)
+        assert (cache.stats.local_hits, cache.stats.misses) == (1, 3)
+
+    def test_in_worker_memory_only_while_listening(self, cache, orm_product, settings):
+        settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        repository = ProductRepository()
+        repository.get(orm_product.id)
+        repository.get(orm_product.id)
+        assert (cache.stats.shared_hits, cache.stats.misses) == (0, 0)
+
+    def test_in_worker_memory_changed_by_other_worker(
+        self, cache, listening, orm_product, settings
+    ):
+        settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        settings.PRODUCT_CACHE_SIZE = 0
+        repository = ProductRepository()
+        repository.get(orm_product.id)
+        cache.invalidate(Invalidation(product_ids=frozenset({orm_product.id})))
+        repository.get(orm_product.id)
+        assert (cache.stats.shared_hits, cache.stats.misses) == (0, 2)
+
+    def test_modified_product_is_loaded(self, orm_product, orm_team, client_with_token):
+        repository = ProductRepository()
+        repository.get(orm_product.id)
+        # Added by another worker, after the product was cached.
+        DataContract.objects.create(
+            product=orm_product,
+            publication_status="D",
+            purpose="snoeien van bomen",
+            name="snoeien bomen",
+            privacy_level="NPI",
+            scopes=["bomen_beheer"],
+            confidentiality="I",
+            start_date="2025-01-01",
+            retainment_period=12,
+        )
+
+        response = client_with_token([orm_team.scope]).patch(
+            f"/products/{orm_product.id}", {"name": "Bomen en struiken"}
+        )
+        assert response.status_code == 200, response.data
+        assert orm_product.contracts.filter(name="snoeien bomen").exists()
+
+    def test_loaded_before_eviction(self, cache, listening, orm_product):
+        def load():
+            product = ProductRepository()._load(orm_product.id, None)
+            cache.invalidate(Invalidation(product_ids=frozenset({orm_product.id})))
+            return product
+
+        cache.get(orm_product.id, load)
+        assert orm_product.id not in cache._entries
+
+    def test_disabled(self, cache, orm_product, settings):
+        settings.PRODUCT_CACHE = False
+        ProductRepository().get(orm_product.id)
+        assert cache.stats.misses == 0
+
+    def test_metrics(self, orm_product, api_client):
+        get(api_client, orm_product)
+        with patch.object(instrumentation.logger, "info") as log_info:
+            get(api_client, orm_product)
+        assert log_info.call_args.kwargs["extra"]["product_cache_shared_hits"] == 1
+
+    @pytest.mark.parametrize("listen", [False, True])
+    def test_async(self, request, listen, cache, orm_product):
+        if listen:
+            request.getfixturevalue("listening")
+        repository = ProductRepository()
+        first = async_to_sync(repository.aget)(orm_product.id)
+        assert async_to_sync(repository.aget)(orm_product.id) == first
+        assert cache.stats.misses == 1
+        assert async_to_sync(repository.aget)(orm_product.id, {"services"}).contracts == []
+
+
+class TestSingleFlight:
+    @staticmethod
+    def in_thread(flight: SingleFlight, compute) -> tuple[threading.Thread, list]:
+        results = []
+        thread = threading.Thread(target=lambda: results.append(flight.do("key", compute)))
+        thread.start()
+        return thread, results
+
+    def test_shares_the_computation(self):
+        flight = SingleFlight("test")
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return ["result"]
+
+        leader, leader_results = self.in_thread(flight, compute)
+        assert started.wait(5)
+        follower, follower_results = self.in_thread(flight, compute)
+        time.sleep(0.1)  # for the follower to wait for the leader
+        release.set()
+        leader.join()
+        follower.join()
+
+        assert leader_results == follower_results == [["result"]]
+        assert len(calls) == 1
+        # Done, so the next call computes again.
+        assert flight.do("key", lambda: ["again"]) == ["again"]
+
+    def test_shares_the_exception(self):
+        flight = SingleFlight("test")
+        started, release = threading.Event(), threading.Event()
+
+        def compute():
+            started.set()
+            release.wait(5)
+            raise ValueError("kapot")
+
+        errors = []
+
+        def call():
+            try:
+                flight.do("key", compute)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call)]
+        threads[0].start()
+        assert started.wait(5)
+        threads.append(threading.Thread(target=call))
+        threads[1].start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == 2
+
+    def test_waits_at_most_the_timeout(self, settings):
+        settings.SINGLE_FLIGHT_TIMEOUT = 0
+        flight = SingleFlight("test")
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return "slow"
+
+        leader, _results = self.in_thread(flight, slow)
+        assert started.wait(5)
+        try:
+            assert flight.do("key", lambda: "fast") == "fast"
+        finally:
+            release.set()
+            leader.join()
+
+    def test_shared_between_workers(self, settings):
+        settings.SINGLE_FLIGHT_SHARED = True
+        worker, other_worker = SingleFlight("test"), SingleFlight("test")
+        started, release = threading.Event(), threading.Event()
+
+        def compute():
+            started.set()
+            release.wait(5)
+            return "computed once"
+
+        leader, _results = self.in_thread(worker, compute)
+        assert started.wait(5)
+        threading.Timer(0.2, release.set).start()
+        assert other_worker.do("key", lambda: "computed twice") == "computed once"
+        leader.join()
+
+    def test_not_in_a_transaction(self):
+        flight = SingleFlight("test")
+        with transaction.atomic():
+            assert flight.do("key", lambda: "result") == "result"
+        assert flight._flights == {}
+
+    def test_async(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return "result"
+
+        async def main():
+            return await asyncio.gather(flight.ado("key", compute), flight.ado("key", compute))
+
+        assert async_to_sync(main)() == ["result", "result"]
+        assert len(calls) == 1
+
+    def test_async_exception(self):
+        flight = SingleFlight("test")
+
+        async def compute():
+            await asyncio.sleep(0.1)
+            raise ValueError("kapot")
+
+        async def main():
+            return await asyncio.gather(
+                flight.ado("key", compute), flight.ado("key", compute), return_exceptions=True
+            )
+
+        assert [type(e) for e in async_to_sync(main)()] == [ValueError, ValueError]
+
+    def test_list_key(self):
+        statuses = [PublicationStatus.PUBLISHED]
+        key = ProductRepository._list_key
+        assert key(statuses, query=" bomen  boom", fields=["name", "id"]) == key(
+            statuses, query="bomen boom", fields=["id", "name"]
+        )
+        assert key(statuses, query="bomen", fields=None) != key(
+            [*statuses, PublicationStatus.INTERNALLY_PUBLISHED], query="bomen", fields=None
+        )
+
+    def test_product_list(self, orm_product, api_client):
+        response = api_client.get("/products?q=bomen")
+        assert [product["id"] for product in response.data["results"]] == [orm_product.id]
+
+
+def join_refreshes(lists: StaleWhileRevalidate):
+    for refresh in list(lists._refreshing.values()):
+        refresh.join(5)
+
+
+class Counter:
+    """A computation that returns how often it was done."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self) -> int:
+        self.calls += 1
+        return self.calls
+
+
+class TestStaleWhileRevalidate:
+    def test_fresh(self):
+        lists, compute = StaleWhileRevalidate("test"), Counter()
+        assert lists.get("key", 60, compute) == 1
+        assert lists.get("key", 60, compute) == 1
+
+    def test_expired(self):
+        lists, compute = StaleWhileRevalidate("test"), Counter()
+        assert lists.get("key", 0, compute) == 1
+        assert lists.get("key", 0, compute) == 1
+        join_refreshes(lists)
+        assert lists.get("key", 0, compute) == 2
+
+    def test_too_stale(self, settings):
+        settings.PRODUCT_LIST_MAX_STALENESS = 0
+        lists, compute = StaleWhileRevalidate("test"), Counter()
+        lists.get("key", 0, compute)
+        assert lists.get("key", 0, compute) == 2
+
+    def test_changed(self):
+        lists, compute = StaleWhileRevalidate("test"), Counter()
+        lists.get("key", 60, compute)
+        lists.invalidate(Invalidation(product_ids=frozenset({1}), local=True))
+        assert lists.get("key", 60, compute) == 1
+        join_refreshes(lists)
+        assert lists.get("key", 60, compute) == 2
+
+    def test_published(self):
+        lists, compute = StaleWhileRevalidate("test"), Counter()
+        lists.get("key", 60, compute)
+        lists.invalidate(Invalidation(product_ids=frozenset({1}), published=True, local=True))
+        assert lists.get("key", 60, compute) == 2
+
+    def test_changed_by_other_worker(self):
+        lists, compute = StaleWhileRevalidate("test"), Counter()
+        lists.get("key", 60, compute)
+        # That worker changed the version already.
+        lists.invalidate(Invalidation(product_ids=frozenset({1})))
+        assert lists.get("key", 60, compute) == 1
+
+    def test_published_by_other_worker(self):
+        lists, compute = StaleWhileRevalidate("test"), Counter()
+        lists.get("key", 60, compute)
+        lists.invalidate(Invalidation(product_ids=frozenset({1}), published=True))
+        assert lists.get("key", 60, compute) == 2
+
+    def test_in_worker_memory(self, listening, settings):
+        settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        lists, compute = StaleWhileRevalidate("test"), Counter()
+        lists.get("key", 60, compute)
+        lists.invalidate(Invalidation(product_ids=frozenset({1})))
+        assert lists.get("key", 60, compute) == 1
+        join_refreshes(lists)
+        assert lists.get("key", 60, compute) == 2
+
+    def test_in_worker_memory_only_while_listening(self, settings):
+        settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+        lists, compute = StaleWhileRevalidate("test"), Counter()
+        lists.get("key", 60, compute)
+        assert lists.get("key", 60, compute) == 2
+
+    def test_computed_from_the_primary(self, replicas):
+        lists = StaleWhileRevalidate("test")
+
+        def compute():
+            return ReplicaRouter().db_for_read(None)
+
+        assert in_read_only_request(lambda: lists.get("key", 0, compute)) == "default"
+        assert in_read_only_request(compute) in replicas
+
+    def test_failed_refresh(self, caplog):
+        lists = StaleWhileRevalidate("test")
+        lists.get("key", 0, lambda: "stale")
+
+        def fail():
+            raise ValueError("kapot")
+
+        assert lists.get("key", 0, fail) == "stale"
+        join_refreshes(lists)
+        assert "Refresh of test failed" in caplog.text
+        assert lists._refreshing == {}
+
+    def test_async(self):
+        lists, compute = StaleWhileRevalidate("test"), Counter()
+
+        async def acompute():
+            return compute()
+
+        async def main():
+            assert await lists.aget("key", 0, acompute) == 1
+            assert await lists.aget("key", 0, acompute) == 1
+            await asyncio.gather(*lists._refreshing.values())
+            return await lists.aget("key", 0, acompute)
+
+        assert async_to_sync(main)() == 2
+
+    def test_product_lists(self, orm_product, orm_draft_product, orm_team, client_with_token):
+        client = client_with_token([orm_team.scope])
+
+        def names():
+            return {product["name"] for product in client.get("/products").data["results"]}
+
+        assert names() == {"Bomen"}
+        response = client.patch(f"/products/{orm_product.id}", {"name": "Bomen en struiken"})
+        assert response.status_code == 200, response.data
+        # Served while it's refreshed.
+        assert names() == {"Bomen"}
+        join_refreshes(product_list_cache)
+        assert names() == {"Bomen en struiken"}
+
+        response = client.post(
+            f"/products/{orm_draft_product.id}/set-state", {"publication_status": "P"}
+        )
+        assert response.status_code == 200, response.data
+        assert names() == {"Bomen en struiken", orm_draft_product.name}
+
+    @pytest.mark.parametrize(
+        "previous_status,status,changes",
+        [
+            (None, "D", False),
+            ("D", "P", True),
+            ("P", "P", False),
+            ("I", "X", True),
+            ("P", None, True),
+        ],
+    )
+    def test_changes_listings(self, previous_status, status, changes):
+        assert ProductRepository._changes_listings(previous_status, status) is changes
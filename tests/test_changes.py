@@ -0,0 +1,148 @@
+import pytest
+from django.conf import settings
+
+from beheeromgeving.models import Change
+
+
+def events(response) -> list[tuple]:
+    return [
+        (change["event"], change["object_type"], change["contract_id"])
+        for change in response.data["changes"]
+    ]
+
+
+@pytest.mark.django_db
+class TestChanges:
+    def test_no_changes(self, orm_product, api_client):
+        response = api_client.get("/changes")
+        assert response.status_code == 200
+        assert response.data == {"changes": [], "cursor": 0, "has_more": False}
+
+    def test_update(self, orm_product, orm_team, client_with_token, api_client):
+        response = client_with_token([orm_team.scope]).patch(
+            f"/products/{orm_product.id}", {"name": "Bomen en struiken"}
+        )
+        assert response.status_code == 200, response.data
+
+        response = api_client.get("/changes")
+        assert events(response) == [("update", "product", None)]
+        change = response.data["changes"][0]
+        assert change["product_id"] == orm_product.id
+        assert change["publication_status"] == change["previous_publication_status"] == "P"
+        assert response.data["cursor"] == change["id"]
+
+    def test_contract_update(self, orm_product, orm_team, client_with_token, api_client):
+        contract = orm_product.contracts.get(publication_status="P")
+        response = client_with_token([orm_team.scope]).patch(
+            f"/products/{orm_product.id}/contracts/{contract.id}", {"purpose": "snoeien"}
+        )
+        assert response.status_code == 200, response.data
+
+        response = api_client.get("/changes")
+        assert events(response) == [
+            ("update", "product", None),
+            ("update", "contract", contract.id),
+        ]
+
+    def test_contract_of_unpublished_product(
+        self, orm_draft_product, orm_team, client_with_token, api_client
+    ):
+        contract = orm_draft_product.contracts.get()
+        contract.publication_status = "P"
+        contract.save()
+        response = client_with_token([orm_team.scope]).patch(
+            f"/products/{orm_draft_product.id}/contracts/{contract.id}", {"purpose": "snoeien"}
+        )
+        assert response.status_code == 200, response.data
+
+        change = Change.objects.get(contract_id=contract.id)
+        assert change.publication_status == "P"
+        assert change.product_publication_status == "D"
+        # The published contract doesn't reveal its draft product.
+        assert api_client.get("/changes").data["changes"] == []
+
+    def test_publish(self, orm_draft_product, orm_team, client_with_token, api_client):
+        response = client_with_token([orm_team.scope]).post(
+            f"/products/{orm_draft_product.id}/set-state", {"publication_status": "P"}
+        )
+        assert response.status_code == 200, response.data
+
+        response = api_client.get("/changes")
+        assert events(response)[0] == ("publish", "product", None)
+        assert response.data["changes"][0]["previous_publication_status"] == "D"
+
+    def test_create_is_not_visible_as_draft(self, orm_team, client_with_token):
+        client = client_with_token([orm_team.scope])
+        response = client.post("/products", {"type": "D", "team_id": orm_team.id})
+        assert response.status_code == 201, response.data
+
+        assert Change.objects.get(product_id=response.data["id"]).event == "create"
+        assert client.get("/changes").data["changes"] == []
+
+    def test_soft_delete(self, orm_product, orm_team, client_with_token, api_client):
+        response = client_with_token([orm_team.scope]).delete(f"/products/{orm_product.id}")
+        assert response.status_code == 204
+
+        response = api_client.get("/changes")
+        assert events(response)[0] == ("delete", "product", None)
+
+    def test_hard_delete(self, orm_draft_product, orm_team, client_with_token):
+        contract = orm_draft_product.contracts.get()
+        response = client_with_token([orm_team.scope]).delete(f"/products/{orm_draft_product.id}")
+        assert response.status_code == 204
+
+        changes = Change.objects.filter(product_id=orm_draft_product.id).order_by("pk")
+        assert [(change.event, change.contract_id) for change in changes] == [
+            ("delete", None),
+            ("delete", contract.id),
+        ]
+
+    def test_team_delete(self, orm_product, orm_team, client_with_token, api_client):
+        contract_ids = set(orm_product.contracts.values_list("id", flat=True))
+        published_contract = orm_product.contracts.get(publication_status="P")
+        response = client_with_token([settings.ADMIN_ROLE_NAME]).delete(f"/teams/{orm_team.id}")
+        assert response.status_code == 204
+
+        product_change, *contract_changes = Change.objects.filter(
+            product_id=orm_product.id
+        ).order_by("pk")
+        assert (product_change.event, product_change.contract_id) == ("delete", None)
+        assert {change.event for change in contract_changes} == {"delete"}
+        assert {change.contract_id for change in contract_changes} == contract_ids
+
+        # Its draft contract was never in the feed.
+        response = api_client.get("/changes")
+        assert events(response) == [
+            ("delete", "product", None),
+            ("delete", "contract", published_contract.id),
+        ]
+
+    def test_internal_changes_are_for_employees(
+        self, orm_information_product, orm_team, client_with_token, api_client
+    ):
+        response = client_with_token([orm_team.scope]).patch(
+            f"/products/{orm_information_product.id}", {"name": "Rapportage bomen"}
+        )
+        assert response.status_code == 200, response.data
+
+        assert api_client.get("/changes").data["changes"] == []
+        response = client_with_token([settings.EMPLOYEE_ROLE_NAME]).get("/changes")
+        assert events(response) == [("update", "product", None)]
+
+    def test_pages(self, orm_product, orm_team, client_with_token, api_client):
+        client = client_with_token([orm_team.scope])
+        for name in ("Bomen 1", "Bomen 2", "Bomen 3"):
+            client.patch(f"/products/{orm_product.id}", {"name": name})
+
+        first = api_client.get("/changes?limit=2").data
+        assert len(first["changes"]) == 2
+        assert first["has_more"] is True
+        second = api_client.get(f"/changes?since={first['cursor']}&limit=2").data
+        assert len(second["changes"]) == 1
+        assert second["has_more"] is False
+        assert second["changes"][0]["id"] > first["cursor"]
+
+    @pytest.mark.parametrize("query", ["since=-1", "limit=0", "limit=1001", "since=x"])
+    def test_invalid_parameters(self, api_client, query):
+        response = api_client.get(f"/changes?{query}")
+        assert response.status_code == 400
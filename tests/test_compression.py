@@ -0,0 +1,136 @@
+import gzip
+import os
+from compression import zstd
+from dataclasses import replace
+
+import brotli
+import pytest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from api.openapi import views
+from beheeromgeving import compression
+from beheeromgeving.compression import CompressionMiddleware, negotiate
+
+DECOMPRESS = {"gzip": gzip.decompress, "zstd": zstd.decompress, "br": brotli.decompress}
+
+
+@pytest.fixture(autouse=True)
+def encodings(settings):
+    settings.COMPRESSION_ENCODINGS = ["zstd", "br", "gzip"]
+
+
+def middleware(response: HttpResponse, accept_encoding: str) -> HttpResponse:
+    request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,expected",
+    [
+        ("gzip", "gzip"),
+        ("gzip, deflate, br, zstd", "zstd"),
+        ("gzip, deflate, br", "br"),
+        ("GZIP", "gzip"),
+        ("zstd;q=0.5, gzip", "gzip"),
+        ("gzip;q=0.8, zstd;q=0.9", "zstd"),
+        ("*", "zstd"),
+        ("zstd;q=0, *", "br"),
+        ("zstd;q=0, br;q=0, *", "gzip"),
+        ("gzip;q=nope", None),
+        ("deflate, identity", None),
+        ("", None),
+    ],
+)
+def test_negotiate(accept_encoding, expected):
+    encoding = negotiate(accept_encoding)
+    assert (encoding.name if encoding else None) == expected
+
+
+def test_negotiate_only_configured(settings):
+    settings.COMPRESSION_ENCODINGS = ["gzip"]
+    assert negotiate("zstd") is None
+    assert negotiate("zstd, gzip").name == "gzip"
+
+
+@pytest.mark.parametrize("name", ["gzip", "zstd", "br"])
+def test_middleware(name):
+    content = b'{"name": "Bomen"}' * 100
+    response = middleware(HttpResponse(content, headers={"ETag": '"abc"'}), name)
+    assert response["Content-Encoding"] == name
+    assert response["Vary"] == "Accept-Encoding"
+    assert response["ETag"] == 'W/"abc"'
+    assert int(response["Content-Length"]) == len(response.content)
+    assert DECOMPRESS[name](response.content) == content
+
+
+@pytest.mark.parametrize("name", ["gzip", "zstd", "br"])
+def test_middleware_streaming(name):
+    chunks = [b'{"name": "Bomen"}' * 50, b'{"name": "Struiken"}' * 50]
+    response = middleware(StreamingHttpResponse(iter(chunks)), name)
+    assert response["Content-Encoding"] == name
+    assert not response.has_header("Content-Length")
+    assert DECOMPRESS[name](b"".join(response.streaming_content)) == b"".join(chunks)
+
+
+def test_middleware_leaves_alone():
+    short = middleware(HttpResponse(b"kort"), "gzip")
+    assert not short.has_header("Content-Encoding")
+
+    incompressible = os.urandom(1000)
+    response = middleware(HttpResponse(incompressible), "gzip")
+    assert not response.has_header("Content-Encoding")
+    assert response.content == incompressible
+
+    encoded = HttpResponse(b"x" * 1000, headers={"Content-Encoding": "gzip"})
+    assert middleware(encoded, "zstd").content == b"x" * 1000
+
+    identity = middleware(HttpResponse(b"x" * 1000), "")
+    assert not identity.has_header("Content-Encoding")
+    assert identity["Vary"] == "Accept-Encoding"
+
+
+@pytest.mark.django_db
+def test_product_list(orm_product, api_client):
+    plain = api_client.get("/products")
+    response = api_client.get("/products", HTTP_ACCEPT_ENCODING="zstd")
+    assert response["Content-Encoding"] == "zstd"
+    assert zstd.decompress(response.content) == plain.content
+
+
+class TestSchema:
+    @pytest.fixture(autouse=True)
+    def clear_schema_cache(self):
+        views._schemas.clear()
+        yield
+        views._schemas.clear()
+
+    def test_compressed_once(self, api_client, monkeypatch):
+        plain = api_client.get("/openapi.json")
+        assert not plain.has_header("Content-Encoding")
+        assert "Accept-Encoding" in plain["Vary"]
+
+        compressed = []
+        encoding = compression.ENCODINGS["zstd"]
+
+        def compress(data, level):
+            compressed.append(level)
+            return zstd.compress(data, level)
+
+        monkeypatch.setitem(compression.ENCODINGS, "zstd", replace(encoding, compress=compress))
+        first = api_client.get("/openapi.json", HTTP_ACCEPT_ENCODING="zstd, gzip")
+        second = api_client.get("/openapi.json", HTTP_ACCEPT_ENCODING="zstd")
+        assert compressed == [encoding.cached_level]
+        assert first["Content-Encoding"] == second["Content-Encoding"] == "zstd"
+        assert first.content == second.content
+        assert zstd.decompress(first.content) == plain.content
+        assert first["ETag"] == "W/" + plain["ETag"]
+
+    def test_etag(self, api_client):
+        response = api_client.get("/openapi.json", HTTP_ACCEPT_ENCODING="gzip")
+        assert response["Content-Encoding"] == "gzip"
+
+        not_modified = api_client.get(
+            "/openapi.json", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+        assert not_modified.status_code == 304
@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from beheeromgeving.container import (
+    Container,
+    Services,
+    ServicesMiddleware,
+    build_services,
+    container,
+)
+from domain.auth import AuthorizationService
+from domain.base import AbstractAuthRepository
+from domain.exceptions import NotAuthorized
+from domain.team import TeamService
+
+
+class AuthRepo(AbstractAuthRepository):
+    admin_role = "admin"
+    employee_role = "employee"
+
+    def __init__(self, feature_enabled: bool):
+        self.feature_enabled = feature_enabled
+
+    def can_access_team(self, team_id, scopes):
+        return False
+
+    def can_access_product(self, product_id, scopes):
+        return False
+
+    def can_access_product_name(self, name, scopes):
+        return False
+
+
+def test_services_are_built_on_startup():
+    assert container._services is not None
+    assert container.services.products.auth is container.services.auth
+    assert container.services.teams.auth is container.services.auth
+
+
+def test_services_are_built_once():
+    calls = []
+    start = threading.Barrier(16)
+
+    def factory() -> Services:
+        calls.append(1)
+        time.sleep(0.01)  # let the other threads run into the lock
+        return build_services()
+
+    shared = Container(factory)
+
+    def get() -> Services:
+        start.wait()
+        return shared.services
+
+    with ThreadPoolExecutor(16) as pool:
+        results = list(pool.map(lambda _: get(), range(16)))
+
+    assert len(calls) == 1
+    assert all(services is results[0] for services in results)
+
+
+def test_middleware_gives_requests_the_services():
+    def view(request):
+        assert request.services is container.services
+        return HttpResponse()
+
+    assert ServicesMiddleware(view)(RequestFactory().get("/teams")).status_code == 200
+
+
+def test_services_use_their_own_authorization():
+    repo = Mock()
+    admin_only = TeamService(repo, auth=AuthorizationService(AuthRepo(feature_enabled=True)))
+    open_access = TeamService(repo, auth=AuthorizationService(AuthRepo(feature_enabled=False)))
+
+    with pytest.raises(NotAuthorized):
+        admin_only.delete_team(1, scopes=["employee"])
+    assert admin_only.delete_team(1, scopes=["admin"]) == repo.delete.return_value
+    assert open_access.delete_team(1, scopes=["employee"]) == repo.delete.return_value
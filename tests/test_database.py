@@ -0,0 +1,65 @@
+from unittest.mock import MagicMock, PropertyMock, patch
+
+import psycopg
+import pytest
+from django.db import connection, connections
+
+from beheeromgeving import instrumentation
+from beheeromgeving.postgresql.base import DatabaseWrapper, password_file_connection
+
+
+@pytest.fixture()
+def password_file(tmp_path):
+    path = tmp_path / "token"
+    path.write_text("first-token")
+    return path
+
+
+def settings_dict(**extra):
+    return {**connection.settings_dict, "OPTIONS": {}, **extra}
+
+
+def test_password_is_read_for_every_connection(password_file):
+    wrapper = DatabaseWrapper(settings_dict(PASSWORD_FILE=str(password_file)))
+    assert wrapper.get_connection_params()["password"] == "first-token"
+    password_file.write_text("refreshed-token")
+    assert wrapper.get_connection_params()["password"] == "refreshed-token"
+
+
+def test_pool_reads_the_password_on_connect(password_file):
+    wrapper = DatabaseWrapper(
+        settings_dict(PASSWORD_FILE=str(password_file), OPTIONS={"pool": {"max_size": 2}})
+    )
+    pool_options = wrapper.settings_dict["OPTIONS"]["pool"]
+    assert pool_options["max_size"] == 2
+    assert pool_options["connection_class"] is password_file_connection(str(password_file))
+
+    with patch.object(psycopg.Connection, "connect") as connect:
+        pool_options["connection_class"].connect("", dbname="catalogus")
+    assert connect.call_args.kwargs == {"dbname": "catalogus", "password": "first-token"}
+
+
+def test_no_password_file():
+    wrapper = DatabaseWrapper(settings_dict(OPTIONS={"pool": True}))
+    assert wrapper.settings_dict["OPTIONS"]["pool"] is True
+    password = wrapper.get_connection_params().get("password")
+    assert password == (connection.settings_dict["PASSWORD"] or None)
+
+
+def test_pool_metrics_without_pool():
+    assert instrumentation.pool_metrics() == {}
+
+
+def test_pool_metrics_are_logged(api_client):
+    pool = MagicMock()
+    pool.get_stats.return_value = {"pool_size": 4, "pool_available": 1, "requests_waiting": 2}
+    wrapper_class = type(connections["default"])
+    with (
+        patch.object(wrapper_class, "pool", new_callable=PropertyMock, return_value=pool),
+        patch.object(instrumentation.logger, "info") as log_info,
+    ):
+        api_client.get("/pulse")
+    extra = log_info.call_args.kwargs["extra"]
+    assert extra["db_pool_in_use"] == 3
+    assert extra["db_pool_available"] == 1
+    assert extra["db_pool_waiting"] == 2
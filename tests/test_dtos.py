@@ -1,9 +1,23 @@
+import base64
+import warnings
+from types import SimpleNamespace
+
 import pytest
 from django.http import QueryDict
-from pydantic import ValidationError
+from pydantic import BaseModel, ValidationError
 
-from api.datatransferobjects import ProductCreate, ProductQueryParams, ProductUpdate
-from domain.product import enums
+from api.datatransferobjects import (
+    ModelMixin,
+    MyProduct,
+    ProductCreate,
+    ProductDetail,
+    ProductList,
+    ProductQueryParams,
+    ProductUpdate,
+    construct,
+    to_response_object,
+)
+from domain.product import ProductRepository, enums
 
 
 class TestQueryParams:
@@ -120,3 +134,74 @@ class TestProductDTOValidation:
             ProductUpdate(
                 access_url="https://example.com/report", type=enums.ProductType.DATAPRODUCT
             )
+
+
+@pytest.mark.django_db
+class TestToResponseObject:
+    @pytest.mark.parametrize(
+        "dto_type,dto_model",
+        [("detail", ProductDetail), ("list", ProductList), ("me", MyProduct)],
+    )
+    def test_trusted_construction_matches_validation(self, orm_product, dto_type, dto_model):
+        product = ProductRepository().get(orm_product.id)
+
+        expected = dto_model.model_validate(product).model_dump()
+        assert to_response_object(product, dto_type=dto_type) == expected
+        assert to_response_object([product], dto_type=dto_type) == [expected]
+
+    def test_construct_does_not_validate(self, orm_product):
+        product = ProductRepository().get(orm_product.id)
+        product.name = "X"  # Too short for ProductDetail.name
+
+        dto = construct(ProductDetail, product)
+        assert dto.name == "X"
+        assert dto.contracts is not None
+        assert dto.contracts[0].distributions is not None
+        assert dto.revision_url is None
+
+    def test_construct_applies_field_validators(self, orm_product):
+        product = ProductRepository().get(orm_product.id)
+        product.description = base64.b64encode(b"Bomen *in* Amsterdam").decode()
+        product.contracts[0].purpose = base64.b64encode(b"Onderhoud").decode()
+
+        data = to_response_object(product)
+        assert data["description"] == "Bomen *in* Amsterdam"
+        assert data["contracts"][0]["purpose"] == "Onderhoud"
+        assert data == ProductDetail.model_validate(product).model_dump()
+
+    def test_construct_casts_to_id(self, orm_product):
+        class Link(ModelMixin, BaseModel):
+            sinks: int
+
+        product = ProductRepository().get(orm_product.id)
+        assert construct(Link, SimpleNamespace(sinks=product)).sinks == orm_product.id
+
+    def test_construct_converts_to_enums(self):
+        source = SimpleNamespace(
+            id=1,
+            publication_status="P",
+            themes=["B"],
+            summary={"services": ["REST"], "distributions": ["F"]},
+            contract_count=0,
+            team_id=1,
+        )
+
+        dto = construct(ProductList, source)
+        assert dto.publication_status is enums.PublicationStatus.PUBLISHED
+        assert dto.themes == [enums.Theme.BESTUUR]
+        assert dto.summary == {
+            "services": [enums.DataServiceType.REST],
+            "distributions": [enums.DistributionType.FILE],
+        }
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            assert dto.model_dump()["publication_status"] == "P"
+
+    def test_from_django_converts_to_enums(self, orm_product):
+        orm_product.publication_status = "P"
+
+        dto = MyProduct.from_django(orm_product)
+        assert dto.publication_status is enums.PublicationStatus.PUBLISHED
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            dto.model_dump()
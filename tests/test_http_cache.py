@@ -0,0 +1,182 @@
+import pytest
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+
+from beheeromgeving import http_cache
+from beheeromgeving.http_cache import (
+    SURROGATE_KEY_HEADER,
+    HttpCacheMiddleware,
+    http_purge,
+    keys_to_purge,
+    on_purge,
+)
+from beheeromgeving.invalidation import Invalidation
+
+
+@pytest.fixture()
+def proxy(recording_server, settings):
+    """A local stand-in for a Varnish (with xkey)."""
+    server = recording_server("PURGE")
+    settings.HTTP_CACHE_PURGE_URL = server.url
+    return server
+
+
+@pytest.fixture()
+def purged():
+    """The sets of keys that are purged."""
+    keys: list[set[str]] = []
+    on_purge(keys.append)
+    yield keys
+    http_cache._purgers.remove(keys.append)
+
+
+def surrogate_keys(response) -> set[str]:
+    return set(response[SURROGATE_KEY_HEADER].split())
+
+
+@pytest.mark.django_db
+class TestHeaders:
+    def test_product(self, orm_product, orm_team, api_client):
+        response = api_client.get(f"/products/{orm_product.id}")
+        assert response.status_code == 200
+        assert response["Cache-Control"] == "public, max-age=0, s-maxage=60"
+        assert "Authorization" in response["Vary"]
+        contract = orm_product.contracts.get(publication_status="P")
+        assert {
+            f"product-{orm_product.id}",
+            f"team-{orm_team.id}",
+            f"contract-{contract.id}",
+        } <= surrogate_keys(response)
+
+    def test_product_list(self, orm_product, api_client):
+        response = api_client.get("/products")
+        assert {"products", f"product-{orm_product.id}"} <= surrogate_keys(response)
+
+    def test_teams(self, orm_team, api_client):
+        response = api_client.get("/teams")
+        assert surrogate_keys(response) == {"teams", f"team-{orm_team.id}"}
+        response = api_client.get(f"/teams/{orm_team.id}")
+        assert surrogate_keys(response) == {f"team-{orm_team.id}"}
+
+    def test_authenticated(self, orm_product, orm_team, client_with_token):
+        response = client_with_token([orm_team.scope]).get(f"/products/{orm_product.id}")
+        assert response.status_code == 200
+        assert response["Cache-Control"] == "private"
+        assert SURROGATE_KEY_HEADER not in response
+        assert "Authorization" in response["Vary"]
+
+    def test_not_found(self, api_client):
+        response = api_client.get("/products/999")
+        assert response.status_code == 404
+        assert "Cache-Control" not in response
+
+    def test_untagged(self, api_client):
+        response = api_client.get("/changes")
+        assert response.status_code == 200
+        assert "Cache-Control" not in response
+
+    def test_cache_control_of_the_view(self, api_client):
+        response = api_client.get("/openapi.json")
+        assert "no-cache" in response["Cache-Control"]
+        assert SURROGATE_KEY_HEADER not in response
+
+    def test_mutation(self, orm_product, orm_team, client_with_token):
+        response = client_with_token([orm_team.scope]).patch(
+            f"/products/{orm_product.id}", {"name": "Bomen en struiken"}
+        )
+        assert response.status_code == 200
+        assert "Cache-Control" not in response
+
+    def test_disabled(self, settings):
+        settings.HTTP_CACHE_MAX_AGE = 0
+        with pytest.raises(MiddlewareNotUsed):
+            HttpCacheMiddleware(lambda request: HttpResponse())
+
+
+@pytest.mark.django_db
+class TestPurge:
+    def test_update(
+        self, orm_product, orm_team, client_with_token, purged, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client_with_token([orm_team.scope]).patch(
+                f"/products/{orm_product.id}", {"name": "Bomen en struiken"}
+            )
+        assert response.status_code == 200, response.data
+        assert purged == [{f"product-{orm_product.id}"}]
+
+    def test_publish(
+        self,
+        orm_draft_product,
+        orm_team,
+        client_with_token,
+        purged,
+        django_capture_on_commit_callbacks,
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client_with_token([orm_team.scope]).post(
+                f"/products/{orm_draft_product.id}/set-state", {"publication_status": "P"}
+            )
+        assert response.status_code == 200, response.data
+        assert {"products", "teams", f"product-{orm_draft_product.id}"} <= set().union(*purged)
+
+    def test_delete(
+        self, orm_product, orm_team, client_with_token, purged, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client_with_token([orm_team.scope]).delete(f"/products/{orm_product.id}")
+        assert response.status_code == 204
+        assert {"products", f"product-{orm_product.id}"} <= set().union(*purged)
+
+    def test_team_update(
+        self, orm_team, client_with_token, purged, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client_with_token([orm_team.scope]).patch(
+                f"/teams/{orm_team.id}", {"po_name": "Iemand anders"}
+            )
+        assert response.status_code == 200, response.data
+        assert purged == [{"teams", f"team-{orm_team.id}"}]
+
+    def test_only_by_the_worker_that_changed_it(self, purged):
+        http_cache.purge(Invalidation(product_ids=frozenset({1})))
+        assert purged == []
+
+    def test_failing_purger(self, purged, caplog):
+        def failing(keys):
+            raise ValueError("kapot")
+
+        on_purge(failing)
+        try:
+            http_cache.purge(Invalidation(product_ids=frozenset({1}), local=True))
+        finally:
+            http_cache._purgers.remove(failing)
+        assert "Purging product-1" in caplog.text
+        assert purged == [{"product-1"}]
+
+    def test_http_purge(self, proxy):
+        http_purge({"product-1", "team-2"})
+        [(headers, _)] = proxy.received
+        assert headers[SURROGATE_KEY_HEADER] == "product-1 team-2"
+
+    def test_no_purge_url(self, settings):
+        settings.HTTP_CACHE_PURGE_URL = ""
+        http_purge({"product-1"})
+
+
+@pytest.mark.parametrize(
+    "invalidation,keys",
+    [
+        (
+            Invalidation(product_ids=frozenset({1}), team_ids=frozenset({2})),
+            {"product-1"},
+        ),
+        (
+            Invalidation(product_ids=frozenset({1}), team_ids=frozenset({2}), published=True),
+            {"product-1", "team-2", "products", "teams"},
+        ),
+        (Invalidation(team_ids=frozenset({2})), {"team-2", "teams"}),
+    ],
+)
+def test_keys_to_purge(invalidation, keys):
+    assert keys_to_purge(invalidation) == keys
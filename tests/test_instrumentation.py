@@ -0,0 +1,80 @@
+from unittest.mock import patch
+
+import pytest
+
+from beheeromgeving import instrumentation
+
+
+def parse_server_timing(header: str) -> dict[str, str]:
+    return {metric.split(";")[0]: metric for metric in header.split(", ")}
+
+
+def test_timed_outside_request():
+    with instrumentation.timed("serialization"):
+        assert instrumentation.current_metrics() is None
+
+
+@pytest.mark.django_db
+class TestRequestMetricsMiddleware:
+    def test_server_timing(self, orm_product, api_client, settings):
+        settings.SERVER_TIMING = True
+        response = api_client.get("/products")
+        assert response.status_code == 200
+        timings = parse_server_timing(response["Server-Timing"])
+        assert {"db", "serialization", "token", "total"} <= timings.keys()
+        assert 'desc="' in timings["db"]
+        assert "queries" in timings["db"]
+
+    def test_server_timing_token_and_authorization(
+        self, orm_team, orm_product, client_with_token, settings
+    ):
+        settings.SERVER_TIMING = True
+        response = client_with_token([orm_team.scope]).patch(
+            f"/products/{orm_product.id}", data={"name": "Bomen"}
+        )
+        assert response.status_code == 200
+        timings = parse_server_timing(response["Server-Timing"])
+        assert {"token", "authorization"} <= timings.keys()
+        durations = {
+            name: float(metric.split(";")[1].removeprefix("dur="))
+            for name, metric in timings.items()
+        }
+        # The token is timed until the view is called, not the whole request.
+        assert durations["token"] + durations["authorization"] < durations["total"]
+
+    def test_server_timing_counts_queries(
+        self, orm_product, api_client, settings, django_assert_num_queries
+    ):
+        settings.SERVER_TIMING = True
+        with django_assert_num_queries(1):
+            response = api_client.get("/products?fields=name")
+        assert 'desc="1 queries"' in response["Server-Timing"]
+
+    def test_no_server_timing_for_anonymous_users(self, orm_product, api_client, settings):
+        settings.SERVER_TIMING = False
+        response = api_client.get("/products")
+        assert response.status_code == 200
+        assert "Server-Timing" not in response
+
+    def test_server_timing_for_admins(self, orm_product, client_with_token, settings):
+        settings.SERVER_TIMING = False
+        response = client_with_token([settings.ADMIN_ROLE_NAME]).get("/products")
+        assert response.status_code == 200
+        assert "db" in parse_server_timing(response["Server-Timing"])
+
+    def test_metrics_are_logged(self, orm_product, api_client):
+        with patch.object(instrumentation.logger, "info") as log_info:
+            api_client.get(f"/products/{orm_product.id}")
+        extra = log_info.call_args.kwargs["extra"]
+        assert extra["path"] == f"/products/{orm_product.id}"
+        assert extra["status_code"] == 200
+        assert extra["sql_count"] > 0
+        assert extra["total_ms"] >= extra["db_ms"]
+
+    def test_metrics_are_set_on_the_span(self, orm_product, api_client):
+        with patch.object(instrumentation.trace, "get_current_span") as get_current_span:
+            get_current_span.return_value.is_recording.return_value = True
+            api_client.get("/products")
+        span = get_current_span.return_value
+        attributes = {call.args[0] for call in span.set_attribute.call_args_list}
+        assert {"app.db.query_count", "app.db.duration_ms", "app.total.duration_ms"} <= attributes
@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.wsgi import get_wsgi_application
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from beheeromgeving import bootstrap, invalidation
+from beheeromgeving.invalidation import (
+    Invalidation,
+    InvalidationMiddleware,
+    Listener,
+    notify,
+    on_invalidate,
+)
+
+
+@pytest.fixture()
+def received():
+    """The invalidations that reach the handlers, with the thread they were handled on."""
+    invalidations: list[tuple[Invalidation, str]] = []
+
+    def handler(invalidation: Invalidation):
+        invalidations.append((invalidation, threading.current_thread().name))
+
+    on_invalidate(handler)
+    yield invalidations
+    invalidation._handlers.remove(handler)
+
+
+def test_payload():
+    sent = Invalidation(product_ids=frozenset({2, 1}), team_ids=frozenset({3}))
+    assert sent.to_payload() == '{"products": [1, 2], "teams": [3]}'
+    assert Invalidation.from_payload(sent.to_payload()) == sent
+
+
+@pytest.mark.django_db
+class TestNotify:
+    def test_product_change(
+        self,
+        orm_product,
+        orm_team,
+        client_with_token,
+        received,
+        django_capture_on_commit_callbacks,
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client_with_token([orm_team.scope]).patch(
+                f"/products/{orm_product.id}", {"name": "Bomen en struiken"}
+            )
+        assert response.status_code == 200, response.data
+
+        [(invalidation, _thread)] = received
+        assert invalidation.product_ids == {orm_product.id}
+        assert invalidation.team_ids == {orm_team.id}
+
+    def test_team_change(
+        self, orm_team, client_with_token, received, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = client_with_token([orm_team.scope]).patch(
+                f"/teams/{orm_team.id}", {"po_name": "Iemand anders"}
+            )
+        assert response.status_code == 200, response.data
+
+        [(invalidation, _thread)] = received
+        assert invalidation == Invalidation(team_ids=frozenset({orm_team.id}))
+
+    def test_only_after_commit(self, received, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks() as callbacks:
+            notify(product_ids=[1])
+        assert received == []
+        assert len(callbacks) == 1
+
+    def test_nothing_to_notify(self, received, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            notify(product_ids=[None])
+
+    def test_failing_handler(self, received, caplog, django_capture_on_commit_callbacks):
+        def failing(invalidation: Invalidation):
+            raise ValueError("kapot")
+
+        on_invalidate(failing)
+        try:
+            with django_capture_on_commit_callbacks(execute=True), caplog.at_level(logging.ERROR):
+                notify(team_ids=[1])
+        finally:
+            invalidation._handlers.remove(failing)
+        assert "handler" in caplog.text
+        assert len(received) == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_listener(received, monkeypatch):
+    monkeypatch.setattr(invalidation, "POLL_TIMEOUT", 0.1)
+    listener = Listener()
+    listener.ensure_running()
+    try:
+        assert listener.listening.wait(10)
+        # Once listening, what may have been missed before is invalidated.
+        assert received == [(Invalidation(everything=True), "cache-invalidation")]
+
+        notify(product_ids=[1], team_ids=[2])
+
+        expected = (
+            Invalidation(product_ids=frozenset({1}), team_ids=frozenset({2})),
+            "cache-invalidation",
+        )
+        for _ in range(100):
+            if expected in received:
+                break
+            time.sleep(0.1)
+        assert expected in received
+    finally:
+        listener.stop()
+
+
+def test_middleware_starts_the_listener(settings):
+    settings.CACHE_INVALIDATION = True
+    with patch.object(invalidation.listener, "ensure_running") as ensure_running:
+        InvalidationMiddleware(lambda request: HttpResponse())(RequestFactory().get("/pulse"))
+    ensure_running.assert_called_once()
+
+
+def test_middleware_not_on_warm_up(settings):
+    settings.CACHE_INVALIDATION = True
+    with patch.object(invalidation.listener, "ensure_running") as ensure_running:
+        bootstrap.wsgi_get(get_wsgi_application(), "/pulse")
+    ensure_running.assert_not_called()
+
+
+def test_middleware_is_not_used_when_disabled(settings):
+    settings.CACHE_INVALIDATION = False
+    with pytest.raises(MiddlewareNotUsed):
+        InvalidationMiddleware(lambda request: HttpResponse())
@@ -0,0 +1,48 @@
+import logging
+
+import pytest
+
+from beheeromgeving.models import Product
+from beheeromgeving.nplusone import NPlusOneQuery, detect_n_plus_one
+
+
+@pytest.mark.django_db
+class TestNPlusOneDetection:
+    def test_lazy_relation_for_multiple_instances(self, orm_product, orm_product2):
+        with detect_n_plus_one(), pytest.raises(NPlusOneQuery, match="DataContract of Product"):
+            for product in Product.objects.all():
+                list(product.contracts.all())
+
+    def test_prefetched_relation(self, orm_product, orm_product2):
+        with detect_n_plus_one():
+            for product in Product.objects.prefetch_related("contracts__distributions"):
+                for contract in product.contracts.all():
+                    list(contract.distributions.all())
+
+    def test_bypassing_the_prefetch_cache(self, orm_product, orm_product2):
+        with detect_n_plus_one(), pytest.raises(NPlusOneQuery, match="test_nplusone.py"):
+            for product in Product.objects.prefetch_related("contracts"):
+                list(product.contracts.order_by("id"))
+
+    def test_deferred_fields(self, orm_product, orm_product2):
+        with detect_n_plus_one(), pytest.raises(NPlusOneQuery, match="Product of Product"):
+            for product in Product.objects.only("pk"):
+                _ = product.name
+
+    def test_single_lazy_load(self, orm_product):
+        with detect_n_plus_one():
+            product = Product.objects.get(pk=orm_product.pk)
+            assert product.contracts.filter(publication_status="P").count() == 1
+
+    def test_log(self, orm_product, orm_product2, caplog):
+        with detect_n_plus_one("log"), caplog.at_level(logging.WARNING):
+            for product in Product.objects.all():
+                product.contracts.exists()
+        assert "N+1 query: DataContract of Product" in caplog.text
+
+    def test_middleware_ignores_mutations(self, orm_product, orm_team, client_with_token):
+        # Saving a product writes (and re-reads) its contracts one by one.
+        response = client_with_token([orm_team.scope]).patch(
+            f"/products/{orm_product.id}", {"name": "Bomen en struiken"}
+        )
+        assert response.status_code == 200, response.data
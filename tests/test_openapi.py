@@ -0,0 +1,46 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from drf_spectacular.generators import SchemaGenerator
+
+from api.openapi import views
+
+
+@pytest.fixture(autouse=True)
+def clear_schema_cache():
+    views._schemas.clear()
+    yield
+    views._schemas.clear()
+
+
+def test_schema_is_generated_once(api_client):
+    with patch.object(
+        SchemaGenerator, "get_schema", autospec=True, side_effect=SchemaGenerator.get_schema
+    ) as get_schema:
+        first = api_client.get("/openapi.json")
+        second = api_client.get("/openapi.json")
+    assert get_schema.call_count == 1
+    assert first.content == second.content
+    assert json.loads(first.content)["info"]["title"] == "Beheeromgeving Catalogus"
+
+
+@pytest.mark.parametrize("path", ["/openapi.json", "/openapi.yaml"])
+def test_schema_etag(api_client, path):
+    response = api_client.get(path)
+    assert response.status_code == 200
+    assert response["ETag"]
+    assert "no-cache" in response["Cache-Control"]
+
+    not_modified = api_client.get(path, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert not_modified.status_code == 304
+    assert not_modified["ETag"] == response["ETag"]
+    assert not_modified.content == b""
+
+
+def test_schema_formats_are_cached_separately(api_client):
+    json_response = api_client.get("/openapi.json")
+    yaml_response = api_client.get("/openapi.yaml")
+    assert json_response["Content-Type"].startswith("application/vnd.oai.openapi+json")
+    assert yaml_response["Content-Type"].startswith("application/vnd.oai.openapi")
+    assert json_response["ETag"] != yaml_response["ETag"]
@@ -0,0 +1,213 @@
+"""
+Query budgets for every route in beheeromgeving/urls.py.
+
+Every route declares the maximum number of queries it may do. The routes are requested on
+a small and on a larger catalogue (more products, and a product with more contracts,
+distributions, services and sources), and must do exactly the same number of queries on
+both: the number of queries should never depend on the amount of data.
+
+The mutating routes (publishing, set-state) write the target aggregate row by row, so they
+are measured on a product of a fixed shape, while the rest of the catalogue grows.
+"""
+
+from dataclasses import dataclass, field
+
+import pytest
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from beheeromgeving.models import (
+    DataContract,
+    DataService,
+    Distribution,
+    Product,
+    Team,
+    WebhookSubscription,
+)
+
+SMALL = 1
+LARGE = 3
+
+
+@dataclass(frozen=True)
+class Budget:
+    path: str
+    max_queries: int
+    method: str = "get"
+    data: dict = field(default_factory=dict)
+
+
+QUERY_BUDGETS = {
+    "api-root": Budget("/", 0),
+    "health": Budget("/pulse", 0),
+    "me": Budget("/me", 3),
+    "changes": Budget("/changes", 1),
+    "swagger-ui": Budget("/schema", 0),
+    "schema-json": Budget("/openapi.json", 0),
+    "schema-yaml": Budget("/openapi.yaml", 0),
+    "teams-list": Budget("/teams", 1),
+    "teams-detail": Budget("/teams/{team}", 1),
+    "webhooks-list": Budget("/webhooks", 1),
+    "webhooks-detail": Budget("/webhooks/{webhook}", 1),
+    "products-list": Budget("/products", 4),
+    "products-detail": Budget("/products/{product}", 6),
+    "products-lineage": Budget("/products/{product}/lineage?direction=upstream", 2),
+    "products-revision-detail": Budget("/products/{product}/revision", 12),
+    "products-contracts-list": Budget("/products/{product}/contracts", 6),
+    "products-contract-detail": Budget("/products/{product}/contracts/{contract}", 6),
+    "products-contract-revision-detail": Budget(
+        "/products/{product}/contracts/{contract}/revision", 9
+    ),
+    "products-distributions-list": Budget(
+        "/products/{product}/contracts/{contract}/distributions", 6
+    ),
+    "products-distributions-detail": Budget(
+        "/products/{product}/contracts/{contract}/distributions/{distribution}", 6
+    ),
+    "products-services-list": Budget("/products/{product}/services", 6),
+    "products-service-detail": Budget("/products/{product}/services/{service}", 6),
+    "products-revision-publish": Budget("/products/{fixed_product}/revision/publish", 75, "post"),
+    "products-publication_status": Budget(
+        "/products/{fixed_product}/set-state", 75, "post", {"publication_status": "P"}
+    ),
+    "products-contract-revision-publish": Budget(
+        "/products/{fixed_product}/contracts/{fixed_contract}/revision/publish", 60, "post"
+    ),
+    "products-contract_publication_status": Budget(
+        "/products/{fixed_product}/contracts/{fixed_contract}/set-state",
+        65,
+        "post",
+        {"publication_status": "P"},
+    ),
+}
+
+
+def route_names(patterns) -> set[str]:
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            if pattern.namespace is None:
+                names |= route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def create_product(team: Team, name: str, size: int) -> Product:
+    """A published dataproduct with size services and contracts, of size distributions each."""
+    product = Product.objects.create(
+        name=name,
+        description="bomen in Amsterdam",
+        team=team,
+        data_steward="meneerboom@amsterdam.nl",
+        language="NL",
+        is_geo=True,
+        schema_url="https://schemas.data.amsterdam.nl/datasets/bomen/dataset",
+        type="D",
+        themes=["NM"],
+        refresh_period="3.MONTH",
+        publication_status="P",
+        publication_date="2024-01-01T00:00:00Z",
+    )
+    for index in range(size):
+        service = DataService.objects.create(
+            product=product,
+            type="REST",
+            endpoint_url=f"https://api.data.amsterdam.nl/v1/bomen/{index}",
+        )
+        contract = DataContract.objects.create(
+            product=product,
+            publication_status="P",
+            publication_date="2024-01-01T00:00:00Z",
+            purpose="onderhoud van bomen",
+            name=f"beheer bomen {index}",
+            privacy_level="NPI",
+            scopes=["bomen_beheer"],
+            confidentiality="I",
+            start_date="2025-01-01",
+            retainment_period=12,
+            tables=["stamgegevens"],
+        )
+        Distribution.objects.create(contract=contract, access_service=service, type="A")
+        for file_index in range(1, size):
+            Distribution.objects.create(
+                contract=contract,
+                download_url=f"https://bomen.amsterdam.nl/{file_index}.csv",
+                format="csv",
+                type="F",
+            )
+    return product
+
+
+def build_catalogue(client, size: int) -> dict[str, int]:
+    """Seed a catalogue that grows with size and return the ids used in the budget paths."""
+    team = Team.objects.create(
+        name=f"team {size}",
+        acronym=f"T{size}",
+        po_name="Someone",
+        po_email=f"po.{size}@amsterdam.nl",
+        contact_email=f"team.{size}@amsterdam.nl",
+        scope=f"scope_team_{size}",
+    )
+    sources = [create_product(team, f"bron {size}.{index}", size) for index in range(size)]
+    product = create_product(team, f"bomen {size}", size)
+    product.sources.set(sources)
+    create_product(team, f"afnemer {size}", size).sources.add(product)
+    fixed_product = create_product(team, f"vast {size}", SMALL)
+    webhook = WebhookSubscription.objects.create(
+        url=f"https://afnemer.amsterdam.nl/{size}", secret="geheim", team=team
+    )
+
+    contract = product.contracts.order_by("pk").first()
+    fixed_contract = fixed_product.contracts.get()
+    # Working copies, to read and to publish.
+    for live_product, live_contract in ((product, contract), (fixed_product, fixed_contract)):
+        response = client.patch(
+            f"/products/{live_product.pk}/revision", {"name": f"{live_product.name} (herzien)"}
+        )
+        assert response.status_code == 200, response.data
+        response = client.patch(
+            f"/products/{live_product.pk}/contracts/{live_contract.pk}/revision",
+            {"name": f"{live_contract.name} (herzien)"},
+        )
+        assert response.status_code == 200, response.data
+
+    return {
+        "team": team.pk,
+        "product": product.pk,
+        "contract": contract.pk,
+        "distribution": contract.distributions.order_by("pk").first().pk,
+        "service": product.services.order_by("pk").first().pk,
+        "fixed_product": fixed_product.pk,
+        "fixed_contract": fixed_contract.pk,
+        "webhook": webhook.pk,
+    }
+
+
+def test_every_route_has_a_budget():
+    assert route_names(get_resolver().url_patterns) <= QUERY_BUDGETS.keys()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name,budget", QUERY_BUDGETS.items())
+def test_query_budget(client_with_token, django_assert_max_num_queries, name, budget):
+    def request(ids):
+        method = getattr(client, budget.method)
+        path = budget.path.format(**ids)
+        with (
+            django_assert_max_num_queries(budget.max_queries),
+            CaptureQueriesContext(connection) as context,
+        ):
+            response = method(path) if budget.method == "get" else method(path, budget.data)
+        assert response.status_code == 200, path
+        return len(context)
+
+    client = client_with_token(
+        [settings.ADMIN_ROLE_NAME, f"scope_team_{SMALL}", f"scope_team_{LARGE}"]
+    )
+    small = request(build_catalogue(client, SMALL))
+    large = request(build_catalogue(client, LARGE))
+
+    assert small == large, f"{name} does {large - small} more queries on the larger catalogue"
@@ -0,0 +1,63 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from beheeromgeving.routers import PIN_COOKIE, ReplicaMiddleware, ReplicaRouter
+
+
+def middleware_for(status_code=200):
+    """A ReplicaMiddleware around a view that reports where it would read from."""
+
+    def view(request):
+        response = HttpResponse(status=status_code)
+        response.read_from = ReplicaRouter().db_for_read(None)
+        return response
+
+    return ReplicaMiddleware(view)
+
+
+def test_router_outside_requests(replicas):
+    assert ReplicaRouter().db_for_read(None) == "default"
+    assert ReplicaRouter().db_for_write(None) == "default"
+    assert ReplicaRouter().allow_migrate("replica_0", "beheeromgeving") is False
+
+
+def test_middleware_is_not_used_without_replicas(settings):
+    settings.DATABASE_REPLICAS = []
+    with pytest.raises(MiddlewareNotUsed):
+        ReplicaMiddleware(lambda request: HttpResponse())
+
+
+def test_reads_go_to_a_replica(replicas):
+    response = middleware_for()(RequestFactory().get("/products"))
+    assert response.read_from in replicas
+
+
+def test_transactions_read_from_the_primary(replicas):
+    with patch.object(connections["default"], "in_atomic_block", True):
+        response = middleware_for()(RequestFactory().get("/products"))
+    assert response.read_from == "default"
+
+
+def test_mutations_pin_to_the_primary(replicas):
+    response = middleware_for()(RequestFactory().post("/products/1/revision/publish"))
+    assert response.read_from == "default"
+    assert response.cookies[PIN_COOKIE]["max-age"] == 10
+
+    request = RequestFactory().get("/products/1")
+    request.COOKIES[PIN_COOKIE] = "1"
+    assert middleware_for()(request).read_from == "default"
+
+
+def test_failed_mutations_do_not_pin(replicas):
+    response = middleware_for(status_code=400)(RequestFactory().post("/products"))
+    assert PIN_COOKIE not in response.cookies
+
+
+def test_pin_with_header(replicas):
+    request = RequestFactory().get("/products/1", headers={"X-Read-Primary": "1"})
+    assert middleware_for()(request).read_from == "default"
@@ -0,0 +1,115 @@
+from unittest.mock import patch
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from beheeromgeving.token_cache import TokenCacheMiddleware, token_cache
+from tests.utils import build_jwt_token
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+@pytest.fixture()
+def middleware():
+    """The middleware, with the requests that reach the view and the verifications."""
+    requests = []
+
+    def view(request):
+        requests.append(request)
+        return HttpResponse()
+
+    middleware = TokenCacheMiddleware(view)
+    with patch.object(middleware, "authorize", wraps=middleware.authorize) as authorize:
+        yield middleware, requests, authorize
+
+
+def get(token: str | None = None):
+    headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+    return RequestFactory().get("/products", **headers)
+
+
+def test_verified_once(middleware):
+    middleware, requests, authorize = middleware
+    token = build_jwt_token(["team_a", "team_b"], subject="iemand@example.com")
+
+    assert middleware(get(token)).status_code == 200
+    assert middleware(get(token)).status_code == 200
+
+    assert authorize.call_count == 1
+    first, second = requests
+    assert first.get_token_scopes == second.get_token_scopes == frozenset({"team_a", "team_b"})
+    assert second.get_token_subject == "iemand@example.com"
+    assert second.get_token_claims["sub"] == "iemand@example.com"
+
+
+def test_until_expired(middleware, settings):
+    middleware, requests, authorize = middleware
+    settings.TOKEN_CACHE_TIMEOUT = 0
+    token = build_jwt_token(["team_a"])
+
+    middleware(get(token))
+    middleware(get(token))
+    assert authorize.call_count == 2
+
+
+def test_at_most_until_the_token_expires(middleware):
+    middleware, requests, authorize = middleware
+    middleware(get(build_jwt_token(["team_a"])))
+
+    [validated] = token_cache._tokens.values()
+    assert validated.expires_at <= requests[0].get_token_claims["exp"]
+
+
+def test_size(middleware, settings):
+    middleware, requests, authorize = middleware
+    settings.TOKEN_CACHE_SIZE = 1
+    first, second = build_jwt_token(["team_a"]), build_jwt_token(["team_b"])
+
+    middleware(get(first))
+    middleware(get(second))
+    middleware(get(first))
+    assert authorize.call_count == 3
+    assert len(token_cache) == 1
+
+
+def test_disabled(middleware, settings):
+    middleware, requests, authorize = middleware
+    settings.TOKEN_CACHE_SIZE = 0
+    token = build_jwt_token(["team_a"])
+
+    middleware(get(token))
+    middleware(get(token))
+    assert authorize.call_count == 2
+    assert len(token_cache) == 0
+
+
+def test_invalid_token(middleware):
+    middleware, requests, authorize = middleware
+
+    assert middleware(get("nonsense")).status_code == 401
+    assert middleware(get("nonsense")).status_code == 401
+    assert authorize.call_count == 2
+    assert requests == []
+    assert len(token_cache) == 0
+
+
+def test_anonymous(middleware):
+    middleware, requests, authorize = middleware
+
+    middleware(get())
+    assert authorize.call_count == 1
+    assert len(token_cache) == 0
+
+
+@pytest.mark.django_db
+def test_api(orm_product, orm_team, client_with_token):
+    client = client_with_token([orm_team.scope])
+    assert client.get(f"/products/{orm_product.id}").status_code == 200
+    assert len(token_cache) == 1
+    assert client.patch(f"/products/{orm_product.id}", {"name": "Bomen"}).status_code == 200
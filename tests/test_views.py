@@ -1,14 +1,11 @@
 """
 Tests for the views.
-
-NB: Since the services are instantiated outside the viewsets, they will need to be
-refreshed if objects are created or altered outside the regular flow (i.e. directly through the
-django ORM models). This is done in the api_client fixture, so any time a orm_* fixture is used,
-the api_client or client_with_token fixtures need to be the last one.
 """
 
 import base64
+import itertools
 from datetime import UTC, datetime
+from unittest.mock import patch
 
 import pytest
 from django.conf import settings
@@ -20,6 +17,7 @@ from beheeromgeving.models import (
     ProductRevision,
     Team,
 )
+from domain.product.objects import ProductValidator
 
 
 @pytest.mark.django_db
@@ -39,6 +37,7 @@ class TestViews:
             "/products/1337/contracts/1337",
             "/products/1337/services",
             "/products/1337/services/1337",
+            "/products/1337/lineage",
             "/teams/1337",
         ],
     )
@@ -523,6 +522,14 @@ class TestViews:
             # id is always included.
             assert set(product.keys()) == {"id", "name", "other_identifier"}
 
+    def test_product_list_fields_parameter_is_a_single_query(
+        self, orm_product, orm_product2, api_client, django_assert_num_queries
+    ):
+        with django_assert_num_queries(1):
+            response = api_client.get("/products?fields=name")
+        assert response.status_code == 200
+        assert len(response.data["results"]) == 2
+
     def test_product_list_fields_parameter_all(self, orm_product, api_client):
         response = api_client.get("/products?fields=*")
         assert response.status_code == 200
@@ -570,6 +577,108 @@ class TestViews:
         assert response.data["name"] == orm_product.name
         assert response.data["missing_fields"] == []
 
+    def test_product_detail_fields(self, orm_product, api_client, django_assert_num_queries):
+        with (
+            patch.object(ProductValidator, "get_missing_fields") as get_missing_fields,
+            django_assert_num_queries(1),
+        ):
+            response = api_client.get(
+                f"/products/{orm_product.id}?fields=name,team_id,publication_status"
+            )
+        assert response.status_code == 200
+        assert response.data == {
+            "id": orm_product.id,
+            "name": orm_product.name,
+            "team_id": orm_product.team_id,
+            "publication_status": "P",
+        }
+        get_missing_fields.assert_not_called()
+
+    def test_product_detail_fields_with_revision_url(self, orm_product, api_client):
+        response = api_client.get(f"/products/{orm_product.id}?fields=revision_url")
+        assert response.status_code == 200
+        assert set(response.data.keys()) == {"id", "revision_url"}
+        assert response.data["revision_url"].endswith(f"/products/{orm_product.id}/revision")
+
+    def test_product_detail_include_contracts(self, orm_product, api_client):
+        response = api_client.get(f"/products/{orm_product.id}?include=contracts")
+        assert response.status_code == 200
+        assert "services" not in response.data
+        assert len(response.data["contracts"]) == 1
+        assert "distributions" not in response.data["contracts"][0]
+        assert response.data["name"] == orm_product.name
+
+    def test_product_detail_include_distributions(self, orm_product, api_client):
+        response = api_client.get(
+            f"/products/{orm_product.id}?include=contracts.distributions,services"
+        )
+        assert response.status_code == 200
+        assert len(response.data["services"]) == len(orm_product.services.all())
+        assert len(response.data["contracts"][0]["distributions"]) > 0
+
+    def test_product_detail_include_nothing(self, orm_product, api_client):
+        response = api_client.get(f"/products/{orm_product.id}?include=")
+        assert response.status_code == 200
+        assert "contracts" not in response.data
+        assert "services" not in response.data
+
+    def test_product_detail_invalid_include(self, orm_product, api_client):
+        response = api_client.get(f"/products/{orm_product.id}?include=teams")
+        assert response.status_code == 400
+
+    def test_product_lineage(self, lineage_products, api_client):
+        a, b, c, d, _ = lineage_products
+        response = api_client.get(f"/products/{a.id}/lineage")
+        assert response.status_code == 200
+        assert response.data["direction"] == "downstream"
+        assert response.data["depth"] == 3
+        assert {node["id"] for node in response.data["nodes"]} == {a.id, b.id, c.id, d.id}
+        assert {"source": a.id, "sink": b.id} in response.data["edges"]
+
+    def test_product_lineage_shows_draft_products_to_admin(
+        self, lineage_products, client_with_token
+    ):
+        a, *_, draft = lineage_products
+        response = client_with_token([settings.ADMIN_ROLE_NAME]).get(
+            f"/products/{a.id}/lineage?direction=downstream&depth=2"
+        )
+        assert response.status_code == 200
+        assert draft.id in {node["id"] for node in response.data["nodes"]}
+
+    def test_product_lineage_upstream(self, lineage_products, api_client):
+        a, b, _, d, _ = lineage_products
+        response = api_client.get(f"/products/{b.id}/lineage?direction=upstream&depth=1")
+        assert response.status_code == 200
+        assert response.data["edges"] == [
+            {"source": source, "sink": b.id} for source in sorted([a.id, d.id])
+        ]
+
+    def test_product_lineage_dense(self, many_orm_products, api_client):
+        """Layers of two products, each a source of both in the next: 2**depth paths."""
+        root, *rest = many_orm_products[:25]
+        layers = [[root], *(rest[i : i + 2] for i in range(0, len(rest), 2))]
+        for sources, sinks in itertools.pairwise(layers):
+            for sink in sinks:
+                sink.sources.add(*sources)
+
+        response = api_client.get(f"/products/{root.id}/lineage?depth=10")
+        assert response.status_code == 200
+        depths = {node["id"]: node["depth"] for node in response.data["nodes"]}
+        assert depths == {
+            product.id: depth for depth, layer in enumerate(layers[:11]) for product in layer
+        }
+        assert len(response.data["edges"]) == 2 + 9 * 4
+
+    def test_product_lineage_of_draft_product_requires_token(self, lineage_products, api_client):
+        draft = lineage_products[-1]
+        response = api_client.get(f"/products/{draft.id}/lineage")
+        assert response.status_code == 401
+
+    @pytest.mark.parametrize("query", ["direction=sideways", "depth=0", "depth=11"])
+    def test_product_lineage_invalid_parameters(self, lineage_products, api_client, query):
+        response = api_client.get(f"/products/{lineage_products[0].id}/lineage?{query}")
+        assert response.status_code == 400
+
     def test_product_detail_shows_internal_product_for_employee(
         self, many_orm_information_products, client_with_token
     ):
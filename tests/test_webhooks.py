@@ -0,0 +1,264 @@
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.utils import timezone
+
+from beheeromgeving.models import WebhookDelivery, WebhookSubscription
+from beheeromgeving.webhooks import (
+    SIGNATURE_HEADER,
+    TIMESTAMP_HEADER,
+    Dispatcher,
+    retry_dead,
+    retry_delay,
+    sign,
+)
+
+
+@pytest.fixture()
+def subscriber(recording_server):
+    return recording_server("POST")
+
+
+@pytest.fixture()
+def subscription(subscriber, orm_team) -> WebhookSubscription:
+    return WebhookSubscription.objects.create(
+        url=f"{subscriber.url}hook", secret="geheim", team=orm_team, publication_statuses=["P"]
+    )
+
+
+def rename(client_with_token, team, product, name: str):
+    response = client_with_token([team.scope]).patch(f"/products/{product.id}", {"name": name})
+    assert response.status_code == 200, response.data
+
+
+@pytest.mark.django_db
+class TestWebhookSubscriptions:
+    def test_create_for_team(self, orm_team, client_with_token):
+        response = client_with_token([orm_team.scope]).post(
+            "/webhooks",
+            {"url": "https://afnemer.amsterdam.nl/hook", "team_id": orm_team.id},
+        )
+        assert response.status_code == 201, response.data
+        assert response.data["secret"]
+        assert response.data["publication_statuses"] == ["P"]
+        subscription = WebhookSubscription.objects.get(pk=response.data["id"])
+        assert subscription.secret == response.data["secret"]
+
+    def test_secret_is_not_shown_again(self, subscription, orm_team, client_with_token):
+        response = client_with_token([orm_team.scope]).get(f"/webhooks/{subscription.id}")
+        assert response.status_code == 200
+        assert "secret" not in response.data
+
+    def test_global_subscription_is_for_admins(self, orm_team, client_with_token):
+        data = {"url": "https://afnemer.amsterdam.nl/hook"}
+        response = client_with_token([orm_team.scope]).post("/webhooks", data)
+        assert response.status_code == 403
+        response = client_with_token([settings.ADMIN_ROLE_NAME]).post("/webhooks", data)
+        assert response.status_code == 201, response.data
+
+    def test_create_for_other_team(self, orm_team, orm_other_team, client_with_token):
+        response = client_with_token([orm_team.scope]).post(
+            "/webhooks",
+            {"url": "https://afnemer.amsterdam.nl/hook", "team_id": orm_other_team.id},
+        )
+        assert response.status_code == 403
+
+    def test_create_for_unknown_team(self, client_with_token):
+        response = client_with_token([settings.ADMIN_ROLE_NAME]).post(
+            "/webhooks", {"url": "https://afnemer.amsterdam.nl/hook", "team_id": 999}
+        )
+        assert response.status_code == 400
+
+    def test_url_must_be_https(self, orm_team, client_with_token):
+        response = client_with_token([orm_team.scope]).post(
+            "/webhooks", {"url": "http://afnemer.amsterdam.nl/hook", "team_id": orm_team.id}
+        )
+        assert response.status_code == 400
+
+    @pytest.mark.parametrize(
+        "url",
+        [
+            "https://localhost/hook",
+            "https://169.254.169.254/latest/meta-data",
+            "https://10.0.0.1/hook",
+            "https://[::ffff:127.0.0.1]/hook",
+            "https://onbekend.invalid/hook",
+        ],
+    )
+    def test_url_must_be_public(self, url, orm_team, client_with_token):
+        response = client_with_token([orm_team.scope]).post(
+            "/webhooks", {"url": url, "team_id": orm_team.id}
+        )
+        assert response.status_code == 400
+        assert not WebhookSubscription.objects.exists()
+
+    def test_list(self, subscription, orm_team, orm_other_team, client_with_token):
+        WebhookSubscription.objects.create(
+            url="https://afnemer.amsterdam.nl/hook", secret="geheim", team=orm_other_team
+        )
+        response = client_with_token([orm_team.scope]).get("/webhooks")
+        assert [item["id"] for item in response.data] == [subscription.id]
+        response = client_with_token([settings.ADMIN_ROLE_NAME]).get("/webhooks")
+        assert len(response.data) == 2
+
+    def test_list_unauthenticated(self, api_client):
+        assert api_client.get("/webhooks").status_code == 401
+
+    def test_delete(self, subscription, orm_team, client_with_token):
+        response = client_with_token([orm_team.scope]).delete(f"/webhooks/{subscription.id}")
+        assert response.status_code == 204
+        assert not WebhookSubscription.objects.exists()
+
+    def test_delete_by_other_team(self, subscription, orm_other_team, client_with_token):
+        response = client_with_token([orm_other_team.scope]).delete(f"/webhooks/{subscription.id}")
+        assert response.status_code == 403
+
+
+@pytest.mark.django_db
+class TestDispatcher:
+    def test_delivers_signed_changes(
+        self, subscription, subscriber, orm_product, orm_team, client_with_token
+    ):
+        rename(client_with_token, orm_team, orm_product, "Bomen en struiken")
+
+        assert Dispatcher().run_once() == (1, 1)
+
+        [(headers, body)] = subscriber.received
+        assert headers[SIGNATURE_HEADER] == sign("geheim", headers[TIMESTAMP_HEADER], body)
+        payload = json.loads(body)
+        assert payload["subscription_id"] == subscription.id
+        assert [(c["event"], c["product_id"]) for c in payload["changes"]] == [
+            ("update", orm_product.id)
+        ]
+        delivery = WebhookDelivery.objects.get()
+        assert delivery.status == "delivered"
+        assert delivery.attempts == 1
+
+    def test_nothing_new(self, subscription, subscriber):
+        assert Dispatcher().run_once() == (0, 0)
+        assert subscriber.received == []
+
+    def test_changes_before_subscribing(self, orm_product, orm_team, client_with_token):
+        rename(client_with_token, orm_team, orm_product, "Bomen en struiken")
+        response = client_with_token([orm_team.scope]).post(
+            "/webhooks", {"url": "https://afnemer.amsterdam.nl/hook", "team_id": orm_team.id}
+        )
+        assert response.status_code == 201, response.data
+
+        assert Dispatcher().enqueue() == 0
+
+    def test_filtered_changes(
+        self, subscription, subscriber, orm_product, orm_team, client_with_token
+    ):
+        subscription.event_types = ["delete"]
+        subscription.save()
+        rename(client_with_token, orm_team, orm_product, "Bomen en struiken")
+
+        assert Dispatcher().run_once() == (0, 0)
+        subscription.refresh_from_db()
+        assert subscription.cursor > 0
+
+    def test_changes_of_other_teams(
+        self, subscriber, orm_product, orm_team, orm_other_team, client_with_token
+    ):
+        WebhookSubscription.objects.create(
+            url=f"{subscriber.url}hook", secret="geheim", team=orm_other_team
+        )
+        rename(client_with_token, orm_team, orm_product, "Bomen en struiken")
+
+        assert Dispatcher().run_once() == (0, 0)
+
+    def test_batches(
+        self, subscription, subscriber, orm_product, orm_team, client_with_token, settings
+    ):
+        settings.WEBHOOK_BATCH_SIZE = 2
+        for name in ("Bomen 1", "Bomen 2", "Bomen 3"):
+            rename(client_with_token, orm_team, orm_product, name)
+
+        dispatcher = Dispatcher()
+        assert dispatcher.run_once() == (1, 1)
+        assert dispatcher.run_once() == (1, 1)
+        assert [len(json.loads(body)["changes"]) for _, body in subscriber.received] == [2, 1]
+
+    def test_retries_with_backoff(
+        self, subscription, subscriber, orm_product, orm_team, client_with_token, settings
+    ):
+        settings.WEBHOOK_RETRY_DELAY = 30
+        subscriber.status = 500
+        rename(client_with_token, orm_team, orm_product, "Bomen en struiken")
+
+        dispatcher = Dispatcher()
+        assert dispatcher.run_once() == (1, 0)
+        delivery = WebhookDelivery.objects.get()
+        assert delivery.status == "pending"
+        assert delivery.last_error == "HTTP 500"
+        assert delivery.next_attempt_at > timezone.now() + timedelta(seconds=25)
+        # Not due yet.
+        assert dispatcher.deliver() == 0
+
+        subscriber.status = 200
+        WebhookDelivery.objects.update(next_attempt_at=timezone.now())
+        assert dispatcher.deliver() == 1
+        assert len(subscriber.received) == 2
+
+    def test_dead_letters(
+        self, subscription, subscriber, orm_product, orm_team, client_with_token, settings
+    ):
+        settings.WEBHOOK_MAX_ATTEMPTS = 2
+        settings.WEBHOOK_RETRY_DELAY = 0
+        subscriber.status = 410
+        rename(client_with_token, orm_team, orm_product, "Bomen en struiken")
+
+        dispatcher = Dispatcher()
+        dispatcher.run_once()
+        dispatcher.deliver()
+        assert WebhookDelivery.objects.get().status == "dead"
+        assert dispatcher.deliver() == 0
+
+        subscriber.status = 200
+        assert retry_dead() == 1
+        assert dispatcher.deliver() == 1
+
+    def test_unreachable_subscriber(
+        self, subscription, orm_product, orm_team, client_with_token, settings
+    ):
+        settings.WEBHOOK_TIMEOUT = 1
+        subscription.url = "http://127.0.0.1:9/hook"
+        subscription.save()
+        rename(client_with_token, orm_team, orm_product, "Bomen en struiken")
+
+        assert Dispatcher().run_once() == (1, 0)
+        assert WebhookDelivery.objects.get().last_error
+
+    def test_url_is_checked_before_delivery(
+        self, subscription, subscriber, orm_product, orm_team, client_with_token, settings
+    ):
+        settings.WEBHOOK_ALLOWED_HOSTS = []
+        rename(client_with_token, orm_team, orm_product, "Bomen en struiken")
+
+        assert Dispatcher().run_once() == (1, 0)
+        assert "not a public address" in WebhookDelivery.objects.get().last_error
+        assert subscriber.received == []
+
+
+def test_retry_delay(settings):
+    settings.WEBHOOK_RETRY_DELAY = 30
+    settings.WEBHOOK_MAX_RETRY_DELAY = 100
+    assert [retry_delay(attempts).seconds for attempts in (1, 2, 3, 4)] == [30, 60, 100, 100]
+
+
+@pytest.mark.django_db
+def test_dispatch_webhooks_command(
+    subscription, subscriber, orm_product, orm_team, client_with_token
+):
+    rename(client_with_token, orm_team, orm_product, "Bomen en struiken")
+    out = io.StringIO()
+
+    call_command("dispatch_webhooks", "--once", "--retry-dead", stdout=out)
+
+    assert "queued 1, delivered 1" in out.getvalue()
+    assert len(subscriber.received) == 1